@@ -0,0 +1,89 @@
+"""Measure the time for a new Python process to start using the DLHub SDK
+
+Each case is run in a fresh interpreter, so the times include loading all of the
+modules it needs. The cases for the servable models check that importing them does not
+load the libraries used to describe models (e.g., Keras), which are only needed when a
+model is created. Results are printed as a table or, with ``--json``, as a JSON
+document that can be compared between commits::
+
+    python benchmarks/startup.py --repeat 10
+"""
+from argparse import ArgumentParser
+import json
+import statistics
+import subprocess
+import sys
+
+#: Code run for each case. Cases that create a client provide credentials, so that
+#:  the time to log in is not included
+cases = {
+    'import dlhub_sdk': 'import dlhub_sdk',
+    'import dlhub_sdk.client': 'import dlhub_sdk.client',
+    'create client': """
+from globus_sdk import AccessTokenAuthorizer, SearchClient
+from dlhub_sdk import DLHubClient
+DLHubClient(AccessTokenAuthorizer('x'), SearchClient(authorizer=AccessTokenAuthorizer('x')))
+""",
+    'create client (deferred login)': """
+from dlhub_sdk import DLHubClient
+DLHubClient()
+""",
+    'import dlhub_sdk.models': 'import dlhub_sdk.models',
+    'import dlhub_sdk.models.servables.sklearn': 'import dlhub_sdk.models.servables.sklearn',
+    'import dlhub_sdk.models.servables.keras': 'import dlhub_sdk.models.servables.keras',
+    'import dlhub_sdk.models.servables.tensorflow':
+        'import dlhub_sdk.models.servables.tensorflow',
+    'unserialize_object': """
+from dlhub_sdk.utils import unserialize_object
+unserialize_object({'@class': 'dlhub_sdk.models.servables.sklearn.ScikitLearnModel'})
+""",
+}
+
+_timer = """
+import time
+_start = time.perf_counter()
+{}
+print(time.perf_counter() - _start)
+"""
+
+
+def time_case(code, repeat):
+    """Time a piece of code in new interpreters
+
+    Args:
+        code (string): Code to run
+        repeat (int): Number of interpreters to start
+    Returns:
+        ([float]) Time to run the code in each interpreter, in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', _timer.format(code)])
+        times.append(float(output.decode().split()[-1]))
+    return times
+
+
+def main(args=None):
+    parser = ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5, help='Number of runs of each case')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    parser.add_argument('cases', nargs='*', help='Cases to run. Default is all cases')
+    args = parser.parse_args(args)
+
+    results = {}
+    for name in args.cases or list(cases):
+        times = time_case(cases[name], args.repeat)
+        results[name] = {'median': statistics.median(times), 'min': min(times)}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        width = max(len(name) for name in results)
+        print('{}  {:>10}  {:>10}'.format('Case'.ljust(width), 'Median (ms)', 'Min (ms)'))
+        for name, result in results.items():
+            print('{}  {:>11.1f}  {:>10.1f}'.format(name.ljust(width), result['median'] * 1000,
+                                                    result['min'] * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,18 @@
-from .client import DLHubClient  # noqa F401 (import unused)
+import sys
+
+# The client is imported when first accessed, so that modules which do not need it
+#  (e.g., dlhub_sdk.models) load without Globus and its dependencies. Module-level
+#  ``__getattr__`` requires Python 3.7, so older versions import the client eagerly
+__all__ = ['DLHubClient']
+
+if sys.version_info < (3, 7):
+    from dlhub_sdk.client import DLHubClient  # noqa: F401
+else:
+    def __getattr__(name):
+        if name == 'DLHubClient':
+            from dlhub_sdk.client import DLHubClient
+            return DLHubClient
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+    def __dir__():
+        return sorted(list(globals()) + __all__)
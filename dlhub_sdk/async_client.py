@@ -0,0 +1,484 @@
+"""Client for interacting with DLHub from asyncio applications
+
+Requires the ``aiohttp`` package, which is installed with ``pip install dlhub_sdk[async]``
+"""
+from threading import Lock
+import asyncio
+import json
+
+from globus_sdk.base import slash_join
+from mdf_toolbox import gmeta_pop
+
+from dlhub_sdk.config import DLHUB_SERVICE_ADDRESS
+from dlhub_sdk.utils.auth import DeferredAuthorizer, get_credentials
+from dlhub_sdk.utils.search import (DLHubSearchHelper, get_method_details, filter_latest,
+                                    iter_servables, project_fields)
+from dlhub_sdk.utils.serialization import (encode_run_inputs, prepare_run_request,
+                                           decode_run_result)
+from dlhub_sdk.version import app_name
+
+
+def _import_aiohttp():
+    """Import aiohttp, which is only required by the asynchronous client
+
+    Returns:
+        (module) aiohttp
+    """
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError('AsyncDLHubClient requires the aiohttp package. '
+                          'Install it with "pip install dlhub_sdk[async]"')
+    return aiohttp
+
+
+async def _iterate_async(body):
+    """Make an asynchronous iterator over the chunks of a request body
+
+    Args:
+        body (iterable): Body of the request
+    """
+    for chunk in body:
+        yield chunk
+
+
+class AsyncDLHubClient:
+    """Client for the DLHub service whose operations are coroutines
+
+    Provides the same operations for running servables, querying the DLHub Search index and
+    checking on tasks as :class:`DLHubClient <dlhub_sdk.client.DLHubClient>`,
+    but does not block the event loop while waiting on the network. Many requests can be
+    in flight at once and they all share a single pool of connections.
+
+    The client must be closed after use, either by calling :meth:`close` or by using it as an
+    asynchronous context manager::
+
+        async with AsyncDLHubClient() as client:
+            result = await client.run('user/servable', inputs)
+    """
+
+    def __init__(self, dlh_authorizer=None, search_client=None, http_timeout=None,
+                 force_login=False, max_connections=100, max_connections_per_host=0,
+                 base_url=DLHUB_SERVICE_ADDRESS, compression=None, compression_level=None,
+                 compression_threshold=1024):
+        """Initialize the client
+
+        Args:
+            dlh_authorizer (:class:`GlobusAuthorizer
+                            <globus_sdk.authorizers.base.GlobusAuthorizer>`):
+                An authorizer instance used to communicate with DLHub.
+                If ``None``, will be created.
+            search_client (:class:`SearchClient <globus_sdk.SearchClient>`):
+                An authenticated SearchClient. Used only to supply credentials and the
+                address for Globus Search. If ``None``, will be created.
+            http_timeout (int): Timeout for any call to service in seconds. (default is no timeout)
+            force_login (bool): Whether to force a login to get new credentials.
+                Otherwise, if ``dlh_authorizer`` or ``search_client`` are not provided,
+                the saved credentials are loaded (logging in if needed). Credentials are
+                loaded in a separate thread before the first request, so that the event
+                loop is not blocked.
+            max_connections (int): Maximum number of simultaneous connections. Further
+                requests wait for a connection to become free
+            max_connections_per_host (int): Maximum number of simultaneous connections to a
+                single host. Default (0) is no limit beyond ``max_connections``
+            base_url (string): Address of the DLHub service
+            compression (string): Codec used to compress the inputs sent to servables,
+                "gzip" or "zstd". Default is to not compress
+            compression_level (int): Compression level. Default is the codec's default level
+            compression_threshold (int): Minimum size of inputs, in bytes, to compress
+        """
+        _import_aiohttp()
+
+        # Credentials that were not provided are loaded before the first request
+        self._login_lock = Lock()
+        self._force_login = force_login
+        self._needs_login = force_login or not dlh_authorizer or not search_client
+        if not dlh_authorizer:
+            dlh_authorizer = DeferredAuthorizer(self._get_dlh_authorizer)
+        self.authorizer = dlh_authorizer
+        self._search_client_instance = search_client or None
+
+        self.base_url = base_url
+        self._http_timeout = http_timeout
+        self._max_connections = max_connections
+        self._max_connections_per_host = max_connections_per_host
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_threshold = compression_threshold
+
+        # The session must be created from inside a running event loop
+        self._session = None
+
+    def _login(self):
+        """Load the saved credentials for DLHub and Globus Search, logging in if needed
+
+        Credentials given to the initializer are kept unless ``force_login`` was set.
+        """
+        with self._login_lock:
+            if not self._needs_login:
+                return
+
+            auth_res = get_credentials(self._force_login)
+            if self._force_login or isinstance(self.authorizer, DeferredAuthorizer):
+                self.authorizer = auth_res["dlhub"]
+            if self._force_login or self._search_client_instance is None:
+                self._search_client_instance = auth_res["search"]
+            self._needs_login = False
+
+    async def _ensure_login(self):
+        """Load the credentials, if needed, without blocking the event loop"""
+        if self._needs_login:
+            await asyncio.get_event_loop().run_in_executor(None, self._login)
+
+    def _get_dlh_authorizer(self):
+        """Get the authorizer for DLHub, logging in if needed"""
+        self._login()
+        return self.authorizer
+
+    @property
+    def _search_client(self):
+        """SearchClient: Client for Globus Search, logging in if needed"""
+        self._login()
+        return self._search_client_instance
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """Close all open connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        """Get the HTTP session, creating it if needed
+
+        Returns:
+            (aiohttp.ClientSession): Session used for all requests
+        """
+        if self._session is None:
+            aiohttp = _import_aiohttp()
+            connector = aiohttp.TCPConnector(limit=self._max_connections,
+                                             limit_per_host=self._max_connections_per_host)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self._http_timeout),
+                headers={'Accept': 'application/json', 'User-Agent': app_name}
+            )
+        return self._session
+
+    async def _request(self, method, url, authorizer, json_body=None, text_body=None,
+                       headers=None):
+        """Make a request and parse the reply
+
+        Args:
+            method (string): HTTP method
+            url (string): Full address of the resource
+            authorizer (GlobusAuthorizer): Authorizer used to create the authorization header
+            json_body: Data to be JSON encoded as the body of the request
+            text_body (string, bytes or iterable): Pre-encoded body of the request
+            headers (dict): Additional headers for the request
+        Returns:
+            Data in the reply
+        """
+        await self._ensure_login()
+        aiohttp = _import_aiohttp()
+        session = self._get_session()
+        headers = dict(headers) if headers is not None else {}
+        if json_body is not None:
+            text_body = json.dumps(json_body)
+            headers['Content-Type'] = 'application/json'
+
+        # Send bodies made of many chunks without joining them
+        streaming = not isinstance(text_body, (str, bytes, type(None)))
+        if streaming:
+            try:
+                headers['Content-Length'] = str(len(text_body))
+            except TypeError:
+                pass  # Size is unknown, send with chunked encoding
+
+        # Retry once if the credentials have expired. The authorizer may refresh
+        #  the access token over HTTP, so it is used outside of the event loop
+        loop = asyncio.get_event_loop()
+        for retry in (True, False):
+            await loop.run_in_executor(None, authorizer.set_authorization_header, headers)
+            data = _iterate_async(text_body) if streaming else text_body
+            async with session.request(method, url, data=data, headers=headers) as resp:
+                if resp.status == 401 and retry and await loop.run_in_executor(
+                        None, authorizer.handle_missing_authorization):
+                    continue
+                if resp.status >= 400:
+                    raise aiohttp.ClientResponseError(resp.request_info, resp.history,
+                                                      status=resp.status,
+                                                      message=await resp.text(),
+                                                      headers=resp.headers)
+                return decode_run_result(await resp.read(), resp.headers.get('Content-Type'))
+
+    async def _service_request(self, method, path, **kwargs):
+        """Make a request to the DLHub service
+
+        Args:
+            method (string): HTTP method
+            path (string): Path of the resource
+        Keyword arguments are passed to :meth:`_request`
+        Returns:
+            Data in the reply
+        """
+        return await self._request(method, slash_join(self.base_url, path), self.authorizer,
+                                   **kwargs)
+
+    @property
+    def query(self):
+        """Access a query of the DLHub Search repository
+
+        Execute the query by passing it to :meth:`execute_query`. Loads the credentials
+        for Globus Search if they have not been loaded yet, which blocks until complete"""
+        return DLHubSearchHelper(search_client=self._search_client)
+
+    async def execute_query(self, query, limit=None, info=False):
+        """Execute a query built with :attr:`query`
+
+        Args:
+            query (DLHubSearchHelper): Query to execute
+            limit (int): Maximum number of entries to return
+            info (bool): Whether to also return information about the query
+        Returns:
+            If ``info`` is ``False``, *list*: The search results.
+            If ``info`` is ``True``, *tuple*: The search results,
+            and a dictionary of query information.
+        """
+        await self._ensure_login()
+        url = slash_join(self._search_client.base_url,
+                         'v1/index/{}/search'.format(query.index))
+        data = await self._request('POST', url, self._search_client.authorizer,
+                                   json_body=query.get_search_query(limit))
+        return gmeta_pop(data, info=info)
+
+    @staticmethod
+    def _prepare_results(results, only_latest, fields):
+        """Filter search results before returning them to the user
+
+        Args:
+            results ([dict]): Results of a search
+            only_latest (bool): Whether to return only the latest version of each servable
+            fields ([str]): Fields to keep, see :func:`~dlhub_sdk.utils.search.project_fields`
+        Returns:
+            ([dict]) Filtered results
+        """
+        if only_latest:
+            results = filter_latest(results)
+        if fields is not None:
+            results = [project_fields(r, fields) for r in results]
+        return results
+
+    async def get_username(self):
+        """Get the username associated with the current credentials"""
+
+        res = await self._service_request('GET', 'namespaces')
+        return res['namespace']
+
+    async def get_task_status(self, task_id):
+        """Get the status of a DLHub task.
+
+        Args:
+            task_id (string): UUID of the task
+        Returns:
+            dict: status block containing "status" key.
+        """
+
+        return await self._service_request('GET', "{task_id}/status".format(task_id=task_id))
+
+    async def run(self, name, inputs, input_type='python'):
+        """Invoke a DLHub servable
+
+        Args:
+            name (string): DLHub name of the servable of the form <user>/<servable_name>
+            inputs: Data to be used as input to the function. Can be a string of file paths or URLs
+            input_type (string): How to send the data to DLHub. See
+                :meth:`DLHubClient.run <dlhub_sdk.client.DLHubClient.run>`
+        Returns:
+            Results of running the servable
+        """
+        data, content_type = encode_run_inputs(inputs, input_type)
+        data, headers = prepare_run_request(data, content_type, self.compression,
+                                            self.compression_level, self.compression_threshold,
+                                            library='aiohttp')
+        return await self._service_request('POST', 'servables/{name}/run'.format(name=name),
+                                           text_body=data, headers=headers)
+
+    async def publish_repository(self, repository):
+        """Submit a repository to DLHub for publication
+
+        Args:
+            repository (string): Repository to publish
+        Returns:
+            (string): Task ID of this submission, used for checking for success
+        """
+
+        response = await self._service_request('POST', 'publish_repo',
+                                               json_body={"repository": repository})
+        return response['task_id']
+
+    async def get_servables(self, only_latest_version=True, fields=None, page_size=1000,
+                            max_concurrency=4):
+        """Get all of the servables available in the service
+
+        Pages of results are retrieved in a separate thread, using the Globus SDK rather than
+        the connections of this client. See :meth:`DLHubClient.iter_servables
+        <dlhub_sdk.client.DLHubClient.iter_servables>`
+
+        Args:
+            only_latest_version (bool): Whether to only return the latest version of each servable
+            fields ([str]): Fields to keep, see :func:`~dlhub_sdk.utils.search.project_fields`
+            page_size (int): Number of servables to retrieve in each request
+            max_concurrency (int): Maximum number of requests to make at once
+        Returns:
+            ([list]) Complete metadata for all servables found in DLHub
+        """
+        await self._ensure_login()
+        return await asyncio.get_event_loop().run_in_executor(
+            None, lambda: list(iter_servables(self._search_client, only_latest_version,
+                                              page_size, max_concurrency, fields))
+        )
+
+    async def list_servables(self):
+        """Get a list of the servables available in the service
+
+        Returns:
+            [string]: List of all servable names in username/servable_name format
+        """
+
+        servables = await self.get_servables(only_latest_version=True,
+                                             fields=['dlhub.shorthand_name'])
+        return [x['dlhub']['shorthand_name'] for x in servables]
+
+    async def describe_servable(self, name):
+        """Get the description for a certain servable
+
+        Args:
+            name (string): DLHub name of the servable of the form <user>/<servable_name>
+        Returns:
+            dict: Summary of the servable
+        """
+        split_name = name.split('/')
+        if len(split_name) < 2:
+            raise AttributeError('Please enter name in the form <user>/<servable_name>')
+
+        await self._ensure_login()
+        # Create a query for a single servable
+        query = self.query.match_servable('/'.join(split_name[1:]))\
+            .match_owner(split_name[0]).add_sort("dlhub.publication_date", False)
+        results = await self.execute_query(query, limit=1)
+
+        # Raise error if servable is not found
+        if len(results) == 0:
+            raise AttributeError('No such servable: {}'.format(name))
+        return results[0]
+
+    async def describe_methods(self, name, method=None):
+        """Get the description for the method(s) of a certain servable
+
+        Args:
+            name (string): DLHub name of the servable of the form <user>/<servable_name>
+            method (string): Optional: Name of the method
+        Returns:
+             dict: Description of a certain method if ``method`` provided, all methods
+                if the method name was not provided.
+        """
+
+        metadata = await self.describe_servable(name)
+        return get_method_details(metadata, method)
+
+    async def search(self, query, advanced=False, limit=None, only_latest=True, fields=None):
+        """Query the DLHub servable library
+
+        See :meth:`DLHubClient.search <dlhub_sdk.client.DLHubClient.search>`
+
+        Args:
+             query (string): Query to be performed
+             advanced (bool): Whether to perform an advanced query
+             limit (int): Maximum number of entries to return
+             only_latest (bool): Whether to return only the latest version of the model
+             fields ([str]): Fields to keep, see :func:`~dlhub_sdk.utils.search.project_fields`
+        Returns:
+            ([dict]): All records matching the search query
+        """
+
+        await self._ensure_login()
+        helper = DLHubSearchHelper(search_client=self._search_client, q=query,
+                                   advanced=advanced)
+        results = await self.execute_query(helper, limit=limit)
+        return self._prepare_results(results, only_latest, fields)
+
+    async def search_by_servable(self, servable_name=None, owner=None, version=None,
+                                 only_latest=True, limit=None, get_info=False, fields=None):
+        """Search by the ownership, name, or version of a servable
+
+        See :meth:`DLHubClient.search_by_servable
+        <dlhub_sdk.client.DLHubClient.search_by_servable>`
+
+        Args:
+            servable_name (str): The name of the servable
+            owner (str): The name of the owner of the servable
+            version (int): Model version
+            only_latest (bool): Whether to return only the latest version of each servable
+            limit (int): The maximum number of results to return
+            get_info (bool): Whether to also return information about the query
+            fields ([str]): Fields to keep, see :func:`~dlhub_sdk.utils.search.project_fields`
+        Returns:
+            If ``info`` is ``False``, *list*: The search results.
+            If ``info`` is ``True``, *tuple*: The search results,
+            and a dictionary of query information.
+        """
+        if not servable_name and not owner and not version:
+            raise ValueError("One of 'servable_name', 'owner', or 'publication_date' is required.")
+
+        await self._ensure_login()
+        # Perform the query
+        query = self.query.match_servable(servable_name=servable_name, owner=owner,
+                                          publication_date=version)
+        results, info = await self.execute_query(query, limit=limit, info=True)
+        results = self._prepare_results(results, only_latest, fields)
+
+        if get_info:
+            return results, info
+        return results
+
+    async def search_by_authors(self, authors, match_all=True, limit=None, only_latest=True,
+                                fields=None):
+        """Execute a search for servables from certain authors.
+
+        See :meth:`DLHubClient.search_by_authors <dlhub_sdk.client.DLHubClient.search_by_authors>`
+
+        Args:
+            authors (str or list of str): The authors to match. Names must be in
+                "Family Name, Given Name" format
+            match_all (bool): If ``True``, will require all authors be on any results.
+            limit (int): The maximum number of results to return.
+            only_latest (bool): Whether to return only the latest version of each servable
+            fields ([str]): Fields to keep, see :func:`~dlhub_sdk.utils.search.project_fields`
+        Returns:
+            [dict]: List of servables from the desired authors
+        """
+        await self._ensure_login()
+        query = self.query.match_authors(authors, match_all=match_all)
+        results = await self.execute_query(query, limit=limit)
+        return self._prepare_results(results, only_latest, fields)
+
+    async def search_by_related_doi(self, doi, limit=None, only_latest=True, fields=None):
+        """Get all of the servables associated with a certain publication
+
+        Args:
+            doi (string): DOI of related paper
+            limit (int): Maximum number of results to return
+            only_latest (bool): Whether to return only the most recent version of the model
+            fields ([str]): Fields to keep, see :func:`~dlhub_sdk.utils.search.project_fields`
+        Returns:
+            [dict]: List of servables from the requested paper
+        """
+
+        await self._ensure_login()
+        results = await self.execute_query(self.query.match_doi(doi), limit=limit)
+        return self._prepare_results(results, only_latest, fields)
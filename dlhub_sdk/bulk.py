@@ -0,0 +1,317 @@
+"""Tools for describing many servables at once, such as the models from a hyperparameter sweep
+
+The servables are listed in a manifest, a JSON list or a file with one JSON document per
+line. Each entry gives the type of model, the arguments to its ``create_model`` function,
+and metadata to set for that servable::
+
+    {"type": "sklearn", "args": {"path": "model-0.pkl", "n_input_columns": 4},
+     "metadata": {"set_name": "model-0"}}
+
+Metadata are given as the names of functions of the model (e.g., ``set_title``) and the
+value to pass. Values that are dictionaries are passed as keyword arguments, and all other
+values are passed as a single argument. Metadata shared by all servables are set before
+those of each entry.
+
+Models are created in a pool of processes, each of which imports the frameworks used
+by the manifest once before describing any models. Only a few entries per process are
+submitted to the pool at a time, so that memory use does not grow with the size of the
+manifest. Relative paths are resolved from the current working directory. Run from the
+command line with::
+
+    python -m dlhub_sdk.bulk manifest.jsonl descriptions.jsonl --metadata shared.json
+"""
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from importlib import import_module
+import json
+import logging
+import os
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+logger = logging.getLogger(__name__)
+
+#: Full names of the model classes with short names
+model_types = {
+    'sklearn': 'dlhub_sdk.models.servables.sklearn.ScikitLearnModel',
+    'keras': 'dlhub_sdk.models.servables.keras.KerasModel',
+    'tensorflow': 'dlhub_sdk.models.servables.tensorflow.TensorFlowModel',
+    'python_class': 'dlhub_sdk.models.servables.python.PythonClassMethodModel',
+    'python_static': 'dlhub_sdk.models.servables.python.PythonStaticMethodModel',
+}
+
+#: Libraries imported by each worker before describing models of a certain class
+_frameworks = {
+    'dlhub_sdk.models.servables.sklearn.ScikitLearnModel': ['sklearn.base', 'sklearn.pipeline'],
+    'dlhub_sdk.models.servables.keras.KerasModel': ['keras.models', 'keras.layers'],
+    'dlhub_sdk.models.servables.tensorflow.TensorFlowModel': ['tensorflow'],
+}
+
+# Environment variables that limit the number of threads used by numerical libraries
+_thread_variables = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS']
+
+# Whether this process has been prepared to describe models
+_warmed_up = False
+
+
+def _get_class_name(model_type):
+    """Get the full name of a model class
+
+    Args:
+        model_type (string): Short name (e.g., "sklearn") or full name of the class
+    Returns:
+        (string) Full name of the class
+    """
+    class_name = model_types.get(model_type, model_type)
+    if not class_name.startswith('dlhub_sdk.models.'):
+        raise ValueError('Model class must be from the dlhub_sdk.models package: {}'
+                         .format(model_type))
+    return class_name
+
+
+def _get_model_class(model_type):
+    """Get a model class
+
+    Args:
+        model_type (string): Short name (e.g., "sklearn") or full name of the class
+    Returns:
+        (type) Model class
+    """
+    module, _, name = _get_class_name(model_type).rpartition('.')
+    return getattr(import_module(module), name)
+
+
+def _apply_metadata(model, metadata):
+    """Set the metadata of a model
+
+    Args:
+        model (BaseServableModel): Model to be modified
+        metadata (dict): Names of functions of the model and their arguments
+    """
+    for name, value in metadata.items():
+        if not name.startswith(('set_', 'add_')):
+            raise ValueError('Metadata must be set with a "set_" or "add_" function: {}'
+                             .format(name))
+        function = getattr(model, name)
+        if isinstance(value, dict):
+            function(**value)
+        else:
+            function(value)
+
+
+def read_manifest(path):
+    """Read the entries of a manifest
+
+    Args:
+        path (string): Path to a JSON list or a file with one JSON document per line
+    Returns:
+        ([dict]) Entries of the manifest
+    """
+    with open(path) as fp:
+        content = fp.read()
+    if content.lstrip().startswith('['):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+def describe_artifact(entry, metadata=None):
+    """Create the description of a single servable
+
+    Args:
+        entry (dict): Entry from a manifest
+        metadata (dict): Metadata shared by all servables
+    Returns:
+        (dict) Description of the servable, as produced by ``to_dict``. Includes the
+        name of the model class, for use with
+        :func:`unserialize_object <dlhub_sdk.utils.unserialize_object>`
+    """
+    model = _get_model_class(entry['type']).create_model(**entry.get('args', {}))
+    _apply_metadata(model, metadata or {})
+    _apply_metadata(model, entry.get('metadata', {}))
+    return model.to_dict(save_class_data=True)
+
+
+def _warm_up(class_names, threads_per_worker):
+    """Prepare a worker process to describe models, if it has not been already
+
+    Args:
+        class_names ([string]): Full names of the model classes that will be described
+        threads_per_worker (int): Maximum number of threads for numerical libraries
+    """
+    global _warmed_up
+    if _warmed_up:
+        return
+    _warmed_up = True
+
+    for class_name in class_names:
+        for library in [class_name.rpartition('.')[0]] + _frameworks.get(class_name, []):
+            try:
+                import_module(library)
+            except ImportError:
+                pass  # Reported when the model is created
+
+    # Limit the thread pools of libraries that were loaded before the environment was set
+    if threads_per_worker is not None and threadpool_limits is not None:
+        threadpool_limits(threads_per_worker)
+
+
+def _describe(index, entry, metadata, warm_up=None):
+    """Describe a servable, capturing any error
+
+    Args:
+        index (int): Position of the entry in the manifest
+        entry (dict): Entry from a manifest
+        metadata (dict): Metadata shared by all servables
+        warm_up (tuple): Arguments to :func:`_warm_up`, which is called before the first
+            servable described by a worker process
+    Returns:
+        (dict) Index of the entry and either the description or a message for the error
+    """
+    if warm_up is not None:
+        _warm_up(*warm_up)
+    try:
+        return {'index': index, 'document': describe_artifact(entry, metadata)}
+    except Exception as exc:
+        return {'index': index, 'error': '{}: {}'.format(type(exc).__name__, exc)}
+
+
+def _pop_result(pending, ordered):
+    """Wait for a result and stop tracking its task
+
+    Args:
+        pending (deque): Futures of the tasks that have been submitted, in order
+        ordered (bool): Whether to get the result of the first task, rather than of
+            any task that has completed
+    Returns:
+        (dict) Result of the task
+    """
+    if ordered:
+        future = pending.popleft()
+    else:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        future = next(f for f in pending if f in done)
+        pending.remove(future)
+    return future.result()
+
+
+def describe_artifacts(entries, metadata=None, processes=None, ordered=True,
+                       threads_per_worker=None):
+    """Create the descriptions of many servables in parallel
+
+    Errors in one entry do not stop the others from being described.
+
+    Args:
+        entries ([dict]): Entries from a manifest
+        metadata (dict): Metadata shared by all servables
+        processes (int): Number of worker processes. Default is the number of CPUs.
+            Set to 0 to describe the servables in the current process
+        ordered (bool): Whether to produce the results in the order of the entries,
+            rather than as they are completed
+        threads_per_worker (int): Maximum number of threads used by numerical libraries
+            in each worker. Set through environment variables, which are changed in the
+            current process while the workers run, and, if the ``threadpoolctl`` package
+            is installed, by limiting the libraries already loaded by the workers.
+            Default is the library defaults
+    Yields:
+        (dict) Result for each entry, with its ``index`` in ``entries`` and either the
+        description, ``document``, or the message for an ``error``
+    """
+    entries = list(entries)
+    class_names = set(model_types.get(e.get('type'), str(e.get('type'))) for e in entries)
+    class_names = sorted(c for c in class_names if c.startswith('dlhub_sdk.models.'))
+
+    if processes == 0:
+        for i, entry in enumerate(entries):
+            yield _describe(i, entry, metadata)
+        return
+
+    # Workers inherit the environment of this process when they are started
+    original_environ = dict((v, os.environ.get(v)) for v in _thread_variables)
+    if threads_per_worker is not None:
+        for variable in _thread_variables:
+            os.environ[variable] = str(threads_per_worker)
+
+    # Workers are prepared by their first task, as pools only take an initializer
+    #  from Python 3.7
+    warm_up = (class_names, threads_per_worker)
+    max_pending = 2 * (processes or os.cpu_count() or 1)
+    try:
+        with ProcessPoolExecutor(processes) as executor:
+            # Submit more entries only as results are produced
+            pending = deque()
+            for i, entry in enumerate(entries):
+                pending.append(executor.submit(_describe, i, entry, metadata, warm_up))
+                if len(pending) >= max_pending:
+                    yield _pop_result(pending, ordered)
+            while len(pending) > 0:
+                yield _pop_result(pending, ordered)
+    finally:
+        for variable, value in original_environ.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+
+
+def write_descriptions(entries, path, metadata=None, processes=None, ordered=True,
+                       threads_per_worker=None):
+    """Describe many servables, writing each result to a file as it is produced
+
+    Args:
+        entries ([dict]): Entries from a manifest
+        path (string): Path of the output file. Each line holds the result for one entry,
+            as produced by :func:`describe_artifacts`
+        metadata (dict): Metadata shared by all servables
+        processes (int): Number of worker processes. See :func:`describe_artifacts`
+        ordered (bool): Whether to write the results in the order of the entries
+        threads_per_worker (int): Maximum number of threads used by numerical libraries
+    Returns:
+        (int) Number of entries that could not be described
+    """
+    failures = 0
+    with open(path, 'w') as fp:
+        for result in describe_artifacts(entries, metadata, processes, ordered,
+                                         threads_per_worker):
+            if 'error' in result:
+                failures += 1
+                logger.warning('Failed to describe entry {}: {}'.format(result['index'],
+                                                                        result['error']))
+            fp.write(json.dumps(result) + '\n')
+            fp.flush()
+    return failures
+
+
+def main(args=None):
+    """Describe the servables in a manifest from the command line"""
+    parser = ArgumentParser(description='Describe many servables in parallel')
+    parser.add_argument('manifest', help='Path to the manifest of servables')
+    parser.add_argument('output', help='Path of the file in which to write the descriptions')
+    parser.add_argument('--metadata', default=None,
+                        help='Path to a JSON file with the metadata shared by all servables')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Number of worker processes. Default is the number of CPUs')
+    parser.add_argument('--unordered', action='store_true',
+                        help='Write the descriptions as they are completed')
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help='Maximum number of threads used by numerical libraries in '
+                             'each worker')
+    args = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+    metadata = None
+    if args.metadata is not None:
+        with open(args.metadata) as fp:
+            metadata = json.load(fp)
+    entries = read_manifest(args.manifest)
+    failures = write_descriptions(entries, args.output, metadata, args.processes,
+                                  not args.unordered, args.threads_per_worker)
+    logger.info('Described {} of {} servables'.format(len(entries) - failures, len(entries)))
+    return 1 if failures > 0 else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,421 @@
+"""A local copy of the DLHub search index that can be queried offline"""
+from threading import Lock
+import json
+import logging
+import sqlite3
+
+from mdf_toolbox import gmeta_pop
+from mdf_toolbox.search_helper import SEARCH_LIMIT
+
+from dlhub_sdk.utils.search import filter_latest_sorted, get_method_details, iter_search_pages
+
+logger = logging.getLogger(__name__)
+
+_tables = """
+CREATE TABLE IF NOT EXISTS servables (
+    shorthand_name TEXT NOT NULL COLLATE NOCASE,
+    publication_date INTEGER NOT NULL,
+    owner TEXT COLLATE NOCASE,
+    name TEXT COLLATE NOCASE,
+    record TEXT NOT NULL,
+    PRIMARY KEY (shorthand_name, publication_date)
+);
+CREATE TABLE IF NOT EXISTS domains (
+    shorthand_name TEXT NOT NULL COLLATE NOCASE,
+    publication_date INTEGER NOT NULL,
+    domain TEXT NOT NULL COLLATE NOCASE
+);
+CREATE TABLE IF NOT EXISTS authors (
+    shorthand_name TEXT NOT NULL COLLATE NOCASE,
+    publication_date INTEGER NOT NULL,
+    family_name TEXT COLLATE NOCASE,
+    given_name TEXT COLLATE NOCASE
+);
+CREATE TABLE IF NOT EXISTS dois (
+    shorthand_name TEXT NOT NULL COLLATE NOCASE,
+    publication_date INTEGER NOT NULL,
+    doi TEXT NOT NULL COLLATE NOCASE
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS servables_owner ON servables (owner, name, publication_date);
+CREATE INDEX IF NOT EXISTS servables_name ON servables (name);
+CREATE INDEX IF NOT EXISTS domains_domain ON domains (domain, shorthand_name, publication_date);
+CREATE INDEX IF NOT EXISTS authors_name ON authors (family_name, given_name,
+                                                   shorthand_name, publication_date);
+CREATE INDEX IF NOT EXISTS dois_doi ON dois (doi, shorthand_name, publication_date);
+"""
+
+
+def _extract_fields(record):
+    """Get the values stored in the field tables for a record
+
+    Args:
+        record (dict): Metadata record of a servable
+    Returns:
+        (dict) Rows to add to each field table, without the key of the record
+    """
+    datacite = record.get('datacite', {})
+    authors = []
+    for creator in datacite.get('creators', []):
+        family = creator.get('familyName')
+        given = creator.get('givenName')
+        if family is None and 'creatorName' in creator:
+            family, _, given = (x.strip() for x in creator['creatorName'].partition(','))
+        authors.append((family, given))
+    return {
+        'domains': [(d,) for d in record['dlhub'].get('domains', [])],
+        'authors': authors,
+        'dois': [(r['relatedIdentifier'],) for r in datacite.get('relatedIdentifiers', [])
+                 if 'relatedIdentifier' in r]
+    }
+
+
+class CatalogQuery:
+    """Query of a :class:`LocalCatalog`
+
+    Offers the same ``match_*`` methods as
+    :class:`DLHubSearchHelper <dlhub_sdk.utils.search.DLHubSearchHelper>`.
+    All terms must match unless noted otherwise.
+    """
+
+    def __init__(self, catalog):
+        """
+        Args:
+            catalog (LocalCatalog): Catalog to be queried
+        """
+        self.catalog = catalog
+        self._clauses = []
+        self._params = []
+
+    def _match_field_table(self, table, conditions, values):
+        """Make a clause that matches a row in one of the field tables
+
+        Args:
+            table (string): Name of the table
+            conditions ([string]): Columns that must equal the values
+            values (list): Values of the columns
+        Returns:
+            (string) SQL clause
+        """
+        where = ' AND '.join('f.{} = ?'.format(c) for c in conditions)
+        self._params.extend(values)
+        return ('EXISTS (SELECT 1 FROM {} f WHERE f.shorthand_name = s.shorthand_name '
+                'AND f.publication_date = s.publication_date AND {})').format(table, where)
+
+    def match_owner(self, owner):
+        """Add a model owner to the query.
+
+        Args:
+            owner (str): The name of the owner of the model.
+        Returns:
+            CatalogQuery: Self
+        """
+        if owner:
+            self._clauses.append('s.owner = ?')
+            self._params.append(owner)
+        return self
+
+    def match_servable(self, servable_name=None, owner=None, publication_date=None):
+        """Add identifying model information to the query.
+
+        Args:
+            servable_name (str): The name of the model
+            owner (str): The name of the owner of the model
+            publication_date (int): The UNIX timestamp for when the model was published
+        Returns:
+            CatalogQuery: Self
+        """
+        if servable_name:
+            self._clauses.append('s.name = ?')
+            self._params.append(servable_name)
+        if publication_date:
+            self._clauses.append('s.publication_date = ?')
+            self._params.append(int(publication_date))
+        return self.match_owner(owner)
+
+    def match_authors(self, authors, match_all=True):
+        """Add authors to the query.
+
+        Args:
+            authors (str or list of str): The authors to match, in
+                "Family Name, Given Name" format. The given name is optional
+            match_all (bool): If ``True``, will require all authors be on any results.
+                If ``False``, will only require one author to be in results.
+        Returns:
+            CatalogQuery: Self
+        """
+        if not authors:
+            return self
+        if isinstance(authors, str):
+            authors = [authors]
+        clauses = []
+        for author in authors:
+            names = [x.strip() for x in author.split(',', 1)]
+            columns = ['family_name', 'given_name'][:len(names)]
+            clauses.append(self._match_field_table('authors', columns, names))
+        self._clauses.append('({})'.format((' AND ' if match_all else ' OR ').join(clauses)))
+        return self
+
+    def match_domains(self, domains, match_all=True):
+        """Add domains to the query.
+
+        Args:
+            domains (str or list of str): The domains to match.
+            match_all (bool): If ``True``, will require all domains be on any results.
+                If ``False``, will only require one domain to be in results.
+        Returns:
+            CatalogQuery: Self
+        """
+        if not domains:
+            return self
+        if isinstance(domains, str):
+            domains = [domains]
+        clauses = [self._match_field_table('domains', ['domain'], [d]) for d in domains]
+        self._clauses.append('({})'.format((' AND ' if match_all else ' OR ').join(clauses)))
+        return self
+
+    def match_doi(self, doi):
+        """Add a DOI to the query.
+
+        Args:
+            doi (str): The DOI to match.
+        Returns:
+            CatalogQuery: Self
+        """
+        if doi:
+            self._clauses.append(self._match_field_table('dois', ['doi'], [doi]))
+        return self
+
+    def search(self, limit=None, only_latest=False):
+        """Get the records that match the query
+
+        Args:
+            limit (int): Maximum number of records to return. Default is no limit
+            only_latest (bool): Whether to return only the latest version of each servable
+        Returns:
+            ([dict]) Matching records, sorted by owner, name and then newest first
+        """
+        sql = 'SELECT s.record FROM servables s'
+        if len(self._clauses) > 0:
+            sql += ' WHERE ' + ' AND '.join(self._clauses)
+        sql += ' ORDER BY s.owner, s.name, s.publication_date DESC'
+        results = (json.loads(r[0]) for r in self.catalog._execute(sql, self._params))
+        if only_latest:
+            results = filter_latest_sorted(results)
+        return list(results if limit is None else (r for _, r in zip(range(limit), results)))
+
+
+class LocalCatalog:
+    """Copy of the metadata records in DLHub, stored in a SQLite database
+
+    Call :meth:`sync` to add the records published since the last synchronization,
+    then query the records without contacting DLHub using :attr:`query` or the
+    ``search_by_*`` and ``describe_*`` functions, which match those of
+    :class:`DLHubClient <dlhub_sdk.client.DLHubClient>`.
+
+    The owner, name, domains, authors and related DOIs of each record are indexed.
+    """
+
+    def __init__(self, path=':memory:'):
+        """
+        Args:
+            path (string): Path to the database. Default is to hold the database in memory
+        """
+        self.path = path
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(_tables)
+
+    def close(self):
+        """Close the database"""
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self._execute('SELECT COUNT(*) FROM servables')[0][0]
+
+    def _execute(self, sql, params=()):
+        """Run a query and get all of the rows it produces"""
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    @property
+    def last_publication_date(self):
+        """int: Publication date of the most recent record in the catalog"""
+        rows = self._execute("SELECT value FROM sync_state WHERE key = 'last_publication_date'")
+        return int(rows[0][0]) if len(rows) > 0 else None
+
+    def add_records(self, records):
+        """Add records to the catalog, replacing any with the same name and publication date
+
+        Args:
+            records (iterable of dict): Metadata records of servables
+        Returns:
+            (int) Number of records added
+        """
+        count = 0
+        latest = self.last_publication_date
+        with self._lock, self._connection:
+            for record in records:
+                dlhub = record['dlhub']
+                if 'shorthand_name' not in dlhub or 'publication_date' not in dlhub:
+                    logger.warning('Skipping record without shorthand_name or publication_date')
+                    continue
+                key = (dlhub['shorthand_name'], int(dlhub['publication_date']))
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO servables VALUES (?, ?, ?, ?, ?)',
+                    key + (dlhub.get('owner'), dlhub.get('name'), json.dumps(record)))
+
+                # Replace the indexed fields
+                for table, rows in _extract_fields(record).items():
+                    self._connection.execute(
+                        'DELETE FROM {} WHERE shorthand_name = ? AND publication_date = ?'
+                        .format(table), key)
+                    columns = ', '.join('?' * (len(rows[0]) + 2)) if len(rows) > 0 else None
+                    if columns is not None:
+                        self._connection.executemany(
+                            'INSERT INTO {} VALUES ({})'.format(table, columns),
+                            [key + row for row in rows])
+
+                latest = key[1] if latest is None else max(latest, key[1])
+                count += 1
+
+            if latest is not None:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO sync_state VALUES ('last_publication_date', ?)",
+                    (str(latest),))
+        return count
+
+    def sync(self, client, full=False, page_size=1000, max_concurrency=4):
+        """Add the records published to DLHub since the last synchronization
+
+        Records are retrieved in order of publication date, so a synchronization that is
+        interrupted can be continued by calling this function again.
+
+        Args:
+            client (DLHubClient): Client used to query DLHub
+            full (bool): Whether to retrieve all records, rather than only new ones
+            page_size (int): Number of records to retrieve in each request
+            max_concurrency (int): Maximum number of requests to make at once
+        Returns:
+            (int) Number of records added or updated
+        """
+        since = None if full else self.last_publication_date
+        count = 0
+        while True:
+            # Get the records published since the last one in the catalog
+            query = client.query.match_field('dlhub.type', 'servable')
+            if since is not None:
+                query.match_range('dlhub.publication_date', since, '*')
+            query = query.add_sort('dlhub.publication_date', ascending=True).get_search_query()
+            index = client.query.index
+            reply = client.search_client.post_search(
+                index, dict(query, offset=0, limit=page_size)).data
+            total = reply['total']
+
+            # Add records in pages, never passing the maximum offset of Globus Search
+            count += self.add_records(gmeta_pop(reply))
+            for page in iter_search_pages(client.search_client, index, query,
+                                          min(total, SEARCH_LIMIT), page_size,
+                                          max_concurrency, start=page_size):
+                count += self.add_records(page)
+            if total <= SEARCH_LIMIT:
+                return count
+
+            # Continue from the most recent record
+            latest = self.last_publication_date
+            if latest == since:
+                raise RuntimeError('More than {} records share the publication date {}'
+                                   .format(SEARCH_LIMIT, since))
+            since = latest
+
+    @property
+    def query(self):
+        """Create a query of the catalog"""
+        return CatalogQuery(self)
+
+    def list_servables(self):
+        """Get a list of the servables in the catalog
+
+        Returns:
+            [string]: List of all servable names in username/servable_name format
+        """
+        return [r[0] for r in self._execute(
+            'SELECT DISTINCT shorthand_name FROM servables ORDER BY owner, name')]
+
+    def describe_servable(self, name):
+        """Get the description of the latest version of a servable
+
+        Args:
+            name (string): DLHub name of the servable of the form <user>/<servable_name>
+        Returns:
+            dict: Summary of the servable
+        """
+        rows = self._execute('SELECT record FROM servables WHERE shorthand_name = ? '
+                             'ORDER BY publication_date DESC LIMIT 1', (name,))
+        if len(rows) == 0:
+            raise AttributeError('No such servable: {}'.format(name))
+        return json.loads(rows[0][0])
+
+    def describe_methods(self, name, method=None):
+        """Get the description for the method(s) of a certain servable
+
+        Args:
+            name (string): DLHub name of the servable of the form <user>/<servable_name>
+            method (string): Optional: Name of the method
+        Returns:
+             dict: Description of a certain method if ``method`` provided, all methods
+                if the method name was not provided.
+        """
+        return get_method_details(self.describe_servable(name), method)
+
+    def search_by_servable(self, servable_name=None, owner=None, version=None,
+                           only_latest=True, limit=None):
+        """Search by the ownership, name, or version of a servable
+
+        See :meth:`DLHubClient.search_by_servable <dlhub_sdk.client.DLHubClient.search_by_servable>`
+        """
+        if not servable_name and not owner and not version:
+            raise ValueError("One of 'servable_name', 'owner', or 'publication_date' is required.")
+        return self.query.match_servable(servable_name, owner, version)\
+            .search(limit=limit, only_latest=only_latest)
+
+    def search_by_authors(self, authors, match_all=True, limit=None, only_latest=True):
+        """Execute a search for servables from certain authors.
+
+        See :meth:`DLHubClient.search_by_authors <dlhub_sdk.client.DLHubClient.search_by_authors>`
+        """
+        return self.query.match_authors(authors, match_all=match_all)\
+            .search(limit=limit, only_latest=only_latest)
+
+    def search_by_domains(self, domains, match_all=True, limit=None, only_latest=True):
+        """Execute a search for servables in certain fields of science
+
+        Args:
+            domains (str or list of str): The domains to match
+            match_all (bool): Whether all domains must match
+            limit (int): The maximum number of results to return
+            only_latest (bool): Whether to return only the latest version of each servable
+        Returns:
+            [dict]: List of matching servables
+        """
+        return self.query.match_domains(domains, match_all=match_all)\
+            .search(limit=limit, only_latest=only_latest)
+
+    def search_by_related_doi(self, doi, limit=None, only_latest=True):
+        """Get all of the servables associated with a certain publication
+
+        See :meth:`DLHubClient.search_by_related_doi
+        <dlhub_sdk.client.DLHubClient.search_by_related_doi>`
+        """
+        return self.query.match_doi(doi).search(limit=limit, only_latest=only_latest)
@@ -1,20 +1,37 @@
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
 from tempfile import mkstemp
+from threading import Lock
 
-import jsonpickle
 import requests
+from globus_sdk import GlobusAPIError
 from globus_sdk.base import BaseClient, slash_join
-from mdf_toolbox import login, logout
-from mdf_toolbox.search_helper import SEARCH_LIMIT
+from globus_sdk.response import GlobusHTTPResponse
 
-from dlhub_sdk.config import DLHUB_SERVICE_ADDRESS, CLIENT_ID
-from dlhub_sdk.utils.schemas import validate_against_dlhub_schema
-from dlhub_sdk.utils.search import DLHubSearchHelper, get_method_details, filter_latest
+from dlhub_sdk.config import DLHUB_SERVICE_ADDRESS
+from dlhub_sdk.utils.auth import DeferredAuthorizer, get_credentials
+from dlhub_sdk.utils.cache import TTLCache
+from dlhub_sdk.utils.http import PooledHTTPAdapter, mount_adapter
+from dlhub_sdk.utils.multipart import MultipartBody
+from dlhub_sdk.utils.search import (DLHubSearchHelper, get_method_details, filter_latest,
+                                    iter_servables, project_fields)
+from dlhub_sdk.utils.serialization import (encode_run_inputs, prepare_run_request,
+                                           decode_run_result)
+from dlhub_sdk.utils.upload import ResumableUpload
 
 
-# Directory for authenticaation tokens
-_token_dir = os.path.expanduser("~/.dlhub/credentials")
+# Directory holding the files of servables run with the local backend
+_servable_dir = os.path.expanduser("~/.dlhub/servables")
+
+
+class _RunResponse(GlobusHTTPResponse):
+    """Reply from a servable, which keeps the body as bytes as it may not be JSON"""
+
+    def __init__(self, http_response, client=None):
+        super(_RunResponse, self).__init__(http_response, client=client)
+        self.content = http_response.content
 
 
 class DLHubClient(BaseClient):
@@ -32,7 +49,10 @@ class DLHubClient(BaseClient):
     and providing that authorizer to the initializer (e.g., ``DLHubClient(auth)``)"""
 
     def __init__(self, dlh_authorizer=None, search_client=None, http_timeout=None,
-                 force_login=False, **kwargs):
+                 force_login=False, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True, max_workers=None, compression=None, compression_level=None,
+                 compression_threshold=1024, cache_size=256, cache_ttl=60, cache_stale_ttl=0,
+                 transport=None, result_cache=None, **kwargs):
         """Initialize the client
 
         Args:
@@ -45,26 +65,194 @@ class DLHubClient(BaseClient):
                 If ``None``, will be created.
             http_timeout (int): Timeout for any call to service in seconds. (default is no timeout)
             force_login (bool): Whether to force a login to get new credentials.
-                A login will always occur if ``dlh_authorizer`` or ``search_client``
-                are not provided.
-        Keyword arguments are the same as for BaseClient.
+                Otherwise, if ``dlh_authorizer`` or ``search_client`` are not provided,
+                the saved credentials are loaded (logging in if needed) when the client
+                first contacts DLHub or Globus Search.
+            pool_connections (int): Number of hosts for which to keep a pool of connections
+            pool_maxsize (int): Maximum number of persistent connections to each host.
+                Set this to at least the number of threads sharing the client
+            pool_block (bool): Whether to wait for a free connection when ``pool_maxsize``
+                connections to a host are in use, rather than opening a temporary connection
+            keep_alive (bool): Whether to send TCP keep-alive probes on idle connections
+            max_workers (int): Number of threads used to run servables invoked with
+                :meth:`submit`. Defaults to ``pool_maxsize``
+            compression (string): Codec used to compress the inputs sent to servables,
+                "gzip" or "zstd". Default is to not compress
+            compression_level (int): Compression level. Default is the codec's default level
+            compression_threshold (int): Minimum size of inputs, in bytes, to compress
+            cache_size (int): Maximum number of search results and servable descriptions
+                to keep in memory
+            cache_ttl (float): Time that cached search results are used before the query
+                is run again, in seconds. Set to 0 to disable caching
+            cache_stale_ttl (float): Time after ``cache_ttl`` during which expired results
+                are still returned while they are refreshed in the background, in seconds
+            transport (:class:`BaseAdapter <requests.adapters.BaseAdapter>`): Adapter used to
+                send all requests to DLHub and Globus Search, such as a
+                :class:`RecordingAdapter <dlhub_sdk.utils.transport.RecordingAdapter>` or
+                :class:`ReplayAdapter <dlhub_sdk.utils.transport.ReplayAdapter>`. Default is
+                a pool of persistent connections configured by the ``pool_*`` and
+                ``keep_alive`` options
+            result_cache (:class:`ResultCache <dlhub_sdk.utils.results.ResultCache>`): Cache
+                for the results of servables run with :meth:`run` or :meth:`submit`.
+                Default is to always send the inputs to DLHub
+        Keyword arguments are the same as for BaseClient. Set ``base_url`` to use a DLHub
+        service other than the public one, such as a
+        :class:`LocalDLHubServer <dlhub_sdk.server.LocalDLHubServer>`.
         """
-        if force_login or not dlh_authorizer or not search_client:
-
-            auth_res = login(services=["search", "dlhub"], app_name="DLHub_Client",
-                             client_id=CLIENT_ID, clear_old_tokens=force_login,
-                             token_dir=_token_dir)
-            dlh_authorizer = auth_res["dlhub"]
-            self._search_client = auth_res["search"]
+        # Credentials that were not provided are loaded when first needed
+        self._login_lock = Lock()
+        self._search_client_instance = search_client or None
+        if not dlh_authorizer:
+            dlh_authorizer = DeferredAuthorizer(self._get_dlh_authorizer)
 
+        base_url = kwargs.pop('base_url', DLHUB_SERVICE_ADDRESS)
         super(DLHubClient, self).__init__("DLHub", environment='dlhub', authorizer=dlh_authorizer,
-                                          http_timeout=http_timeout, base_url=DLHUB_SERVICE_ADDRESS,
-                                          **kwargs)
+                                          http_timeout=http_timeout, base_url=base_url, **kwargs)
+
+        # Route all requests through a shared pool of persistent connections
+        if transport is None:
+            transport = PooledHTTPAdapter(pool_connections=pool_connections,
+                                          pool_maxsize=pool_maxsize, pool_block=pool_block,
+                                          keep_alive=keep_alive)
+        self._adapter = transport
+        self._session = mount_adapter(requests.Session(), self._adapter)
+        if getattr(self._search_client_instance, '_session', None) is not None:
+            mount_adapter(self._search_client_instance._session, self._adapter)
+
+        # Settings for compressing requests
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_threshold = compression_threshold
+
+        # Cache for the results of queries to Globus Search
+        self._cache = TTLCache(cache_size, cache_ttl, cache_stale_ttl)
+
+        # Results of servables, reused for identical inputs
+        self.result_cache = result_cache
+
+        # Compiled input validators, keyed by servable version and method
+        self._input_validators = {}
+        self._validator_lock = Lock()
+
+        # Runner for servables invoked with the local backend, created when first needed
+        self._local_runner = None
+
+        # Thread pool for asynchronous requests, created when first needed
+        self._max_workers = max_workers if max_workers is not None else pool_maxsize
+        self._executor = None
+        self._executor_lock = Lock()
+
+        if force_login:
+            self._login(force=True)
+
+    def __getstate__(self):
+        state = super(DLHubClient, self).__getstate__()
+        state['_executor'] = None
+        state['_local_runner'] = None
+        del state['_executor_lock']
+        del state['_login_lock']
+        del state['_validator_lock']
+        return state
+
+    def __setstate__(self, state):
+        super(DLHubClient, self).__setstate__(state)
+        self._executor_lock = Lock()
+        self._login_lock = Lock()
+        self._validator_lock = Lock()
+
+    def _login(self, force=False):
+        """Load the saved credentials for DLHub and Globus Search, logging in if needed
+
+        Credentials given to the initializer are kept unless ``force`` is set.
+
+        Args:
+            force (bool): Whether to get new credentials
+        """
+        with self._login_lock:
+            if not force and not isinstance(self.authorizer, DeferredAuthorizer) \
+                    and self._search_client_instance is not None:
+                return
+
+            auth_res = get_credentials(force)
+            if force or isinstance(self.authorizer, DeferredAuthorizer):
+                self.authorizer = auth_res["dlhub"]
+            if force or self._search_client_instance is None:
+                self._search_client_instance = auth_res["search"]
+                mount_adapter(self._search_client_instance._session, self._adapter)
+
+    def _get_dlh_authorizer(self):
+        """Get the authorizer for DLHub, logging in if needed"""
+        if isinstance(self.authorizer, DeferredAuthorizer):
+            self._login()
+        return self.authorizer
+
+    @property
+    def _search_client(self):
+        """SearchClient: Client for Globus Search, created when first needed"""
+        if self._search_client_instance is None:
+            self._login()
+        return self._search_client_instance
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Shut down the threads used by :meth:`submit` and close all open connections"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+        self._session.close()
+
+    def clear_cache(self):
+        """Forget the cached results of search queries"""
+        self._cache.clear()
+
+    def _search_cached(self, query, limit=None, info=False):
+        """Execute a query, reusing the results of an identical recent query
+
+        Args:
+            query (DLHubSearchHelper): Query to execute
+            limit (int): Maximum number of entries to return
+            info (bool): Whether to also return information about the query
+        Returns:
+            Same as :meth:`DLHubSearchHelper.search`. The results are shared with the
+            cache and must not be modified
+        """
+        key = json.dumps([query.get_search_query(limit), info], sort_keys=True)
+        return self._cache.get(key, lambda: query.search(limit=limit, info=info))
+
+    @staticmethod
+    def _prepare_results(results, only_latest, fields):
+        """Filter and copy search results before returning them to the user
+
+        Args:
+            results ([dict]): Results of a search
+            only_latest (bool): Whether to return only the latest version of each servable
+            fields ([str]): Fields to keep, see :func:`~dlhub_sdk.utils.search.project_fields`
+        Returns:
+            ([dict]) Copy of the filtered results
+        """
+        if only_latest:
+            results = filter_latest(results)
+        if fields is not None:
+            results = [project_fields(r, fields) for r in results]
+        return deepcopy(results)
 
     def logout(self):
         """Remove credentials from your local system"""
+        from mdf_toolbox import logout
         logout()
 
+    @property
+    def search_client(self):
+        """SearchClient: Client for Globus Search used by this client. Loads the saved
+        credentials, logging in if needed, the first time it is accessed"""
+        return self._search_client
+
     @property
     def query(self):
         """Access a query of the DLHub Search repository"""
@@ -76,35 +264,35 @@ class DLHubClient(BaseClient):
         res = self.get('/namespaces')
         return res.data['namespace']
 
-    def get_servables(self, only_latest_version=True):
+    def get_servables(self, only_latest_version=True, fields=None):
         """Get all of the servables available in the service
 
         Args:
             only_latest_version (bool): Whether to only return the latest version of each servable
+            fields ([str]): Fields to keep, see :func:`~dlhub_sdk.utils.search.project_fields`
         Returns:
             ([list]) Complete metadata for all servables found in DLHub
         """
+        return list(self.iter_servables(only_latest_version=only_latest_version, fields=fields))
 
-        # Get all of the servables
-        results, info = self.query.match_field('dlhub.type', 'servable')\
-            .add_sort('dlhub.owner', ascending=True).add_sort('dlhub.name', ascending=False)\
-            .add_sort('dlhub.publication_date', ascending=False).search(info=True)
-        if info['total_query_matches'] > SEARCH_LIMIT:
-            raise RuntimeError('DLHub contains more servables than we can return in one entry. '
-                               'DLHub SDK needs to be updated.')
-
-        if only_latest_version:
-            # Sort out only the most recent versions (they come first in the sorted list
-            names = set()
-            output = []
-            for r in results:
-                name = r['dlhub']['shorthand_name']
-                if name not in names:
-                    names.add(name)
-                    output.append(r)
-            results = output
+    def iter_servables(self, only_latest_version=True, page_size=1000, max_concurrency=4,
+                       fields=None):
+        """Iterate through all of the servables available in the service
 
-        return results
+        Results are retrieved in pages, several at a time, and are sorted by owner, then
+        by name. If there are more servables than Globus Search can return for a single
+        query, the servables of each owner are retrieved with a separate query.
+
+        Args:
+            only_latest_version (bool): Whether to only return the latest version of each servable
+            page_size (int): Number of servables to retrieve in each request
+            max_concurrency (int): Maximum number of requests to make at once
+            fields ([str]): Fields to keep, see :func:`~dlhub_sdk.utils.search.project_fields`
+        Yields:
+            (dict) Metadata for each servable
+        """
+        yield from iter_servables(self._search_client, only_latest_version, page_size,
+                                  max_concurrency, fields)
 
     def list_servables(self):
         """Get a list of the servables available in the service
@@ -112,9 +300,8 @@ class DLHubClient(BaseClient):
         Returns:
             [string]: List of all servable names in username/servable_name format
         """
-
-        servables = self.get_servables(only_latest_version=True)
-        return [x['dlhub']['shorthand_name'] for x in servables]
+        return [x['dlhub']['shorthand_name']
+                for x in self.iter_servables(fields=['dlhub.shorthand_name'])]
 
     def get_task_status(self, task_id):
         """Get the status of a DLHub task.
@@ -126,7 +313,7 @@ class DLHubClient(BaseClient):
         """
 
         r = self.get("{task_id}/status".format(task_id=task_id))
-        return r.json()
+        return r.data
 
     def describe_servable(self, name):
         """Get the description for a certain servable
@@ -136,14 +323,24 @@ class DLHubClient(BaseClient):
         Returns:
             dict: Summary of the servable
         """
+        return deepcopy(self._get_servable_record(name))
+
+    def _get_servable_record(self, name):
+        """Get the metadata for a servable from the cache of search results
+
+        Args:
+            name (string): DLHub name of the servable of the form <user>/<servable_name>
+        Returns:
+            dict: Metadata record, which is shared with the cache and must not be modified
+        """
         split_name = name.split('/')
         if len(split_name) < 2:
             raise AttributeError('Please enter name in the form <user>/<servable_name>')
 
         # Create a query for a single servable
         query = self.query.match_servable('/'.join(split_name[1:]))\
-            .match_owner(split_name[0]).add_sort("dlhub.publication_date", False)\
-            .search(limit=1)
+            .match_owner(split_name[0]).add_sort("dlhub.publication_date", False)
+        query = self._search_cached(query, limit=1)
 
         # Raise error if servable is not found
         if len(query) == 0:
@@ -164,40 +361,216 @@ class DLHubClient(BaseClient):
         metadata = self.describe_servable(name)
         return get_method_details(metadata, method)
 
-    def run(self, name, inputs, input_type='python'):
+    def get_input_validator(self, name, method='run'):
+        """Get a validator for the inputs of a servable method
+
+        Validators are compiled from the input type of the method and reused for
+        as long as the same version of the servable is the latest one.
+
+        Args:
+            name (string): DLHub name of the servable of the form <user>/<servable_name>
+            method (string): Name of the method
+        Returns:
+            (InputValidator) Validator for the inputs to the method
+        """
+        metadata = self._get_servable_record(name)
+        key = (name, metadata['dlhub'].get('publication_date'), method)
+        with self._validator_lock:
+            validator = self._input_validators.get(key)
+            if validator is None:
+                methods = metadata['servable']['methods']
+                if method not in methods:
+                    raise ValueError('No such method: {}'.format(method))
+                from dlhub_sdk.utils.validation import InputValidator
+                validator = InputValidator(methods[method]['input'])
+
+                # Replace the validator for any older version
+                for old_key in [k for k in self._input_validators if k[::2] == key[::2]]:
+                    del self._input_validators[old_key]
+                self._input_validators[key] = validator
+        return validator
+
+    @property
+    def local_runner(self):
+        """LocalServableRunner: Runner used for servables invoked with ``backend='local'``
+
+        Servables that have not been registered with the runner are described by
+        DLHub, and their files are read from ``servable_dir/<owner>/<name>``, where
+        ``servable_dir`` is ``~/.dlhub/servables`` unless set on the runner.
+        """
+        with self._executor_lock:
+            if self._local_runner is None:
+                from dlhub_sdk.local import LocalServableRunner
+                self._local_runner = LocalServableRunner(
+                    servable_dir=_servable_dir, metadata_source=self._get_servable_record)
+            return self._local_runner
+
+    def run(self, name, inputs, input_type='python', validate=False, backend='remote'):
         """Invoke a DLHub servable
 
         Args:
             name (string): DLHub name of the servable of the form <user>/<servable_name>
             inputs: Data to be used as input to the function. Can be a string of file paths or URLs
             input_type (string): How to send the data to DLHub. Can be "python" (which pickles
-                the data), "json" (which uses JSON to serialize the data), or "files" (which
-                sends the data as files).
+                the data), "json" (which uses JSON to serialize the data), "pickle5" (which
+                pickles the data and sends large buffers, such as the memory of NumPy arrays,
+                as binary data without copying them), or "files" (which sends the data as files).
+            validate (bool): Whether to check the inputs against the input type of the
+                servable before sending them. Raises an :class:`InputValidationError
+                <dlhub_sdk.utils.validation.InputValidationError>` if they do not match
+            backend (string): Where to run the servable. "remote" to send the inputs to
+                DLHub, or "local" to run it in this process using :attr:`local_runner`,
+                in which case ``input_type`` is ignored
         Returns:
-            Results of running the servable
+            Results of running the servable. If the client has a ``result_cache``,
+            results of remote runs are taken from the cache when the same version of the
+            servable has already been run on the same inputs
         """
-        servable_path = 'servables/{name}/run'.format(name=name)
+        if validate:
+            self.get_input_validator(name).validate(inputs)
+        if backend == 'local':
+            return self.local_runner.run(name, inputs)
+        elif backend != 'remote':
+            raise ValueError('Unknown backend: {}'.format(backend))
+
+        def _run_remote():
+            data, content_type = encode_run_inputs(inputs, input_type)
+            return self._send_run_request(name, data, content_type)
 
-        # Prepare the data to be sent to DLHub
-        if input_type == 'python':
-            # data = {'python': codecs.encode(pkl.dumps(inputs), 'base64').decode()}
-            data = {'python': jsonpickle.encode(inputs)}
-        elif input_type == 'json':
-            data = {'data': inputs}
-        elif input_type == 'files':
-            raise NotImplementedError('Files support is not yet implemented')
+        if self.result_cache is None:
+            return _run_remote()
+
+        # Key the results on the latest version of the servable. Results of servables
+        #  without a publication date cannot be told apart from those of later versions
+        version = self._get_servable_record(name)['dlhub'].get('publication_date')
+        if version is None:
+            return _run_remote()
+        return self.result_cache.get(name, version, (input_type, inputs), _run_remote)
+
+    def submit(self, name, inputs, input_type='python', validate=False, backend='remote'):
+        """Invoke a DLHub servable without waiting for the result
+
+        The request is sent from a pool of threads owned by this client, which share
+        the client's persistent connections.
+
+        Args:
+            name (string): DLHub name of the servable of the form <user>/<servable_name>
+            inputs: Data to be used as input to the function
+            input_type (string): How to send the data to DLHub. See :meth:`run`
+            validate (bool): Whether to check the inputs before sending them. See :meth:`run`
+            backend (string): Where to run the servable. See :meth:`run`
+        Returns:
+            (concurrent.futures.Future) Future that will hold the results of the servable
+        """
+        if validate:
+            self.get_input_validator(name).validate(inputs)
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self._max_workers)
+            return self._executor.submit(self.run, name, inputs, input_type, backend=backend)
+
+    def run_batch(self, name, inputs, input_type='python', batch_size=128, max_concurrency=4,
+                  max_payload_size=None, deduplicate=True, validate=False):
+        """Invoke a DLHub servable on a large number of records
+
+        Splits the records into batches along the first axis and sends the batches to
+        DLHub concurrently. Each record is assumed to produce a single entry in the
+        output of the servable (e.g., a servable that runs a scikit-learn model on a
+        list of records).
+
+        Args:
+            name (string): DLHub name of the servable of the form <user>/<servable_name>
+            inputs (list or ndarray): Records to be evaluated
+            input_type (string): How to send the data to DLHub. See :meth:`run`
+            batch_size (int): Maximum number of records to send in a single request
+            max_concurrency (int): Maximum number of requests to have in flight at once
+            max_payload_size (int): Maximum size of a request body in bytes. Batches with
+                larger bodies are split until they fit. Default is no limit
+            deduplicate (bool): Whether to send only one copy of records that appear
+                multiple times in ``inputs``
+            validate (bool): Whether to check all of the records before sending any batches.
+                See :meth:`run`
+        Returns:
+            ([list]) Result for each record, in the same order as ``inputs``
+        """
+
+        from dlhub_sdk.utils.batch import deduplicate_inputs, split_into_batches
+
+        # Check all records at once, so that arrays are checked by their shape and type
+        if validate:
+            self.get_input_validator(name).validate(inputs)
+
+        # Remove duplicated records
+        if deduplicate:
+            unique, inverse = deduplicate_inputs(inputs)
         else:
-            raise ValueError('Input type not recognized: {}'.format(input_type))
+            unique, inverse = inputs, range(len(inputs))
+
+        # Encode and send each batch from a separate thread
+        batches = split_into_batches(unique, batch_size)
+        with ThreadPoolExecutor(max_concurrency) as executor:
+            futures = [executor.submit(self._run_batch_chunk, name, batch, input_type,
+                                       max_payload_size) for batch in batches]
+            unique_results = []
+            for future in futures:
+                unique_results.extend(future.result())
+
+        # Re-assemble the results in the original order
+        return [unique_results[i] for i in inverse]
+
+    def _run_batch_chunk(self, name, batch, input_type, max_payload_size):
+        """Run a servable on a batch of records, splitting it if the request is too large
+
+        Args:
+            name (string): DLHub name of the servable
+            batch (list or ndarray): Records to be evaluated
+            input_type (string): How to send the data to DLHub
+            max_payload_size (int): Maximum size of the request body in bytes
+        Returns:
+            ([list]) Result for each record in the batch
+        """
+        if input_type == 'json' and hasattr(batch, 'tolist'):
+            batch = batch.tolist()
+        data, content_type = encode_run_inputs(batch, input_type)
+
+        # Split the batch in two if it is too large
+        if max_payload_size is not None and len(data) > max_payload_size and len(batch) > 1:
+            midpoint = len(batch) // 2
+            return self._run_batch_chunk(name, batch[:midpoint], input_type, max_payload_size) \
+                + self._run_batch_chunk(name, batch[midpoint:], input_type, max_payload_size)
+
+        results = self._send_run_request(name, data, content_type)
+        if isinstance(results, (dict, str)) or not hasattr(results, '__len__') \
+                or len(results) != len(batch):
+            raise ValueError('Servable did not return one result per record')
+        return list(results)
+
+    def _send_run_request(self, name, data, content_type='application/json'):
+        """Send serialized inputs to a servable
+
+        Args:
+            name (string): DLHub name of the servable of the form <user>/<servable_name>
+            data (string or MultipartBody): Request body, as produced by
+                :func:`encode_run_inputs <dlhub_sdk.utils.serialization.encode_run_inputs>`
+            content_type (string): Content type of the request body
+        Returns:
+            Results of running the servable
+        """
+        servable_path = 'servables/{name}/run'.format(name=name)
+        data, headers = prepare_run_request(data, content_type, self.compression,
+                                            self.compression_level, self.compression_threshold)
 
         # Send the data to DLHub
-        r = self.post(servable_path, json_body=data)
+        r = self.post(servable_path, text_body=data, headers=headers,
+                      response_class=_RunResponse)
         if r.http_status != 200:
             raise Exception(r)
 
         # Return the result
-        return r.data
+        return decode_run_result(r.content, r.content_type)
 
-    def publish_servable(self, model):
+    def publish_servable(self, model, stream=False, deduplicate=False, part_size=None,
+                         upload_workers=4):
         """Submit a servable to DLHub
 
         If this servable has not been published before, it will be assigned a unique identifier.
@@ -207,6 +580,18 @@ class DLHubClient(BaseClient):
 
         Args:
             model (BaseMetadataModel): Servable to be submitted
+            stream (bool): Whether to send the ZIP file of the servable while it is being
+                created, rather than writing it to a temporary file first. Streaming
+                avoids staging large models on disk and compresses the files
+            deduplicate (bool): Whether to upload only the files whose contents DLHub
+                does not already have, such as the weights of a model whose metadata
+                changed. If any files are left out, the SHA-256 digest of every file is
+                sent along with the ZIP
+            part_size (int): If provided, upload the ZIP file in parts of this many bytes
+                that are sent in parallel and retried individually. An interrupted upload
+                resumes from the last completed part when the servable is published again.
+                Cannot be combined with ``stream``
+            upload_workers (int): Maximum number of parts to upload at once
         Returns:
             (string): Task ID of this submission, used for checking for success
         """
@@ -218,37 +603,108 @@ class DLHubClient(BaseClient):
         metadata['dlhub']['transfer_method'] = {'POST': 'file'}
 
         # Validate against the servable schema
+        from dlhub_sdk.utils.schemas import validate_against_dlhub_schema
         validate_against_dlhub_schema(metadata, 'servable')
 
+        if stream and part_size is not None:
+            raise ValueError('Streaming cannot be used with uploads in parts')
+
+        # Determine which files must be uploaded
+        exclude = ()
+        extra_parts = {}
+        if deduplicate:
+            digests = model.get_file_digests()
+            known = self.get_known_files(digests.values())
+            exclude = set(name for name, digest in digests.items() if digest in known)
+
+            # Services that do not store files by digest do not accept a manifest
+            if len(exclude) > 0:
+                extra_parts['manifest'] = ('manifest.json', json.dumps(digests),
+                                           'application/json')
+
+        # Send the ZIP file as it is generated
+        if stream:
+            body = MultipartBody()
+            body.add_part('json', json.dumps(metadata).encode(), 'application/json',
+                          filename='dlhub.json')
+            for name, (filename, data, content_type) in extra_parts.items():
+                body.add_part(name, data.encode(), content_type, filename=filename)
+            body.add_part('file', model.iter_zip_file(exclude=exclude), filename='servable.zip')
+            return self._submit_publication(data=iter(body),
+                                            headers={'Content-Type': body.content_type})
+
         # Get the data to be submitted as a ZIP file
         fp, zip_filename = mkstemp('.zip')
         os.close(fp)
         os.unlink(zip_filename)
         try:
-            model.get_zip_file(zip_filename)
-
-            # Get the authorization headers
-            headers = {}
-            self.authorizer.set_authorization_header(headers)
+            model.get_zip_file(zip_filename, exclude=exclude)
+
+            # Upload the ZIP file in parts, then publish it by reference
+            if part_size is not None:
+                uploader = ResumableUpload(self._session, self.base_url, self.authorizer,
+                                           part_size=part_size, max_workers=upload_workers,
+                                           timeout=self._http_timeout, verify=self._verify)
+                upload_id = uploader.upload(zip_filename)
+                files = {'json': ('dlhub.json', json.dumps(metadata), 'application/json')}
+                files.update(extra_parts)
+                files['upload_id'] = (None, upload_id)
+                return self._submit_publication(files=files)
 
             # Submit data to DLHub service
             with open(zip_filename, 'rb') as zf:
-                reply = requests.post(
-                    slash_join(self.base_url, 'publish'),
-                    headers=headers,
-                    files={
-                        'json': ('dlhub.json', json.dumps(metadata), 'application/json'),
-                        'file': ('servable.zip', zf, 'application/octet-stream')
-                    }
-                )
-
-            # Return the task id
-            if reply.status_code != 200:
-                raise Exception(reply.text)
-            return reply.json()['task_id']
+                files = {'json': ('dlhub.json', json.dumps(metadata), 'application/json')}
+                files.update(extra_parts)
+                files['file'] = ('servable.zip', zf, 'application/octet-stream')
+                return self._submit_publication(files=files)
         finally:
             os.unlink(zip_filename)
 
+    def get_known_files(self, digests):
+        """Determine which files are already stored by DLHub
+
+        Args:
+            digests ([string]): SHA-256 digests of the contents of files
+        Returns:
+            (set) Digests of the files DLHub already has. Empty if the service
+            does not support checking for stored files
+        """
+        try:
+            r = self.post('publish/known_files', json_body={'sha256': sorted(set(digests))})
+        except GlobusAPIError as e:
+            if e.http_status in (404, 405, 501):
+                return set()
+            raise
+        return set(r.data.get('sha256', []))
+
+    def _submit_publication(self, headers=None, **kwargs):
+        """Post a servable to the publication endpoint of DLHub
+
+        Args:
+            headers (dict): Headers for the request, in addition to authorization
+            kwargs: Body of the request, as arguments to :meth:`requests.Session.post`
+        Returns:
+            (string): Task ID of this submission
+        """
+
+        # Get the authorization headers
+        headers = dict(headers) if headers is not None else {}
+        self.authorizer.set_authorization_header(headers)
+
+        reply = self._session.post(
+            slash_join(self.base_url, 'publish'),
+            headers=headers,
+            verify=self._verify,
+            timeout=self._http_timeout,
+            **kwargs
+        )
+
+        # Return the task id
+        if reply.status_code != 200:
+            raise Exception(reply.text)
+        self.clear_cache()  # Descriptions of the servable will change
+        return reply.json()['task_id']
+
     def publish_repository(self, repository):
         """Submit a repository to DLHub for publication
 
@@ -261,11 +717,12 @@ class DLHubClient(BaseClient):
         # Publish to DLHub
         metadata = {"repository": repository}
         response = self.post('publish_repo', json_body=metadata)
+        self.clear_cache()
 
         task_id = response.data['task_id']
         return task_id
 
-    def search(self, query, advanced=False, limit=None, only_latest=True):
+    def search(self, query, advanced=False, limit=None, only_latest=True, fields=None):
         """Query the DLHub servable library
 
         By default, the query is used as a simple plaintext search of all model metadata.
@@ -279,15 +736,18 @@ class DLHubClient(BaseClient):
              advanced (bool): Whether to perform an advanced query
              limit (int): Maximum number of entries to return
              only_latest (bool): Whether to return only the latest version of the model
+             fields ([str]): Fields to keep, see :func:`~dlhub_sdk.utils.search.project_fields`
         Returns:
             ([dict]): All records matching the search query
         """
 
-        results = self.query.search(query, advanced=advanced, limit=limit)
-        return filter_latest(results) if only_latest else results
+        key = json.dumps(['search', query, advanced, limit])
+        results = self._cache.get(
+            key, lambda: self.query.search(query, advanced=advanced, limit=limit))
+        return self._prepare_results(results, only_latest, fields)
 
     def search_by_servable(self, servable_name=None, owner=None, version=None,
-                           only_latest=True, limit=None, get_info=False):
+                           only_latest=True, limit=None, get_info=False, fields=None):
         """Search by the ownership, name, or version of a servable
 
         Args:
@@ -306,6 +766,7 @@ class DLHubClient(BaseClient):
                     If ``True``, search will return a tuple containing the results list
                     and other information about the query.
                     **Default:** ``False``.
+            fields ([str]): Fields to keep, see :func:`~dlhub_sdk.utils.search.project_fields`
 
         Returns:
             If ``info`` is ``False``, *list*: The search results.
@@ -316,19 +777,17 @@ class DLHubClient(BaseClient):
             raise ValueError("One of 'servable_name', 'owner', or 'publication_date' is required.")
 
         # Perform the query
-        results, info = (self.query.match_servable(servable_name=servable_name, owner=owner,
-                                                   publication_date=version)
-                             .search(limit=limit, info=True))
-
-        # Filter out the latest models
-        if only_latest:
-            results = filter_latest(results)
+        query = self.query.match_servable(servable_name=servable_name, owner=owner,
+                                          publication_date=version)
+        results, info = self._search_cached(query, limit=limit, info=True)
+        results = self._prepare_results(results, only_latest, fields)
 
         if get_info:
-            return results, info
+            return results, deepcopy(info)
         return results
 
-    def search_by_authors(self, authors, match_all=True, limit=None, only_latest=True):
+    def search_by_authors(self, authors, match_all=True, limit=None, only_latest=True,
+                          fields=None):
         """Execute a search for servables from certain authors.
 
         Authors in DLHub may be different than the owners of the servable and generally are
@@ -348,23 +807,26 @@ class DLHubClient(BaseClient):
             only_latest (bool): When ``True``, will only return the latest version
                     of each servable. When ``False``, will return all matching versions.
                     **Default**: ``True``.
+            fields ([str]): Fields to keep, see :func:`~dlhub_sdk.utils.search.project_fields`
 
         Returns:
             [dict]: List of servables from the desired authors
         """
-        results = self.query.match_authors(authors, match_all=match_all).search(limit=limit)
-        return filter_latest(results) if only_latest else results
+        results = self._search_cached(self.query.match_authors(authors, match_all=match_all),
+                                      limit=limit)
+        return self._prepare_results(results, only_latest, fields)
 
-    def search_by_related_doi(self, doi, limit=None, only_latest=True):
+    def search_by_related_doi(self, doi, limit=None, only_latest=True, fields=None):
         """Get all of the servables associated with a certain publication
 
         Return:
             doi (string): DOI of related paper
             limit (int): Maximum number of results to return
             only_latest (bool): Whether to return only the most recent version of the model
+            fields ([str]): Fields to keep, see :func:`~dlhub_sdk.utils.search.project_fields`
         Returns:
             [dict]: List of servables from the requested paper
         """
 
-        results = self.query.match_doi(doi).search(limit=limit)
-        return filter_latest(results) if only_latest else results
+        results = self._search_cached(self.query.match_doi(doi), limit=limit)
+        return self._prepare_results(results, only_latest, fields)
@@ -0,0 +1,378 @@
+"""Tools for running servables in the current process, without contacting DLHub
+
+Servables are described by their metadata records. The ``servable.shim`` field of the
+record selects how the servable is loaded and run, and the files listed in
+``dlhub.files`` are read from a local directory.
+"""
+from importlib import import_module
+from threading import Lock
+import os
+import pickle as pkl
+
+from dlhub_sdk.utils import is_valid_path_segment
+from dlhub_sdk.utils.cache import TTLCache
+
+
+def _import_object(path):
+    """Get an object given its full path (e.g., ``module.submodule.Class``)
+
+    Args:
+        path (string): Module and name of the object
+    Returns:
+        The object
+    """
+    module, _, name = path.rpartition('.')
+    return getattr(import_module(module), name)
+
+
+class BaseShim:
+    """Loads a servable and invokes its methods
+
+    Subclasses implement :meth:`load` and :meth:`_run`
+    """
+
+    def __init__(self, metadata, directory=None):
+        """
+        Args:
+            metadata (dict): Metadata record of the servable
+            directory (string): Directory holding the files of the servable. Relative paths in
+                ``dlhub.files`` are resolved from this directory
+        """
+        self.metadata = metadata
+        self.directory = directory
+
+    def get_file(self, name):
+        """Get the path to a file of the servable
+
+        Args:
+            name (string): Name of the file in ``dlhub.files`` (e.g., "model")
+        Returns:
+            (string) Path to the file
+        """
+        path = self.metadata['dlhub']['files'][name]
+        if self.directory is not None and not os.path.isabs(path):
+            path = os.path.join(self.directory, path)
+        return path
+
+    def list_files(self):
+        """Get the paths to all files of the servable
+
+        Returns:
+            ([string]) Paths of the files
+        """
+        output = []
+        for name, value in self.metadata['dlhub'].get('files', {}).items():
+            paths = [value] if isinstance(value, str) else value
+            for path in paths:
+                if self.directory is not None and not os.path.isabs(path):
+                    path = os.path.join(self.directory, path)
+                output.append(path)
+        return output
+
+    def get_size(self):
+        """Estimate the memory used by the loaded servable
+
+        Returns:
+            (int) Total size of the files of the servable, in bytes
+        """
+        return sum(os.path.getsize(p) for p in self.list_files() if os.path.isfile(p))
+
+    def load(self):
+        """Load the servable into memory"""
+        raise NotImplementedError()
+
+    def _run(self, method, inputs, method_details, **parameters):
+        """Invoke a method of the servable on a single input
+
+        Args:
+            method (string): Name of the method
+            inputs: Inputs to the method
+            method_details (dict): Options used to construct the method
+            parameters: Parameters of the method
+        Returns:
+            Output of the method
+        """
+        raise NotImplementedError()
+
+    def run(self, inputs, method='run', parameters=None):
+        """Invoke a method of the servable
+
+        Args:
+            inputs: Inputs to the method
+            method (string): Name of the method
+            parameters (dict): Values for the parameters of the method. Parameters that are
+                not provided take the default values from the metadata
+        Returns:
+            Output of the method
+        """
+        methods = self.metadata['servable']['methods']
+        if method not in methods:
+            raise ValueError('No such method: {}'.format(method))
+        method_details = methods[method].get('method_details', {})
+
+        # Combine the parameters with the defaults
+        kwargs = dict(methods[method].get('parameters', {}))
+        if parameters is not None:
+            kwargs.update(parameters)
+
+        # Run the method on each input, if desired
+        if method_details.get('autobatch', False):
+            return [self._run(method, x, method_details, **kwargs) for x in inputs]
+        return self._run(method, inputs, method_details, **kwargs)
+
+
+class PythonStaticMethodShim(BaseShim):
+    """Runs a function from a Python module"""
+
+    def load(self):
+        self.functions = {}
+        for name, spec in self.metadata['servable']['methods'].items():
+            details = spec['method_details']
+            self.functions[name] = getattr(import_module(details['module']),
+                                           details['method_name'])
+
+    def _run(self, method, inputs, method_details, **parameters):
+        return self.functions[method](inputs, **parameters)
+
+
+class PythonClassMethodShim(BaseShim):
+    """Runs a method of a pickled Python object"""
+
+    def _load_object(self):
+        with open(self.get_file('pickle'), 'rb') as fp:
+            return pkl.load(fp)
+
+    def load(self):
+        self.object = self._load_object()
+
+    def _run(self, method, inputs, method_details, **parameters):
+        func = getattr(self.object, method_details.get('method_name', method))
+        return func(inputs, **parameters)
+
+
+class ScikitLearnShim(PythonClassMethodShim):
+    """Runs a scikit-learn model saved with pickle or joblib"""
+
+    def _load_object(self):
+        path = self.get_file('model')
+        method = self.metadata['servable'].get('options', {}).get('serialization_method',
+                                                                  'pickle')
+        if method == 'pickle':
+            with open(path, 'rb') as fp:
+                return pkl.load(fp)
+        elif method == 'joblib':
+            import joblib
+            return joblib.load(path)
+        raise ValueError('Unknown serialization method: {}'.format(method))
+
+
+class KerasShim(PythonClassMethodShim):
+    """Runs a Keras model saved to HDF5, with its architecture in the same or a separate file"""
+
+    def _load_object(self):
+        from keras.models import load_model, model_from_json, model_from_yaml
+
+        # Get the custom layers
+        custom_objects = dict(
+            (k, _import_object(v)) for k, v in
+            self.metadata['servable'].get('options', {}).get('custom_objects', {}).items()
+        )
+
+        # Load the model, following the same logic used to describe it
+        model_path = self.get_file('model')
+        if 'arch' not in self.metadata['dlhub']['files']:
+            return load_model(model_path, custom_objects=custom_objects)
+        arch_path = self.get_file('arch')
+        if arch_path.endswith(('.h5', '.hdf', '.hdf5', '.hd5')):
+            model = load_model(arch_path, custom_objects=custom_objects, compile=False)
+        elif arch_path.endswith('.json'):
+            with open(arch_path) as fp:
+                model = model_from_json(fp.read(), custom_objects=custom_objects)
+        elif arch_path.endswith(('.yml', '.yaml')):
+            with open(arch_path) as fp:
+                model = model_from_yaml(fp.read(), custom_objects=custom_objects)
+        else:
+            raise ValueError('File type for architecture not recognized')
+        model.load_weights(model_path)
+        return model
+
+
+class TensorFlowShim(BaseShim):
+    """Runs the functions of a TensorFlow model saved with :code:`tf.saved_model`"""
+
+    def load(self):
+        import tensorflow as tf
+        tf = getattr(getattr(tf, 'compat', None), 'v1', tf)
+
+        # Find the directory holding the saved model
+        export_dir = None
+        for path in self.list_files():
+            if os.path.basename(path) in ('saved_model.pb', 'saved_model.pbtxt'):
+                export_dir = os.path.dirname(path)
+                break
+        if export_dir is None:
+            raise ValueError('No saved model found in the files of the servable')
+
+        self.graph = tf.Graph()
+        self.session = tf.Session(graph=self.graph)
+        with self.graph.as_default():
+            tf.saved_model.loader.load(self.session, [tf.saved_model.tag_constants.SERVING],
+                                       export_dir)
+
+    def _run(self, method, inputs, method_details, **parameters):
+        input_nodes = method_details['input_nodes']
+        output_nodes = method_details['output_nodes']
+
+        # Inputs to functions with more than one argument are given as a tuple
+        if len(input_nodes) == 1:
+            inputs = [inputs]
+        feed_dict = dict(zip(input_nodes, inputs))
+        outputs = self.session.run(output_nodes, feed_dict=feed_dict)
+        return outputs[0] if len(output_nodes) == 1 else tuple(outputs)
+
+
+#: Shim used for each value of ``servable.shim``
+shims = {
+    'python.PythonStaticMethodServable': PythonStaticMethodShim,
+    'python.PythonClassMethodServable': PythonClassMethodShim,
+    'sklearn.ScikitLearnServable': ScikitLearnShim,
+    'keras.KerasServable': KerasShim,
+    'tensorflow.TensorFlowServable': TensorFlowShim,
+}
+
+
+def load_servable(metadata, directory=None):
+    """Load a servable given its metadata
+
+    Args:
+        metadata (dict): Metadata record of the servable
+        directory (string): Directory holding the files of the servable
+    Returns:
+        (BaseShim) Loaded servable
+    """
+    shim_name = metadata['servable']['shim']
+    if shim_name not in shims:
+        raise ValueError('Unsupported shim: {}'.format(shim_name))
+    shim = shims[shim_name](metadata, directory)
+    shim.load()
+    return shim
+
+
+class LocalServableRunner:
+    """Runs servables in the current process
+
+    Servables are either registered with their metadata and the directory holding their
+    files, or retrieved by name from ``metadata_source`` with their files stored in
+    ``servable_dir/<owner>/<name>``. Loaded servables are kept in memory, evicting the
+    least-recently used when more than ``max_models`` are loaded or when their total
+    size exceeds ``memory_budget``. The size of a servable is estimated from the size
+    of its files.
+    """
+
+    def __init__(self, max_models=8, servable_dir=None, metadata_source=None,
+                 memory_budget=None):
+        """
+        Args:
+            max_models (int): Maximum number of servables to keep loaded
+            servable_dir (string): Directory holding the files of servables that were not
+                registered
+            metadata_source: Function that takes the name of a servable and returns its
+                metadata (e.g., :meth:`DLHubClient.describe_servable
+                <dlhub_sdk.client.DLHubClient.describe_servable>`)
+            memory_budget (int): Maximum total size of the loaded servables, in bytes.
+                Default is no limit
+        """
+        self.servable_dir = servable_dir
+        self.metadata_source = metadata_source
+        self._servables = {}  # Metadata and directory of registered servables
+        self._versions = {}  # Number of times each name has been registered
+        self._lock = Lock()
+        self._loaded = TTLCache(maxsize=max_models, ttl=float('inf'), max_weight=memory_budget,
+                                weigher=lambda shim: shim.get_size())
+
+    def register(self, metadata, directory=None, name=None):
+        """Register a servable to be run
+
+        Args:
+            metadata (dict or BaseServableModel): Metadata record of the servable. Models are
+                converted using ``to_dict()``, which keeps the full paths to their files
+            directory (string): Directory holding the files of the servable
+            name (string): Name of the servable. Defaults to ``dlhub.shorthand_name`` or,
+                for servables that have not been published, ``dlhub.name``
+        Returns:
+            (string) Name of the servable
+        """
+        if not isinstance(metadata, dict):
+            metadata = metadata.to_dict()
+        if name is None:
+            name = metadata['dlhub'].get('shorthand_name', metadata['dlhub'].get('name'))
+        if name is None:
+            raise ValueError('The servable must have a name')
+
+        with self._lock:
+            self._servables[name] = (metadata, directory)
+            version = self._versions.get(name, 0)
+            self._versions[name] = version + 1
+
+        # Unload the previous version
+        self._loaded.invalidate(('registered', name, version))
+        return name
+
+    def _get_servable(self, name):
+        """Get the metadata and directory for a servable
+
+        Args:
+            name (string): Name of the servable
+        Returns:
+            - (dict) Metadata of the servable
+            - (string) Directory holding its files
+            - Key of that version of the servable for the cache of loaded servables
+        Raises:
+            (ValueError) If the servable is not registered and its name could refer to
+            a directory outside of ``servable_dir``
+        """
+        with self._lock:
+            if name in self._servables:
+                metadata, directory = self._servables[name]
+                return metadata, directory, ('registered', name, self._versions[name])
+        if self.metadata_source is None:
+            raise ValueError('Servable {} is not registered'.format(name))
+        if not all(is_valid_path_segment(s) for s in name.split('/')):
+            raise ValueError('Invalid servable name: {}'.format(name))
+        metadata = self.metadata_source(name)
+        directory = None if self.servable_dir is None \
+            else os.path.join(self.servable_dir, *name.split('/'))
+        return metadata, directory, (name, metadata['dlhub'].get('publication_date'))
+
+    def get_servable(self, name):
+        """Get a loaded servable, loading it if needed
+
+        Args:
+            name (string): Name of the servable
+        Returns:
+            (BaseShim) Loaded servable
+        """
+        metadata, directory, key = self._get_servable(name)
+        return self._loaded.get(key, lambda: load_servable(metadata, directory))
+
+    def run(self, name, inputs, method='run', parameters=None):
+        """Invoke a servable
+
+        Args:
+            name (string): Name of the servable
+            inputs: Inputs to the method
+            method (string): Name of the method
+            parameters (dict): Values for the parameters of the method
+        Returns:
+            Output of the method
+        """
+        return self.get_servable(name).run(inputs, method, parameters)
+
+    def evict(self):
+        """Unload all servables"""
+        self._loaded.clear()
+
+    @property
+    def loaded_size(self):
+        """int: Estimated total size of the loaded servables, in bytes"""
+        return self._loaded.weight
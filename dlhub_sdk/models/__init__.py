@@ -3,18 +3,71 @@
 from itertools import zip_longest
 from datetime import datetime
 from six import string_types
-from zipfile import ZipFile
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
 from glob import glob
+import hashlib
 import json
+import io
 import sys
 import os
 import re
 
 from dlhub_sdk.version import __version__
-from dlhub_sdk.utils.schemas import codemeta_to_datacite
 
 name_re = re.compile(r'^\S+$')
 
+_zip_date_time = (1980, 1, 1, 0, 0, 0)  # Earliest time allowed in a ZIP file
+
+
+def _make_zip_info(arcname, is_dir, compression):
+    """Make the header for an entry in a reproducible ZIP file
+
+    Args:
+        arcname (string): Name of the entry
+        is_dir (bool): Whether the entry is a directory
+        compression (int): Compression method for the entry
+    Returns:
+        (ZipInfo) Header with a fixed timestamp, permissions and creating system
+    """
+    if is_dir:
+        info = ZipInfo(arcname.rstrip('/') + '/', date_time=_zip_date_time)
+        info.external_attr = (0o40755 << 16) | 0x10
+    else:
+        info = ZipInfo(arcname, date_time=_zip_date_time)
+        info.external_attr = 0o100644 << 16
+    info.create_system = 3  # Unix, regardless of where the ZIP is made
+    info.compress_type = compression
+    return info
+
+
+class _ZipStream(io.RawIOBase):
+    """Unseekable file that holds what has been written to it until it is drained
+
+    Used to produce a ZIP file piece-by-piece. ``ZipFile`` writes data descriptors
+    after each entry when the file is not seekable, so nothing must be rewritten later.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        """Get and clear the data written since the last call
+
+        Returns:
+            (bytes) Data written to the file
+        """
+        output = b''.join(self._chunks)
+        self._chunks = []
+        return output
+
 
 class BaseMetadataModel:
     """Base class for models describing objects published via DLHub
@@ -112,6 +165,7 @@ class BaseMetadataModel:
             codemeta = json.load(fp)
 
         # Convert it to datacite and store it
+        from dlhub_sdk.utils.schemas import codemeta_to_datacite
         datacite = codemeta_to_datacite(codemeta)
         self._output["datacite"].update(datacite)
 
@@ -450,8 +504,8 @@ class BaseMetadataModel:
                 else:
                     files[k] = os.path.relpath(v, common_path)
 
-            # Copy over the current files list
-            out["dlhub"]["files"] = files
+            # Copy over the current files list, without altering the paths in this model
+            out["dlhub"] = dict(out["dlhub"], files=files)
 
         return out
 
@@ -487,7 +541,7 @@ class BaseMetadataModel:
                 output.extend(v)
         return output
 
-    def get_zip_file(self, path):
+    def get_zip_file(self, path, exclude=()):
         """Write all the listed files to a ZIP object
 
         Takes all of the files returned by `list_files`. First determines the largest common
@@ -495,26 +549,92 @@ class BaseMetadataModel:
         root directory. For example, if the files are "/home/a.pkl" and "/home/a/b.dat", the common
         directory is "/home" and the files will be stored in the Zip as "a.pkl" and "a/b.dat"
 
+        The ZIP file is reproducible: entries are sorted by name and have fixed timestamps
+        and permissions, so the same files always produce the same bytes.
+
         Args:
             path (string): Path for the ZIP File
+            exclude ([string]): Names of files in the ZIP to leave out
         Returns:
             (string): Base path for the ZIP file (useful for adjusting the paths of the files
                 included in the metadata model)
         """
 
         # Open the zip file in "exclusively create" (x) mode
-        with ZipFile(path, 'x') as newzip:
-            if len(self.list_files()) == 0:
-                return "."
+        with open(path, 'xb') as fp:
+            for chunk in self.iter_zip_file(compression=ZIP_STORED, exclude=exclude):
+                fp.write(chunk)
+        return self._get_common_path()
+
+    def iter_zip_file(self, chunk_size=1024 * 1024, compression=ZIP_DEFLATED, exclude=()):
+        """Generate a ZIP file of all the listed files, piece by piece
 
-            # Get the common path of all files
-            root_path = self._get_common_path()
+        Produces the same entries as :meth:`get_zip_file` without writing the ZIP to disk.
+        Files are read and compressed ``chunk_size`` bytes at a time, so the memory used
+        does not depend on the size of the files.
+
+        Args:
+            chunk_size (int): Number of bytes to read from a file at a time
+            compression (int): Compression method for the entries (see :mod:`zipfile`)
+            exclude ([string]): Names of files in the ZIP to leave out
+        Yields:
+            (bytes) Next part of the ZIP file
+        """
 
-            # Add each file to the directory
-            for file in self.list_files():
-                newzip.write(file, arcname=os.path.relpath(file, root_path))
+        stream = _ZipStream()
+        with ZipFile(stream, 'w', compression=compression) as newzip:
+            for file, arcname in self._get_zip_entries():
+                if arcname in exclude:
+                    continue
+                if os.path.isdir(file):
+                    newzip.writestr(_make_zip_info(arcname, True, ZIP_STORED), b'')
+                    continue
+
+                # Copy the file into the ZIP in chunks
+                info = _make_zip_info(arcname, False, compression)
+                info.file_size = os.path.getsize(file)  # Determines whether ZIP64 is needed
+                with open(file, 'rb') as fp, newzip.open(info, 'w') as entry:
+                    for chunk in iter(lambda: fp.read(chunk_size), b''):
+                        entry.write(chunk)
+                        data = stream.drain()
+                        if len(data) > 0:
+                            yield data
+                yield stream.drain()
+
+        # Write the central directory
+        yield stream.drain()
+
+    def get_file_digests(self, chunk_size=1024 * 1024):
+        """Compute the SHA-256 digest of each listed file
 
-            return root_path
+        Args:
+            chunk_size (int): Number of bytes to read from a file at a time
+        Returns:
+            (dict) Hex digest of each file, keyed by the name of the file in the ZIP
+        """
+        digests = {}
+        for file, arcname in self._get_zip_entries():
+            if os.path.isdir(file):
+                continue
+            digest = hashlib.sha256()
+            with open(file, 'rb') as fp:
+                for chunk in iter(lambda: fp.read(chunk_size), b''):
+                    digest.update(chunk)
+            digests[arcname] = digest.hexdigest()
+        return digests
+
+    def _get_zip_entries(self):
+        """Get the files to store in the ZIP, sorted by their name in the ZIP
+
+        Returns:
+            ([tuple]) Path of each file and its name in the ZIP
+        """
+        root_path = self._get_common_path()
+        entries = set()
+        for file in self.list_files():
+            arcname = os.path.relpath(file, root_path).replace(os.sep, '/')
+            entries.add((file, arcname))
+        return sorted(entries, key=lambda x: x[1])
 
     def _get_common_path(self):
         """Determine the common path of all files
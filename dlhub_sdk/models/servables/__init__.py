@@ -1,6 +1,4 @@
-import pkg_resources
 import importlib
-import requests
 import os
 
 
@@ -105,8 +103,10 @@ class BaseServableModel(BaseMetadataModel):
                 module = importlib.import_module(library)
                 version = module.__version__
             except Exception:
+                import pkg_resources
                 version = pkg_resources.get_distribution(library).version
         elif version == "latest":
+            import requests
             pypi_req = requests.get('https://pypi.org/pypi/{}/json'.format(library))
             version = pypi_req.json()['info']['version']
 
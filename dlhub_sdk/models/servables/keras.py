@@ -1,11 +1,8 @@
-from keras import __version__ as keras_version
-from keras.models import load_model, model_from_json, model_from_yaml
-from keras.layers import Layer
-
 from dlhub_sdk.models.servables.python import BasePythonServableModel
 from dlhub_sdk.utils.types import compose_argument_block
 
-_keras_version_tuple = tuple(int(i) for i in keras_version.split("."))
+# Keras is imported by the functions that use it, so that it is only loaded
+#  when a Keras model is described
 
 
 class KerasModel(BasePythonServableModel):
@@ -30,6 +27,9 @@ class KerasModel(BasePythonServableModel):
                 <https://www.tensorflow.org/api_docs/python/tf/keras/models/load_model>`_
                 for more details.
        """
+        from keras import __version__ as keras_version
+        from keras.models import load_model, model_from_json, model_from_yaml
+
         output = super(KerasModel, cls).create_model('predict')
 
         # Add model as a file to be sent
@@ -110,6 +110,8 @@ class KerasModel(BasePythonServableModel):
             self
         """
 
+        from keras.layers import Layer
+
         # Get the class name for the custom layer
         layer_name = custom_layer.__name__
         if not issubclass(custom_layer, Layer):
@@ -1,28 +1,44 @@
 from dlhub_sdk.models.servables.python import BasePythonServableModel
-from sklearn.base import is_classifier
-from sklearn.pipeline import Pipeline
-from sklearn.externals import joblib
-import sklearn.base as sklbase
+from threading import Lock, local
 import pickle as pkl
 import inspect
 
 
 # scikit-learn stores the version used to create a model in the pickle file,
 #  but deletes it before unpickling the object. This code intercepts the version
-#  number before it gets deleted
+#  number before it gets deleted. scikit-learn is imported and the override is installed
+#  when the first model is loaded, so that importing this module does not load scikit-learn.
+#  The version is recorded separately by each thread, and only while it is loading a
+#  model with ScikitLearnModel, so that models can be described from many threads at once
 
-_sklearn_version_global = None
-_original_set_state = sklbase.BaseEstimator.__setstate__
+_version_capture = local()
+_original_set_state = None
+_patch_lock = Lock()
 
 
 def _hijack_baseestimator_setstate(self, state):
-    global _sklearn_version_global
-    _sklearn_version_global = state.get("_sklearn_version", "pre-0.18")
+    if getattr(_version_capture, 'active', False):
+        _version_capture.version = state.get("_sklearn_version", "pre-0.18")
     _original_set_state(self, state)
 
 
-# Define the override
-sklbase.BaseEstimator.__setstate__ = _hijack_baseestimator_setstate
+def _install_setstate_override():
+    """Define the override of ``BaseEstimator.__setstate__``, if not already defined"""
+    global _original_set_state
+    with _patch_lock:
+        if _original_set_state is None:
+            import sklearn.base as sklbase
+            _original_set_state = sklbase.BaseEstimator.__setstate__
+            sklbase.BaseEstimator.__setstate__ = _hijack_baseestimator_setstate
+
+
+def _get_joblib():
+    """Get the joblib module, which newer versions of scikit-learn no longer include"""
+    try:
+        from sklearn.externals import joblib
+    except ImportError:
+        import joblib
+    return joblib
 
 
 class ScikitLearnModel(BasePythonServableModel):
@@ -99,18 +115,24 @@ class ScikitLearnModel(BasePythonServableModel):
             - (BaseEstimator) A scikit-learn model object
         """
 
-        # Load in the model
-        global _sklearn_version_global
-        _sklearn_version_global = None  # Set a default value
-        if serialization_method == "pickle":
-            with open(path, 'rb') as fp:
-                model = pkl.load(fp)
-        elif serialization_method == "joblib":
-            model = joblib.load(path)
-        else:
-            raise Exception('Unknown serialization method: {}'.format(serialization_method))
-
-        return _sklearn_version_global, model
+        # Load in the model, recording the version in this thread
+        _install_setstate_override()
+        previous = getattr(_version_capture, 'active', False), \
+            getattr(_version_capture, 'version', None)
+        _version_capture.active, _version_capture.version = True, None  # Set a default value
+        try:
+            if serialization_method == "pickle":
+                with open(path, 'rb') as fp:
+                    model = pkl.load(fp)
+            elif serialization_method == "joblib":
+                model = _get_joblib().load(path)
+            else:
+                raise Exception('Unknown serialization method: {}'.format(serialization_method))
+            skl_version = _version_capture.version
+        finally:
+            _version_capture.active, _version_capture.version = previous
+
+        return skl_version, model
 
     @staticmethod
     def _get_predict_method(model):
@@ -125,6 +147,9 @@ class ScikitLearnModel(BasePythonServableModel):
             - (string) Name of the predict method
             - (dict) Any options for the predict method and their default values
         """
+        from sklearn.base import is_classifier
+        from sklearn.pipeline import Pipeline
+
         # Store any special keyword arguments for the predict function
         model_obj = model.steps[-1][-1] if isinstance(model, Pipeline) else model
         predict_fun = model_obj.predict_proba if is_classifier(model) else model_obj.predict
@@ -138,6 +163,9 @@ class ScikitLearnModel(BasePythonServableModel):
         Args:
             model (BaseEstimator): Model to be inspected
         """
+        from sklearn.base import is_classifier
+        from sklearn.pipeline import Pipeline
+
         pipeline = isinstance(model, Pipeline)
 
         # Save the model type
@@ -1,8 +1,10 @@
 from dlhub_sdk.utils.types import compose_argument_block, simplify_numpy_dtype
 from dlhub_sdk.models.servables import BaseServableModel
-import tensorflow as tf
 import numpy as np
 
+# TensorFlow is imported by the functions that use it, so that it is only loaded
+#  when a TensorFlow model is described
+
 
 def _convert_dtype(arg_type):
     """Get a DLHub type for a TensorFlow type
@@ -12,6 +14,8 @@ def _convert_dtype(arg_type):
     Returns:
         (string) DLHub-schema-compatible name of the type
     """
+    import tensorflow as tf
+
     # Get the name of the type
     dtype = tf.DType(arg_type)
     return simplify_numpy_dtype(np.dtype(dtype.as_numpy_dtype))
@@ -84,6 +88,8 @@ class TensorFlowModel(BaseServableModel):
             export_directory (string): Path to the output directory of a Tensorflow model
         """
 
+        import tensorflow as tf
+
         output = cls()
 
         # Load in the model
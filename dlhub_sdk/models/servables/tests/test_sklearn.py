@@ -1,8 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from tempfile import TemporaryDirectory
+import pickle as pkl
 import numpy as np
 import unittest
+import warnings
+import time
 import os
 
+from sklearn.linear_model import LinearRegression
+
 from dlhub_sdk.utils.schemas import validate_against_dlhub_schema
 from dlhub_sdk.models.servables.sklearn import ScikitLearnModel
 from dlhub_sdk.version import __version__
@@ -11,6 +18,23 @@ from dlhub_sdk.version import __version__
 _year = str(datetime.now().year)
 
 
+class _VersionedRegression(LinearRegression):
+    """Model that claims to be saved by a certain version of scikit-learn"""
+
+    def __init__(self, version=None):
+        super(_VersionedRegression, self).__init__()
+        self.version = version
+
+    def __getstate__(self):
+        state = super(_VersionedRegression, self).__getstate__()
+        state['_sklearn_version'] = self.version
+        return state
+
+    def __setstate__(self, state):
+        super(_VersionedRegression, self).__setstate__(state)
+        time.sleep(0.001)  # Give other threads a chance to load models
+
+
 class TestSklearn(unittest.TestCase):
     maxDiff = 4096
 
@@ -117,3 +141,22 @@ class TestSklearn(unittest.TestCase):
         self.assertEqual([model_path], model_info.list_files())
         self.assertEqual(['number'], model_info["servable"]["options"]["classes"])
         self.assertEqual([None], model_info["servable"]["methods"]["run"]['output']['shape'])
+
+    def test_concurrent_versions(self):
+        """Make sure the version of each model is captured when loading from many threads"""
+        with TemporaryDirectory() as temp_dir:
+            paths = {}
+            for i in range(8):
+                version = '0.{}'.format(i)
+                paths[version] = os.path.join(temp_dir, 'model-{}.pkl'.format(i))
+                with open(paths[version], 'wb') as fp:
+                    pkl.dump(_VersionedRegression(version), fp)
+
+            def load(version):
+                return ScikitLearnModel._load_model(paths[version], 'pickle')[0]
+
+            versions = list(paths) * 16
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                with ThreadPoolExecutor(8) as executor:
+                    self.assertEqual(versions, list(executor.map(load, versions)))
@@ -1,5 +1,7 @@
 from datetime import datetime
 from glob import glob
+from hashlib import sha256
+from io import BytesIO
 import os
 from tempfile import mkstemp
 from zipfile import ZipFile
@@ -147,6 +149,7 @@ class TestModels(unittest.TestCase):
         # Test the simplification of files
         metadata = m.to_dict(simplify_paths=True)
         self.assertEqual({'data': 'test.csv'}, metadata['dlhub']['files'])
+        self.assertEqual([data_path], m.list_files())
 
     def test_zip(self):
         """Test generating a zip file with the requested files"""
@@ -180,6 +183,13 @@ class TestModels(unittest.TestCase):
                 z_files = set(f.filename for f in zf.filelist)
                 self.assertEqual({'datasets.py', 'tests/test.csv'}, z_files)
 
+            # Make sure the streamed ZIP has the same contents
+            with ZipFile(temp_path) as zf, \
+                    ZipFile(BytesIO(b''.join(m.iter_zip_file(chunk_size=128)))) as szf:
+                self.assertEqual(set(zf.namelist()), set(szf.namelist()))
+                for name in zf.namelist():
+                    self.assertEqual(zf.read(name), szf.read(name))
+
             self.assertEqual(os.path.abspath(os.path.dirname(data_path)), cp)
 
             # Test an empty ZIP file
@@ -193,6 +203,27 @@ class TestModels(unittest.TestCase):
         finally:
             os.unlink(temp_path)
 
+    def test_reproducible_zip(self):
+        """Make sure the same files always give the same ZIP"""
+
+        data_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'test.csv'))
+        m = TabularDataset.create_model(data_path)
+        m.add_files(os.path.join(os.path.dirname(data_path), '..', 'datasets.py'))
+
+        first = b''.join(m.iter_zip_file())
+        os.utime(data_path)
+        self.assertEqual(first, b''.join(m.iter_zip_file()))
+        with ZipFile(BytesIO(first)) as zf:
+            self.assertEqual(['datasets.py', 'tests/test.csv'], zf.namelist())
+
+        # Check the digests and leaving out files
+        digests = m.get_file_digests()
+        self.assertEqual({'datasets.py', 'tests/test.csv'}, set(digests))
+        with open(data_path, 'rb') as fp:
+            self.assertEqual(sha256(fp.read()).hexdigest(), digests['tests/test.csv'])
+        with ZipFile(BytesIO(b''.join(m.iter_zip_file(exclude={'datasets.py'})))) as zf:
+            self.assertEqual(['tests/test.csv'], zf.namelist())
+
     def test_serialize(self):
         # Make metadata where I overwrite a auto-generated field
         metadata = Dataset().set_title('Test').set_name('test')
@@ -0,0 +1,945 @@
+"""A stand-in for the DLHub service that runs servables on the local machine
+
+The server implements the parts of the DLHub API used by
+:class:`DLHubClient <dlhub_sdk.client.DLHubClient>` to publish and run servables:
+``namespaces``, ``publish``, ``publish/known_files``, ``publish/uploads``,
+``{task_id}/status`` and ``servables/{name}/run``. It is intended for testing and
+benchmarking client code without network access.
+
+Published servables are unpacked into a directory on disk and run using the shims
+of :mod:`dlhub_sdk.local`. Requests are handled by a pool of worker processes forked
+from a supervisor process. The supervisor is started with the ``spawn`` method of
+:mod:`multiprocessing`, so that it has no threads that could hold locks when it forks.
+It loads the published servables before forking, so that the workers share the memory
+of the models copy-on-write, and forks a fresh set of workers when new servables are
+published. Keras and TensorFlow servables are not loaded before forking, as loading them
+starts thread pools. Each worker loads its own copy when they are first run.
+Run the server with::
+
+    python -m dlhub_sdk.server --root ./dlhub-server --port 8000 --workers 4
+"""
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Event, Lock, Thread
+from argparse import ArgumentParser
+import gc
+import hashlib
+import ipaddress
+import multiprocessing
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import signal
+import socket
+import time
+import uuid
+import zlib
+import zipfile
+
+import jsonpickle
+import numpy as np
+
+from dlhub_sdk.local import LocalServableRunner
+from dlhub_sdk.utils import is_valid_path_segment
+from dlhub_sdk.utils.multipart import parse_multipart
+from dlhub_sdk.utils.serialization import dumps_pickle5, loads_pickle5
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+def _is_loopback(host):
+    """Whether an address is only reachable from this machine
+
+    Args:
+        host (string): Host name or IP address
+    Returns:
+        (bool) Whether the address is a loopback address
+    """
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+class ServableStore:
+    """Servables and publication tasks stored on disk
+
+    Each version of a servable is unpacked into
+    ``<root>/servables/<owner>/<name>/<publication_date>``, along with its metadata in
+    ``dlhub.json``. The name of the latest version is held in the ``latest`` file next to
+    the versions, which is replaced atomically when a new version is published.
+
+    A copy of each published file is kept in ``<root>/files``, named after the SHA-256
+    digest of its contents, so that later publications can leave out the files the
+    store already has. Files uploaded in parts are assembled in ``<root>/uploads``.
+    """
+
+    def __init__(self, root):
+        """
+        Args:
+            root (string): Directory holding the servables and tasks
+        """
+        self.root = os.path.abspath(root)
+        self.servable_dir = os.path.join(self.root, 'servables')
+        self.task_dir = os.path.join(self.root, 'tasks')
+        self.file_dir = os.path.join(self.root, 'files')
+        self.upload_dir = os.path.join(self.root, 'uploads')
+        for path in [self.servable_dir, self.task_dir, self.file_dir, self.upload_dir]:
+            os.makedirs(path, exist_ok=True)
+        self._metadata = {}  # Latest metadata for each servable, with the version it is from
+        self._lock = Lock()
+
+    @staticmethod
+    def _write_json(path, data):
+        """Write a JSON file atomically"""
+        temp_path = '{}.{}.tmp'.format(path, uuid.uuid4().hex)
+        with open(temp_path, 'w') as fp:
+            json.dump(data, fp)
+        os.replace(temp_path, path)
+
+    @property
+    def generation(self):
+        """float: Time of the most recent publication, used to detect changes"""
+        try:
+            return os.path.getmtime(os.path.join(self.root, 'generation'))
+        except OSError:
+            return 0
+
+    def list_servables(self):
+        """Get the names of all published servables
+
+        Returns:
+            ([string]) Names of the servables, of the form <owner>/<name>
+        """
+        output = []
+        for owner in sorted(os.listdir(self.servable_dir)):
+            owner_dir = os.path.join(self.servable_dir, owner)
+            for name in sorted(os.listdir(owner_dir)):
+                if os.path.isfile(os.path.join(owner_dir, name, 'latest')):
+                    output.append('{}/{}'.format(owner, name))
+        return output
+
+    def get_metadata(self, name):
+        """Get the metadata of the latest version of a servable
+
+        The paths of the files in the metadata are absolute paths on this machine.
+
+        Args:
+            name (string): Name of the servable, of the form <owner>/<name>
+        Returns:
+            (dict) Metadata of the servable
+        """
+        if not all(is_valid_path_segment(s) for s in name.split('/')):
+            raise KeyError('No such servable: {}'.format(name))
+        path = os.path.join(self.servable_dir, *name.split('/'))
+        try:
+            with open(os.path.join(path, 'latest')) as fp:
+                version = fp.read()
+        except OSError:
+            raise KeyError('No such servable: {}'.format(name))
+
+        # Reuse the metadata if the version has not changed
+        with self._lock:
+            cached = self._metadata.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        version_dir = os.path.join(path, version)
+        with open(os.path.join(version_dir, 'dlhub.json')) as fp:
+            metadata = json.load(fp)
+        files = {}
+        for k, v in metadata['dlhub'].get('files', {}).items():
+            if isinstance(v, str):
+                files[k] = os.path.join(version_dir, v)
+            else:
+                files[k] = [os.path.join(version_dir, f) for f in v]
+        metadata['dlhub']['files'] = files
+        with self._lock:
+            self._metadata[name] = (version, metadata)
+        return metadata
+
+    def known_files(self, digests):
+        """Determine which files are already stored
+
+        Args:
+            digests ([string]): SHA-256 digests of the contents of files
+        Returns:
+            ([string]) Digests of the files that are stored
+        """
+        return sorted(d for d in set(digests) if re.fullmatch(r'[0-9a-f]{64}', d)
+                      and os.path.isfile(os.path.join(self.file_dir, d)))
+
+    def _store_files(self, directory):
+        """Keep a copy of each file of a servable, named after the digest of its contents
+
+        Args:
+            directory (string): Directory holding the files of the servable
+        """
+        for root, _, files in os.walk(directory):
+            for file in files:
+                path = os.path.join(root, file)
+                digest = hashlib.sha256()
+                with open(path, 'rb') as fp:
+                    for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+                        digest.update(chunk)
+                stored_path = os.path.join(self.file_dir, digest.hexdigest())
+                if not os.path.exists(stored_path):
+                    temp_path = '{}.{}.tmp'.format(stored_path, uuid.uuid4().hex)
+                    shutil.copyfile(path, temp_path)
+                    os.replace(temp_path, stored_path)
+
+    def publish(self, metadata, zip_file, owner, manifest=None):
+        """Publish a new version of a servable
+
+        Args:
+            metadata (dict): Metadata of the servable, with paths relative to the root of
+                the ZIP file
+            zip_file: Path to the ZIP file of the servable, or a file-like object
+            owner (string): Namespace of the user publishing the servable
+            manifest (dict): SHA-256 digest of each file of the servable, keyed by its name
+                in the ZIP file. Files missing from the ZIP file are taken from the store
+        Returns:
+            (dict) Metadata of the published servable
+        """
+        name = metadata['dlhub']['name']
+        if not is_valid_path_segment(name) or name.startswith('.'):
+            raise ValueError('Invalid servable name: {}'.format(name))
+        if not is_valid_path_segment(owner):
+            raise ValueError('Invalid namespace: {}'.format(owner))
+        path = os.path.join(self.servable_dir, owner, name)
+        os.makedirs(path, exist_ok=True)
+
+        # Assign a publication date later than that of any previous version
+        publication_date = int(time.time() * 1000)
+        existing = [int(v) for v in os.listdir(path) if v.isdigit()]
+        if existing:
+            publication_date = max(publication_date, max(existing) + 1)
+        metadata['dlhub'].update({
+            'owner': owner,
+            'shorthand_name': '{}/{}'.format(owner, name),
+            'publication_date': publication_date
+        })
+
+        # Unpack the files in a temporary directory, then move them into place
+        temp_dir = os.path.join(path, '.{}.tmp'.format(uuid.uuid4().hex))
+        try:
+            with zipfile.ZipFile(zip_file) as zf:
+                zf.extractall(temp_dir)
+            os.makedirs(temp_dir, exist_ok=True)
+
+            # Fill in the files that were left out of the ZIP file
+            for arcname, digest in (manifest or {}).items():
+                file_path = os.path.normpath(os.path.join(temp_dir, *arcname.split('/')))
+                if not file_path.startswith(temp_dir + os.sep):
+                    raise ValueError('Invalid file name: {}'.format(arcname))
+                if os.path.exists(file_path):
+                    continue
+                if digest not in self.known_files([digest]):
+                    raise ValueError('File {} is not in the ZIP file or the store'.format(
+                        arcname))
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                shutil.copyfile(os.path.join(self.file_dir, digest), file_path)
+            self._store_files(temp_dir)
+            self._write_json(os.path.join(temp_dir, 'dlhub.json'), metadata)
+            os.rename(temp_dir, os.path.join(path, str(publication_date)))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        # Mark it as the latest version
+        temp_path = os.path.join(path, '.latest.{}.tmp'.format(uuid.uuid4().hex))
+        with open(temp_path, 'w') as fp:
+            fp.write(str(publication_date))
+        os.replace(temp_path, os.path.join(path, 'latest'))
+        with open(os.path.join(self.root, 'generation'), 'w') as fp:
+            fp.write(str(publication_date))
+        return metadata
+
+    def _get_upload_dir(self, upload_id):
+        """Get the directory holding the parts of an upload
+
+        Args:
+            upload_id (string): ID of the upload
+        Returns:
+            (string) Path to the directory
+        """
+        path = os.path.join(self.upload_dir, upload_id)
+        if not re.fullmatch(r'[0-9a-f]+', upload_id) or not os.path.isdir(path):
+            raise KeyError('No such upload: {}'.format(upload_id))
+        return path
+
+    def start_upload(self, n_parts):
+        """Start an upload of a file in parts
+
+        Args:
+            n_parts (int): Number of parts in the file
+        Returns:
+            (string) ID of the upload
+        """
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(self.upload_dir, upload_id)
+        os.makedirs(path)
+        self._write_json(os.path.join(path, 'upload.json'), {'n_parts': int(n_parts)})
+        return upload_id
+
+    def put_part(self, upload_id, part, data):
+        """Store one part of an upload
+
+        Args:
+            upload_id (string): ID of the upload
+            part (int): Number of the part
+            data (bytes): Contents of the part
+        Returns:
+            (string) ETag of the part, the SHA-256 digest of its contents
+        """
+        path = self._get_upload_dir(upload_id)
+        with open(os.path.join(path, 'upload.json')) as fp:
+            n_parts = json.load(fp)['n_parts']
+        if not 0 <= part < n_parts:
+            raise ValueError('Part {} is out of range'.format(part))
+        temp_path = os.path.join(path, '.{}.tmp'.format(uuid.uuid4().hex))
+        with open(temp_path, 'wb') as fp:
+            fp.write(data)
+        os.replace(temp_path, os.path.join(path, 'part-{}'.format(part)))
+        return hashlib.sha256(data).hexdigest()
+
+    def complete_upload(self, upload_id, parts):
+        """Assemble the parts of an upload into a single file
+
+        Args:
+            upload_id (string): ID of the upload
+            parts ([dict]): Number and ETag of each part, in order
+        """
+        path = self._get_upload_dir(upload_id)
+        temp_path = os.path.join(path, '.{}.tmp'.format(uuid.uuid4().hex))
+        try:
+            with open(temp_path, 'wb') as fp:
+                for i, part in enumerate(parts):
+                    if part.get('part') != i:
+                        raise ValueError('Parts must be listed in order')
+                    try:
+                        with open(os.path.join(path, 'part-{}'.format(i)), 'rb') as pp:
+                            data = pp.read()
+                    except OSError:
+                        raise ValueError('Part {} has not been uploaded'.format(i))
+                    if hashlib.sha256(data).hexdigest() != part.get('etag'):
+                        raise ValueError('ETag of part {} does not match'.format(i))
+                    fp.write(data)
+            os.replace(temp_path, os.path.join(path, 'file'))
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def get_upload(self, upload_id):
+        """Get the path of a completed upload
+
+        Args:
+            upload_id (string): ID of the upload
+        Returns:
+            (string) Path to the assembled file
+        """
+        path = os.path.join(self._get_upload_dir(upload_id), 'file')
+        if not os.path.isfile(path):
+            raise KeyError('Upload {} is not complete'.format(upload_id))
+        return path
+
+    def delete_upload(self, upload_id):
+        """Delete the parts of an upload
+
+        Args:
+            upload_id (string): ID of the upload
+        """
+        shutil.rmtree(self._get_upload_dir(upload_id), ignore_errors=True)
+
+    def set_status(self, task_id, status):
+        """Record the status of a task
+
+        Args:
+            task_id (string): ID of the task
+            status (dict): Status block of the task
+        """
+        self._write_json(os.path.join(self.task_dir, '{}.json'.format(task_id)), status)
+
+    def get_status(self, task_id):
+        """Get the status of a task
+
+        Args:
+            task_id (string): ID of the task
+        Returns:
+            (dict) Status block of the task
+        """
+        if not re.fullmatch(r'[\w-]+', task_id):
+            raise KeyError('No such task: {}'.format(task_id))
+        try:
+            with open(os.path.join(self.task_dir, '{}.json'.format(task_id))) as fp:
+                return json.load(fp)
+        except OSError:
+            raise KeyError('No such task: {}'.format(task_id))
+
+
+def _to_json(obj):
+    """Convert NumPy objects in the results of a servable to JSON-compatible types"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError('Object of type {} is not JSON serializable'.format(type(obj).__name__))
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Handles requests to the DLHub API"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # Headers and body are sent in separate writes
+
+    def log_message(self, format, *args):
+        logger.debug('%s - %s', self.address_string(), format % args)
+
+    def _reply(self, status, body, content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, default=_to_json).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        """Read the body of the request, decoding the transfer and content encodings
+
+        Returns:
+            (bytes) Body of the request
+        """
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size == 0:
+                    while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                        pass  # Skip any trailers
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            body = b''.join(chunks)
+        else:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        encoding = self.headers.get('Content-Encoding', '').lower()
+        if encoding in ('gzip', 'deflate'):
+            body = zlib.decompress(body, 47)  # Detect the zlib or gzip header
+        elif encoding == 'zstd':
+            if zstandard is None:
+                raise ValueError('The zstandard package is required for zstd compression')
+            body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        elif encoding not in ('', 'identity'):
+            raise ValueError('Unsupported content encoding: {}'.format(encoding))
+        return body
+
+    def _get_route(self):
+        """Get the path of the request relative to the API prefix"""
+        path = self.path.split('?')[0]
+        prefix = self.server.prefix
+        if prefix and path.startswith(prefix + '/'):
+            path = path[len(prefix):]
+        return path.strip('/')
+
+    def do_GET(self):
+        path = self._get_route()
+        if path == 'namespaces':
+            return self._reply(200, {'namespace': self.server.namespace})
+        match = re.fullmatch(r'([^/]+)/status', path)
+        if match is not None:
+            try:
+                return self._reply(200, self.server.store.get_status(match.group(1)))
+            except KeyError as e:
+                return self._reply(404, {'error': str(e)})
+        self._reply(404, {'error': 'Not found: {}'.format(self.path)})
+
+    def do_POST(self):
+        path = self._get_route()
+        try:
+            body = self._read_body()
+        except ValueError as e:
+            return self._reply(400, {'error': str(e)})
+
+        match = re.fullmatch(r'servables/([^/]+/[^/]+)/run', path)
+        if match is not None:
+            return self._run_servable(match.group(1), body)
+        if path == 'publish':
+            return self._publish(body)
+        if path == 'publish/known_files':
+            try:
+                digests = list(json.loads(body)['sha256'])
+            except (ValueError, KeyError, TypeError) as e:
+                return self._reply(400, {'error': 'Invalid request: {}'.format(e)})
+            return self._reply(200, {'sha256': self.server.store.known_files(digests)})
+        if path == 'publish/uploads':
+            try:
+                upload_id = self.server.store.start_upload(json.loads(body)['n_parts'])
+            except (ValueError, KeyError, TypeError) as e:
+                return self._reply(400, {'error': 'Invalid request: {}'.format(e)})
+            return self._reply(200, {'upload_id': upload_id})
+        match = re.fullmatch(r'publish/uploads/([^/]+)/complete', path)
+        if match is not None:
+            try:
+                parts = json.loads(body)['parts']
+            except (ValueError, KeyError, TypeError) as e:
+                return self._reply(400, {'error': 'Invalid request: {}'.format(e)})
+            try:
+                self.server.store.complete_upload(match.group(1), parts)
+            except KeyError as e:
+                return self._reply(404, {'error': str(e)})
+            except (ValueError, TypeError) as e:
+                return self._reply(400, {'error': str(e)})
+            return self._reply(200, {'upload_id': match.group(1)})
+        self._reply(404, {'error': 'Not found: {}'.format(self.path)})
+
+    def do_PUT(self):
+        path = self._get_route()
+        try:
+            body = self._read_body()
+        except ValueError as e:
+            return self._reply(400, {'error': str(e)})
+
+        match = re.fullmatch(r'publish/uploads/([^/]+)/(\d+)', path)
+        if match is None:
+            return self._reply(404, {'error': 'Not found: {}'.format(self.path)})
+        digest = self.headers.get('X-Content-SHA256')
+        if digest is not None and digest != hashlib.sha256(body).hexdigest():
+            return self._reply(400, {'error': 'Digest of the part does not match'})
+        try:
+            etag = self.server.store.put_part(match.group(1), int(match.group(2)), body)
+        except KeyError as e:
+            return self._reply(404, {'error': str(e)})
+        except ValueError as e:
+            return self._reply(400, {'error': str(e)})
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _run_servable(self, name, body):
+        if not all(is_valid_path_segment(s) for s in name.split('/')):
+            return self._reply(400, {'error': 'Invalid servable name: {}'.format(name)})
+        content_type = self.headers.get('Content-Type', 'application/json')
+
+        # Deserialize the inputs
+        binary = content_type.startswith('multipart/')
+        try:
+            if binary:
+                inputs = loads_pickle5(parse_multipart(body, content_type))
+            else:
+                data = json.loads(body)
+                inputs = jsonpickle.decode(data['python']) if 'python' in data else data['data']
+        except Exception as e:
+            return self._reply(400, {'error': 'Failed to read inputs: {}'.format(e)})
+
+        # Run the servable
+        try:
+            servable = self.server.runner.get_servable(name)
+        except KeyError:
+            return self._reply(404, {'error': 'No such servable: {}'.format(name)})
+        try:
+            result = servable.run(inputs)
+        except Exception as e:
+            logger.warning('Servable {} failed'.format(name), exc_info=True)
+            return self._reply(500, {'error': '{}: {}'.format(type(e).__name__, e)})
+
+        # Send back the results
+        if binary:
+            reply = dumps_pickle5(result)
+            return self._reply(200, b''.join(bytes(c) for c in reply), reply.content_type)
+        self._reply(200, result)
+
+    def _publish(self, body):
+        content_type = self.headers.get('Content-Type', '')
+        if not content_type.startswith('multipart/'):
+            return self._reply(400, {'error': 'Publication requires a multipart body'})
+        parts = dict((name, data) for name, _, data in parse_multipart(body, content_type))
+        if 'json' not in parts or ('file' not in parts and 'upload_id' not in parts):
+            return self._reply(400, {'error': 'Publication requires "json" and either "file"'
+                                              ' or "upload_id" parts'})
+
+        # Find the ZIP file, which may have been uploaded in parts
+        store = self.server.store
+        upload_id = None
+        if 'file' in parts:
+            zip_file = io.BytesIO(parts['file'])
+        else:
+            upload_id = bytes(parts['upload_id']).decode()
+            try:
+                zip_file = store.get_upload(upload_id)
+            except KeyError as e:
+                return self._reply(404, {'error': str(e)})
+
+        # Publish the servable before replying, recording the result as a task
+        task_id = str(uuid.uuid4())
+        try:
+            metadata = json.loads(bytes(parts['json']))
+            manifest = json.loads(bytes(parts['manifest'])) if 'manifest' in parts else None
+            store.publish(metadata, zip_file, self.server.namespace, manifest)
+            if upload_id is not None:
+                store.delete_upload(upload_id)
+            status = {'status': 'COMPLETED', 'task_id': task_id,
+                      'servable': metadata['dlhub']['shorthand_name']}
+        except Exception as e:
+            logger.warning('Publication failed', exc_info=True)
+            status = {'status': 'FAILED', 'task_id': task_id,
+                      'error': '{}: {}'.format(type(e).__name__, e)}
+        store.set_status(task_id, status)
+        self._reply(200, {'task_id': task_id})
+
+
+class _WorkerServer(ThreadingMixIn, HTTPServer):
+    """HTTP server that handles each connection in a thread, using a shared socket"""
+
+    daemon_threads = True
+
+    def __init__(self, sock, store, runner, namespace, prefix):
+        super(_WorkerServer, self).__init__(sock.getsockname(), _RequestHandler,
+                                            bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        self.store = store
+        self.runner = runner
+        self.namespace = namespace
+        self.prefix = prefix
+
+
+#: Shims that start thread pools when loading a servable, which must not be loaded before fork
+_threaded_shims = ('keras.KerasServable', 'tensorflow.TensorFlowServable')
+
+
+class _Supervisor:
+    """Runs the worker processes of a server
+
+    Must run in a process without other threads, as it forks the workers.
+    """
+
+    def __init__(self, sock, root, workers, namespace, prefix, max_models, memory_budget,
+                 poll_interval):
+        self.socket = sock
+        self.store = ServableStore(root)
+        self.runner = LocalServableRunner(max_models=max_models, memory_budget=memory_budget,
+                                          metadata_source=self.store.get_metadata)
+        self.workers = workers
+        self.namespace = namespace
+        self.prefix = prefix
+        self.poll_interval = poll_interval
+        self._pids = []
+        self._generation = None
+
+    def _preload(self):
+        """Load published servables so that the workers share them
+
+        Servables whose shims start threads when loaded are left for the workers to load.
+        """
+        for name in self.store.list_servables():
+            try:
+                if self.store.get_metadata(name)['servable']['shim'] in _threaded_shims:
+                    continue
+                self.runner.get_servable(name)
+            except Exception:
+                logger.warning('Failed to load {}'.format(name), exc_info=True)
+
+        # Keep the loaded objects out of garbage collection, which would otherwise
+        #  write to their memory and cause it to be copied into each worker
+        if hasattr(gc, 'freeze'):
+            gc.collect()
+            gc.freeze()
+
+    def _fork_worker(self):
+        """Start a worker process
+
+        Returns:
+            (int) Process ID of the worker
+        """
+        # Hold off requests to stop until the worker has replaced the signal handlers
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+        try:
+            pid = os.fork()
+        except BaseException:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+            raise
+        if pid != 0:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+            return pid
+
+        # Serve requests until told to stop
+        status = 0
+        try:
+            server = _WorkerServer(self.socket, self.store, self.runner,
+                                   self.namespace, self.prefix)
+            signal.signal(signal.SIGTERM,
+                          lambda *args: Thread(target=server.shutdown, daemon=True).start())
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+            server.serve_forever()
+        except BaseException:
+            logger.exception('Worker failed')
+            status = 1
+        finally:
+            os._exit(status)
+
+    @staticmethod
+    def _terminate(pids):
+        """Stop workers after they finish their current requests"""
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in pids:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
+    def run(self, conn, parent_pid):
+        """Start the workers, then replace workers that exit and roll the workers when
+        servables are published
+
+        Runs until the process receives SIGTERM or its parent exits.
+
+        Args:
+            conn (Connection): Connection on which to send the process IDs of the workers
+                each time they change
+            parent_pid (int): Process ID of the server
+        """
+        def _stop(*args):
+            raise SystemExit(0)
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # Interrupts are handled by the server
+
+        try:
+            self._generation = self.store.generation
+            self._preload()
+            self._pids = [self._fork_worker() for _ in range(self.workers)]
+            conn.send(self._pids)
+
+            while os.getppid() == parent_pid:
+                time.sleep(self.poll_interval)
+
+                # Restart workers that died
+                changed = False
+                for i, pid in enumerate(self._pids):
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                    if done != 0:
+                        logger.warning('Worker {} exited. Starting a new one'.format(pid))
+                        self._pids[i] = self._fork_worker()
+                        changed = True
+
+                # Load new servables and replace the workers so that they share them
+                generation = self.store.generation
+                if generation != self._generation:
+                    self._generation = generation
+                    self._preload()
+                    old_pids = self._pids
+                    self._pids = [self._fork_worker() for _ in old_pids]
+                    self._terminate(old_pids)
+                    changed = True
+
+                if changed:
+                    conn.send(self._pids)
+        finally:
+            self._terminate(self._pids)
+
+
+def _run_supervisor(conn, parent_pid, sock, *args):
+    """Run the supervisor of a server in a new process
+
+    Args:
+        conn (Connection): Connection on which to send the process IDs of the workers
+        parent_pid (int): Process ID of the server
+        sock (socket.socket): Socket on which the workers accept connections
+        args: Other arguments to :class:`_Supervisor`
+    """
+    sock.setblocking(False)
+    _Supervisor(sock, *args).run(conn, parent_pid)
+
+
+class LocalDLHubServer:
+    """A local server that publishes and runs servables
+
+    The server has no authentication, and the inputs of servables are deserialized with
+    pickle and jsonpickle, which can run arbitrary code. It must only listen on
+    addresses that are reachable by trusted users, such as the default loopback address.
+
+    Example::
+
+        server = LocalDLHubServer('./dlhub-server', workers=4)
+        server.start()
+        client = DLHubClient(base_url=server.url)
+    """
+
+    def __init__(self, root, host='127.0.0.1', port=0, workers=2, namespace='local',
+                 max_models=8, memory_budget=None, prefix='/api/v1', poll_interval=0.5):
+        """
+        Args:
+            root (string): Directory in which to store published servables
+            host (string): Address on which to listen. Must only be reachable by
+                trusted users. A warning is logged if it is not a loopback address
+            port (int): Port on which to listen. 0 to pick any free port
+            workers (int): Number of worker processes. 0 to handle requests in threads
+                of the current process, which is required on systems without ``fork``
+            namespace (string): Namespace of the user, which owns all published servables
+            max_models (int): Maximum number of servables each worker keeps loaded
+            memory_budget (int): Maximum total size of the servables each worker keeps
+                loaded, in bytes. Sizes are estimated from the size of their files
+            prefix (string): Path of the API on the server
+            poll_interval (float): Time between checks on the workers and for newly
+                published servables, in seconds
+        """
+        if workers > 0 and not hasattr(os, 'fork'):
+            raise ValueError('Worker processes require os.fork. Use workers=0')
+        self.store = ServableStore(root)
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.namespace = namespace
+        self.prefix = prefix.rstrip('/')
+        self.poll_interval = poll_interval
+        self.max_models = max_models
+        self.memory_budget = memory_budget
+
+        # Worker processes load their own servables
+        self.runner = None
+        if workers == 0:
+            self.runner = LocalServableRunner(max_models=max_models,
+                                              memory_budget=memory_budget,
+                                              metadata_source=self.store.get_metadata)
+
+        self._socket = None
+        self._pids = []
+        self._conn = None  # Receives the process IDs of the workers from the supervisor
+        self._server = None  # Server used when there are no worker processes
+        self._stop = Event()
+        self._supervisor = None  # Thread of the server or process supervising the workers
+
+    @property
+    def url(self):
+        """string: Address of the DLHub API on this server"""
+        return 'http://{}:{}{}'.format(self.host, self.port, self.prefix)
+
+    def start(self):
+        """Start handling requests in the background"""
+        if not _is_loopback(self.host):
+            logger.warning('Listening on {}, which is not a loopback address. Anyone who can '
+                           'reach it can run arbitrary code on this machine'.format(self.host))
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((self.host, self.port))
+        self._socket.listen(128)
+
+        # All workers wait for connections on the same socket. Only one of them can accept
+        #  each connection, and the others must not block while waiting to accept it
+        self._socket.setblocking(False)
+        self.port = self._socket.getsockname()[1]
+        self._stop.clear()
+
+        if self.workers == 0:
+            self._server = _WorkerServer(self._socket, self.store, self.runner,
+                                         self.namespace, self.prefix)
+            self._supervisor = Thread(target=self._server.serve_forever, daemon=True)
+            self._supervisor.start()
+        else:
+            context = multiprocessing.get_context('spawn')
+            self._conn, child_conn = context.Pipe(duplex=False)
+            self._supervisor = context.Process(
+                target=_run_supervisor, daemon=True,
+                args=(child_conn, os.getpid(), self._socket, self.store.root, self.workers,
+                      self.namespace, self.prefix, self.max_models, self.memory_budget,
+                      self.poll_interval)
+            )
+            self._supervisor.start()
+            child_conn.close()
+
+            # Wait until the workers are running
+            try:
+                self._pids = self._conn.recv()
+            except EOFError:
+                self.stop()
+                raise RuntimeError('Failed to start the worker processes')
+
+    @property
+    def worker_pids(self):
+        """[int]: Process IDs of the current worker processes"""
+        try:
+            while self._conn is not None and self._conn.poll():
+                self._pids = self._conn.recv()
+        except EOFError:
+            pass  # Supervisor has exited
+        return list(self._pids)
+
+    def stop(self):
+        """Stop the server and its workers"""
+        self._stop.set()
+        if self._supervisor is not None:
+            if self._server is not None:
+                self._server.shutdown()
+                self._server = None
+            else:
+                self._supervisor.terminate()  # Stops the workers before exiting
+            self._supervisor.join()
+            self._supervisor = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        self._pids = []
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def serve_forever(self):
+        """Handle requests until interrupted"""
+        self.start()
+        logger.info('Serving DLHub API at {}'.format(self.url))
+        signal.signal(signal.SIGTERM, lambda *args: self._stop.set())
+        try:
+            self._stop.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main(args=None):
+    """Run the server from the command line"""
+    parser = ArgumentParser(description='Run a local stand-in for the DLHub service')
+    parser.add_argument('--root', default='dlhub-server',
+                        help='Directory in which to store published servables')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Address on which to listen. The server runs code sent by '
+                             'clients, so only listen on interfaces reachable by trusted users')
+    parser.add_argument('--port', type=int, default=8000, help='Port on which to listen')
+    parser.add_argument('--workers', type=int, default=2, help='Number of worker processes')
+    parser.add_argument('--namespace', default='local', help='Namespace of the user')
+    parser.add_argument('--max-models', type=int, default=8,
+                        help='Maximum number of servables each worker keeps loaded')
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help='Maximum size of servables each worker keeps loaded, in MB')
+    args = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.INFO)
+    budget = None if args.memory_budget is None else int(args.memory_budget * 1024 * 1024)
+    server = LocalDLHubServer(args.root, args.host, args.port, args.workers, args.namespace,
+                              args.max_models, budget)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+from functools import wraps
+from unittest import TestCase, mock
+import asyncio
+import json
+import pickle as pkl
+import threading
+
+from aiohttp import web
+from globus_sdk import AccessTokenAuthorizer, SearchClient
+import jsonpickle
+import numpy as np
+
+from dlhub_sdk.async_client import AsyncDLHubClient
+from dlhub_sdk.utils.serialization import decode_run_result, dumps_pickle5
+
+
+def _make_record(name, date):
+    return {'dlhub': {'owner': 'user', 'name': name, 'shorthand_name': 'user/' + name,
+                      'publication_date': date},
+            'servable': {'methods': {'run': {'method_details': {}, 'input': {}}}}}
+
+
+def _async_test(func):
+    """Run a coroutine test method in the event loop of the test case"""
+    @wraps(func)
+    def wrapper(self):
+        return self.loop.run_until_complete(func(self))
+    return wrapper
+
+
+class TestAsyncClient(TestCase):
+    """Test the asynchronous client against a mock of the DLHub and Search services"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._start_services())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self._stop_services())
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    async def _start_services(self):
+        self.requests = []
+        self.encodings = []
+
+        async def namespaces(request):
+            self.requests.append(request.headers['Authorization'])
+            return web.json_response({'namespace': 'user'})
+
+        async def status(request):
+            return web.json_response({'status': 'COMPLETED',
+                                      'task_id': request.match_info['task']})
+
+        async def run(request):
+            self.encodings.append(request.headers.get('Content-Encoding'))
+            if request.content_type.startswith('multipart/'):
+                inputs = decode_run_result(await request.read(),
+                                           request.headers['Content-Type'])
+                body = dumps_pickle5(inputs * 2)
+                return web.Response(body=b''.join(body),
+                                    headers={'Content-Type': body.content_type})
+            data = await request.json()
+            inputs = jsonpickle.decode(data['python']) if 'python' in data else data['data']
+            return web.json_response({'name': request.match_info['name'], 'inputs': inputs})
+
+        async def search(request):
+            query = await request.json()
+            self.requests.append(query)
+            records = [_make_record('a', '2'), _make_record('a', '1'), _make_record('b', '1')]
+            return web.json_response({
+                'total': 3,
+                'gmeta': [{'content': [r]} for r in records[:query.get('limit', 10)]]
+            })
+
+        app = web.Application()
+        app.router.add_get('/namespaces', namespaces)
+        app.router.add_get('/{task}/status', status)
+        app.router.add_post('/servables/{name:.+}/run', run)
+        app.router.add_post('/v1/index/{index}/search', search)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        url = 'http://127.0.0.1:{}/'.format(self.runner.addresses[0][1])
+
+        search_client = SearchClient(authorizer=AccessTokenAuthorizer('search-token'))
+        search_client.base_url = url
+        self.client = AsyncDLHubClient(AccessTokenAuthorizer('dlhub-token'), search_client,
+                                       base_url=url, max_connections=4)
+
+    async def _stop_services(self):
+        await self.client.close()
+        await self.runner.cleanup()
+
+    @_async_test
+    async def test_service(self):
+        self.assertEqual('user', await self.client.get_username())
+        self.assertEqual(['Bearer dlhub-token'], self.requests)
+
+        status = await self.client.get_task_status('abc')
+        self.assertEqual('abc', status['task_id'])
+
+        # Run with both input types
+        res = await self.client.run('user/a', [1, 2], input_type='json')
+        self.assertEqual({'name': 'user/a', 'inputs': [1, 2]}, res)
+        res = await self.client.run('user/a', (1, 2))
+        self.assertEqual([1, 2], res['inputs'])
+
+        # Send and receive binary data
+        binary = pkl.HIGHEST_PROTOCOL >= 5
+        if binary:
+            res = await self.client.run('user/a', np.arange(8), input_type='pickle5')
+            self.assertEqual(list(range(0, 16, 2)), res.tolist())
+
+        # Compress the inputs
+        self.client.compression = 'gzip'
+        self.client.compression_threshold = 0
+        res = await self.client.run('user/a', [1, 2], input_type='json')
+        self.assertEqual([1, 2], res['inputs'])
+        self.assertEqual('gzip', self.encodings[-1])
+        if binary:
+            res = await self.client.run('user/a', np.arange(8), input_type='pickle5')
+            self.assertEqual(list(range(0, 16, 2)), res.tolist())
+            self.assertEqual('gzip', self.encodings[-1])
+
+    @_async_test
+    async def test_search(self):
+        res = await self.client.search_by_servable(owner='user')
+        self.assertEqual({('user/a', '2'), ('user/b', '1')},
+                         set((r['dlhub']['shorthand_name'], r['dlhub']['publication_date'])
+                             for r in res))
+        self.assertIn('dlhub.owner:user', json.dumps(self.requests[-1]))
+
+        # Keep only certain fields
+        res = await self.client.search_by_authors('Ward, Logan', fields=['dlhub.name'])
+        self.assertEqual([{'dlhub': {'name': 'a'}}, {'dlhub': {'name': 'b'}}],
+                         sorted(res, key=lambda r: r['dlhub']['name']))
+        res = await self.client.search('user', only_latest=False, fields=['dlhub.name'])
+        self.assertEqual(3, len(res))
+        self.assertEqual({'dlhub': {'name': 'a'}}, res[0])
+
+        # Make sure the limit is passed to search
+        res = await self.client.describe_servable('user/a')
+        self.assertEqual('2', res['dlhub']['publication_date'])
+        self.assertEqual(1, self.requests[-1]['limit'])
+
+        methods = await self.client.describe_methods('user/a')
+        self.assertEqual({'run': {'input': {}}}, methods)
+
+        self.assertEqual({'user/a', 'user/b'}, set(await self.client.list_servables()))
+
+    @_async_test
+    async def test_deferred_login(self):
+        search_client = self.client._search_client
+        with mock.patch('mdf_toolbox.login') as login:
+            login.return_value = {'dlhub': AccessTokenAuthorizer('saved-token'),
+                                  'search': search_client}
+
+            # Credentials are loaded before the first request, not when the client is created
+            client = AsyncDLHubClient(base_url=self.client.base_url)
+            login.assert_not_called()
+            try:
+                self.assertEqual('user', await client.get_username())
+                self.assertEqual('Bearer saved-token', self.requests[-1])
+                self.assertIs(search_client, client._search_client)
+                self.assertEqual({'user/a', 'user/b'}, set(await client.list_servables()))
+                self.assertEqual(1, login.call_count)
+            finally:
+                await client.close()
+
+    @_async_test
+    async def test_authorizer_off_loop(self):
+        # Authorizers may refresh tokens over HTTP, which must not block the event loop
+        threads = []
+
+        class _Authorizer(AccessTokenAuthorizer):
+            def set_authorization_header(self, header_dict):
+                threads.append(threading.get_ident())
+                super(_Authorizer, self).set_authorization_header(header_dict)
+
+        self.client.authorizer = _Authorizer('dlhub-token')
+        self.assertEqual('user', await self.client.get_username())
+        self.assertEqual(1, len(threads))
+        self.assertNotEqual(threading.get_ident(), threads[0])
@@ -0,0 +1,93 @@
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+from unittest import TestCase, mock
+import json
+import os
+import pickle as pkl
+
+from sklearn.linear_model import LinearRegression
+
+from dlhub_sdk.bulk import describe_artifacts, main, read_manifest
+from dlhub_sdk.utils import unserialize_object
+
+
+class TestBulk(TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+
+        # Make a manifest of models, one of which is missing
+        self.entries = []
+        for i in range(4):
+            path = os.path.join(self.temp_dir.name, 'model-{}.pkl'.format(i))
+            if i != 2:
+                with open(path, 'wb') as fp:
+                    pkl.dump(LinearRegression().fit([[0, 0], [1, 1]], [0, i]), fp)
+            self.entries.append({'type': 'sklearn',
+                                 'args': {'path': path, 'n_input_columns': 2},
+                                 'metadata': {'set_name': 'model-{}'.format(i)}})
+        self.metadata = {'set_title': 'Sweep',
+                         'set_authors': {'authors': ['Ward, Logan'], 'affiliations': [['ANL']]}}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_describe(self):
+        for processes in [0, 2]:
+            results = list(describe_artifacts(self.entries, self.metadata, processes))
+            self.assertEqual([0, 1, 2, 3], [r['index'] for r in results])
+            self.assertIn('FileNotFoundError', results[2]['error'])
+
+            model = unserialize_object(results[3]['document'])
+            self.assertEqual('model-3', model.name)
+            self.assertEqual('Sweep', model['datacite']['titles'][0]['title'])
+            self.assertEqual('Ward', model['datacite']['creators'][0]['familyName'])
+
+        # Results can be produced as they are completed
+        results = describe_artifacts(self.entries, self.metadata, 2, ordered=False)
+        self.assertEqual([0, 1, 2, 3], sorted(r['index'] for r in results))
+
+        # Only model functions that set metadata can be called
+        entry = dict(self.entries[0], metadata={'to_dict': {}})
+        self.assertIn('ValueError', next(describe_artifacts([entry], processes=0))['error'])
+
+    def test_streaming(self):
+        submitted = []
+
+        class _Executor(ThreadPoolExecutor):
+            def submit(self, fn, *args, **kwargs):
+                submitted.append(args[0])
+                return super(_Executor, self).submit(fn, *args, **kwargs)
+
+        # Only a few entries per worker are submitted ahead of the results
+        entries = self.entries * 5
+        for ordered in [True, False]:
+            submitted.clear()
+            with mock.patch('dlhub_sdk.bulk.ProcessPoolExecutor', _Executor):
+                results = describe_artifacts(entries, processes=1, ordered=ordered,
+                                             threads_per_worker=1)
+                for count, _ in enumerate(results, 1):
+                    self.assertLessEqual(len(submitted), count + 2)
+                    self.assertEqual('1', os.environ['OMP_NUM_THREADS'])
+            self.assertEqual(list(range(20)), sorted(submitted))
+
+        # The thread limits are only set while the workers run
+        self.assertNotEqual('1', os.environ.get('OMP_NUM_THREADS'))
+
+    def test_cli(self):
+        manifest_path = os.path.join(self.temp_dir.name, 'manifest.jsonl')
+        with open(manifest_path, 'w') as fp:
+            for entry in self.entries:
+                print(json.dumps(entry), file=fp)
+        self.assertEqual(self.entries, read_manifest(manifest_path))
+        metadata_path = os.path.join(self.temp_dir.name, 'shared.json')
+        with open(metadata_path, 'w') as fp:
+            json.dump(self.metadata, fp)
+
+        output_path = os.path.join(self.temp_dir.name, 'output.jsonl')
+        self.assertEqual(1, main([manifest_path, output_path, '--metadata', metadata_path,
+                                  '--processes', '2', '--threads-per-worker', '1']))
+        with open(output_path) as fp:
+            results = [json.loads(line) for line in fp]
+        self.assertEqual(4, len(results))
+        self.assertEqual('model-0', results[0]['document']['dlhub']['name'])
@@ -0,0 +1,108 @@
+from unittest import TestCase
+
+from dlhub_sdk.catalog import LocalCatalog
+from dlhub_sdk.utils.search import DLHubSearchHelper
+
+
+def _make_record(owner, name, date, domains=(), authors=(), doi=None):
+    record = {
+        'dlhub': {'owner': owner, 'name': name, 'shorthand_name': owner + '/' + name,
+                  'publication_date': str(date), 'domains': list(domains)},
+        'datacite': {'creators': [{'familyName': a.split(', ')[0], 'givenName': a.split(', ')[1]}
+                                  for a in authors],
+                     'relatedIdentifiers': []},
+        'servable': {'methods': {'run': {'input': {}, 'method_details': {}}}}
+    }
+    if doi is not None:
+        record['datacite']['relatedIdentifiers'].append({'relatedIdentifier': doi,
+                                                         'relatedIdentifierType': 'DOI'})
+    return record
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _SearchClient:
+    """Serves the records newer than the start of the range in the query"""
+
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+
+    def post_search(self, index, query):
+        self.queries.append(query)
+        since = 0
+        if 'TO' in query['q']:
+            since = int(query['q'].split('[')[1].split(' ')[0])
+        records = [r for r in self.records if int(r['dlhub']['publication_date']) >= since]
+        page = records[query['offset']:query['offset'] + query['limit']]
+        return _Response({'total': len(records), 'gmeta': [{'content': [r]} for r in page]})
+
+
+class _Client:
+    def __init__(self, records):
+        self.search_client = _SearchClient(records)
+
+    @property
+    def query(self):
+        return DLHubSearchHelper(search_client=self.search_client)
+
+
+class TestCatalog(TestCase):
+
+    def setUp(self):
+        self.records = [
+            _make_record('alice', 'model', 1, ['chemistry'], ['Smith, Jane'], '10.1/a'),
+            _make_record('alice', 'model', 2, ['chemistry', 'materials science'],
+                         ['Smith, Jane', 'Doe, John']),
+            _make_record('bob', 'other', 3, ['biology'], ['Doe, John'], '10.1/b'),
+        ]
+        self.catalog = LocalCatalog()
+
+    def tearDown(self):
+        self.catalog.close()
+
+    def test_sync(self):
+        client = _Client(self.records[:2])
+        self.assertEqual(2, self.catalog.sync(client, page_size=1))
+        self.assertEqual(2, self.catalog.last_publication_date)
+
+        # Only the new records are retrieved next time
+        client.search_client.records = self.records
+        client.search_client.queries.clear()
+        self.assertEqual(2, self.catalog.sync(client))
+        self.assertIn('dlhub.publication_date:[2 TO *]', client.search_client.queries[0]['q'])
+        self.assertEqual(3, len(self.catalog))
+
+    def test_queries(self):
+        self.assertEqual(3, self.catalog.add_records(self.records))
+
+        self.assertEqual(['alice/model', 'bob/other'], self.catalog.list_servables())
+        self.assertEqual('2', self.catalog.describe_servable('alice/model')['dlhub']
+                         ['publication_date'])
+        self.assertEqual({'run': {'input': {}}}, self.catalog.describe_methods('alice/model'))
+        with self.assertRaises(AttributeError):
+            self.catalog.describe_servable('alice/none')
+
+        def names(results):
+            return [(r['dlhub']['shorthand_name'], r['dlhub']['publication_date'])
+                    for r in results]
+
+        self.assertEqual([('alice/model', '2')],
+                         names(self.catalog.search_by_servable(owner='alice')))
+        self.assertEqual([('alice/model', '2'), ('alice/model', '1')],
+                         names(self.catalog.search_by_servable('model', only_latest=False)))
+        self.assertEqual([('alice/model', '1')],
+                         names(self.catalog.search_by_servable('model', version=1)))
+        self.assertEqual([('alice/model', '2'), ('bob/other', '3')],
+                         names(self.catalog.search_by_authors('Doe, John')))
+        self.assertEqual([('alice/model', '2')],
+                         names(self.catalog.search_by_authors(['doe', 'Smith, Jane'])))
+        self.assertEqual([('alice/model', '2'), ('bob/other', '3')], names(
+            self.catalog.search_by_domains(['biology', 'chemistry'], match_all=False)))
+        self.assertEqual([('bob/other', '3')],
+                         names(self.catalog.search_by_related_doi('10.1/B')))
+        self.assertEqual([('alice/model', '2')], names(
+            self.catalog.query.match_domains('chemistry').match_owner('alice').search(limit=1)))
@@ -49,6 +49,10 @@ class TestClient(TestCase):
         res = self.dl.run("{}/{}".format(user, name), data, input_type='python')
         self.assertEqual({}, res)
 
+        # Test running the servable asynchronously
+        future = self.dl.submit("{}/{}".format(user, name), data, input_type='json')
+        self.assertEqual({}, future.result(timeout=30))
+
     @skipUnless(is_travis, 'Publish test only runs on Travis')
     def test_submit(self):
         # Make an example function
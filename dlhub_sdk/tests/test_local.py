@@ -0,0 +1,86 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import os
+import pickle as pkl
+import shutil
+
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+from dlhub_sdk.local import LocalServableRunner
+from dlhub_sdk.models.servables.python import PythonStaticMethodModel
+
+
+def _make_metadata(name, shim, method_details, files=None, parameters=None, options=None):
+    metadata = {
+        'dlhub': {'name': name, 'files': files or {}},
+        'servable': {'shim': shim, 'methods': {'run': {
+            'input': {'type': 'ndarray', 'shape': [None, 2]},
+            'output': {'type': 'ndarray', 'shape': [None]},
+            'parameters': parameters or {},
+            'method_details': method_details
+        }}}
+    }
+    if options is not None:
+        metadata['servable']['options'] = options
+    return metadata
+
+
+class TestLocal(TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.model = LinearRegression().fit([[0, 0], [1, 0], [0, 1]], [0, 1, 2])
+        with open(os.path.join(self.temp_dir.name, 'model.pkl'), 'wb') as fp:
+            pkl.dump(self.model, fp)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_python(self):
+        runner = LocalServableRunner()
+
+        # Static method, with autobatching and default parameters
+        model = PythonStaticMethodModel.create_model('numpy', 'round', autobatch=True,
+                                                     function_kwargs={'decimals': 1})
+        model.set_name('round').set_title('Round').set_inputs('list', 'x', item_type='float')\
+            .set_outputs('list', 'y', item_type='float')
+        self.assertEqual('round', runner.register(model))
+        self.assertEqual([1.2, 2.6], runner.run('round', [1.23, 2.56]))
+        self.assertEqual([1.0], runner.run('round', [1.23], parameters={'decimals': 0}))
+
+        # Class method of a pickled object, with its path relative to a directory
+        runner.register(_make_metadata('class', 'python.PythonClassMethodServable',
+                                       {'method_name': 'predict'}, {'pickle': 'model.pkl'}),
+                        directory=self.temp_dir.name)
+        np.testing.assert_array_almost_equal([3], runner.run('class', [[1, 1]]))
+
+        with self.assertRaises(ValueError):
+            runner.run('missing', [])
+
+    def test_sklearn(self):
+        def metadata_source(name):
+            return _make_metadata(name.split('/')[1], 'sklearn.ScikitLearnServable',
+                                  {'method_name': 'predict'}, {'model': 'model.pkl'},
+                                  options={'serialization_method': 'pickle'})
+
+        # Servables from the metadata source have files in a directory named after them
+        for name in ['a', 'b']:
+            os.makedirs(os.path.join(self.temp_dir.name, 'user', name))
+            shutil.copy(os.path.join(self.temp_dir.name, 'model.pkl'),
+                        os.path.join(self.temp_dir.name, 'user', name))
+
+        runner = LocalServableRunner(max_models=1, servable_dir=self.temp_dir.name,
+                                     metadata_source=metadata_source)
+        first = runner.get_servable('user/a')
+        np.testing.assert_array_almost_equal([1, 2], runner.run('user/a', [[1, 0], [0, 1]]))
+        self.assertIs(first, runner.get_servable('user/a'))
+
+        # Only one model is kept in memory
+        runner.run('user/b', [[1, 0]])
+        self.assertIsNot(first, runner.get_servable('user/a'))
+
+        # Names that leave the directory of the servables are rejected
+        for name in ['../user/a', 'user/..', 'user//a']:
+            with self.assertRaises(ValueError):
+                runner.get_servable(name)
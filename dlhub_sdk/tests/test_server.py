@@ -0,0 +1,211 @@
+from http.client import HTTPConnection
+from tempfile import TemporaryDirectory
+from threading import Event
+from unittest import TestCase, mock
+import json
+import os
+import pickle as pkl
+import time
+
+import numpy as np
+import requests
+from globus_sdk import AccessTokenAuthorizer, SearchClient
+from sklearn.linear_model import LinearRegression
+
+from dlhub_sdk.client import DLHubClient
+from dlhub_sdk.models.servables.python import PythonClassMethodModel, PythonStaticMethodModel
+from dlhub_sdk.server import LocalDLHubServer, _is_loopback
+from dlhub_sdk.utils.serialization import encode_run_inputs
+
+
+class TestServer(TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.root = os.path.join(self.temp_dir.name, 'server')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _make_client(self, server, **kwargs):
+        return DLHubClient(AccessTokenAuthorizer('x'),
+                           SearchClient(authorizer=AccessTokenAuthorizer('x')),
+                           base_url=server.url, **kwargs)
+
+    def _publish(self, server, model):
+        """Publish a servable as DLHubClient.publish_servable does, skipping the schema check"""
+        zip_path = os.path.join(self.temp_dir.name, 'servable.zip')
+        model.get_zip_file(zip_path)
+        with open(zip_path, 'rb') as fp:
+            reply = requests.post(server.url + '/publish', files={
+                'json': ('dlhub.json', json.dumps(model.to_dict(simplify_paths=True)),
+                         'application/json'),
+                'file': ('servable.zip', fp, 'application/octet-stream')
+            })
+        os.unlink(zip_path)
+        reply.raise_for_status()
+        return reply.json()['task_id']
+
+    def test_threads(self):
+        model = PythonStaticMethodModel.create_model('numpy', 'sum', function_kwargs={'axis': 1})
+        model.set_name('sum').set_title('Sum').set_inputs('ndarray', 'x', shape=[None, 2])\
+            .set_outputs('ndarray', 'y', shape=[None])
+
+        with LocalDLHubServer(self.root, workers=0) as server:
+            client = self._make_client(server)
+            self.assertEqual('local', client.get_username())
+
+            task_id = self._publish(server, model)
+            self.assertEqual('COMPLETED', client.get_task_status(task_id)['status'])
+
+            x = np.arange(6).reshape(3, 2)
+            self.assertEqual([1, 5, 9], client.run('local/sum', x.tolist(), input_type='json'))
+            self.assertEqual([1, 5, 9], client.run('local/sum', x))
+            if pkl.HIGHEST_PROTOCOL >= 5:
+                self.assertEqual([1, 5, 9],
+                                 list(client.run('local/sum', x, input_type='pickle5')))
+
+            with self.assertRaises(Exception):
+                client.run('local/missing', x)
+
+            # Names that leave the directory of the servables are rejected
+            connection = HTTPConnection(server.host, server.port)
+            connection.request('POST', server.prefix + '/servables/../local/run',
+                               body=json.dumps({'data': [[1, 2]]}))
+            self.assertEqual(400, connection.getresponse().status)
+            connection.close()
+            with self.assertRaises(KeyError):
+                server.store.get_metadata('../local')
+
+    def test_loopback(self):
+        self.assertTrue(_is_loopback('127.0.0.1'))
+        self.assertTrue(_is_loopback('localhost'))
+        self.assertFalse(_is_loopback('0.0.0.0'))
+
+        # Listening on other addresses is allowed, with a warning
+        with self.assertLogs('dlhub_sdk.server', 'WARNING'):
+            server = LocalDLHubServer(self.root, host='0.0.0.0', workers=0)
+            server.start()
+        server.stop()
+
+    def test_submit(self):
+        sleep = PythonStaticMethodModel.create_model('time', 'sleep')
+        sleep.set_name('sleep').set_title('Sleep').set_inputs('number', 'Seconds')\
+            .set_outputs('null', 'Nothing')
+        model = PythonStaticMethodModel.create_model('numpy', 'sum', function_kwargs={'axis': 1})
+        model.set_name('sum').set_title('Sum').set_inputs('ndarray', 'x', shape=[None, 2])\
+            .set_outputs('ndarray', 'y', shape=[None])
+
+        with LocalDLHubServer(self.root, workers=0) as server:
+            self._publish(server, sleep)
+            self._publish(server, model)
+            client = self._make_client(server, max_workers=2)
+            try:
+                # Occupy both threads, so that later runs wait in the queue
+                blockers = [client.submit('local/sleep', 0.5, input_type='json')
+                            for _ in range(2)]
+                futures = [client.submit('local/sum', [[i, i]], input_type='json')
+                           for i in range(4)]
+                queued = client.submit('local/sum', [[1, 1]], input_type='json')
+                self.assertTrue(queued.cancel())
+                self.assertFalse(any(f.done() for f in futures))
+
+                finished = Event()
+                futures[-1].add_done_callback(lambda f: finished.set())
+                self.assertEqual([[0], [2], [4], [6]], [f.result() for f in futures])
+                self.assertTrue(finished.wait(5))
+                self.assertEqual([None, None], [f.result() for f in blockers])
+                self.assertTrue(queued.cancelled())
+
+                # Failures of the servable are raised when getting the result
+                failed = client.submit('local/sum', [1, 2], input_type='json')
+                with self.assertRaises(Exception):
+                    failed.result()
+                self.assertIsNotNone(failed.exception())
+            finally:
+                client.close()
+
+    def test_run_batch(self):
+        model = PythonStaticMethodModel.create_model('numpy', 'sum', function_kwargs={'axis': 1})
+        model.set_name('sum').set_title('Sum').set_inputs('ndarray', 'x', shape=[None, 2])\
+            .set_outputs('ndarray', 'y', shape=[None])
+
+        # Six records, of which four are unique
+        x = np.array([[0, 1], [2, 3], [0, 1], [4, 5], [2, 3], [6, 7]])
+        expected = [1, 5, 1, 9, 5, 13]
+
+        with LocalDLHubServer(self.root, workers=0) as server:
+            self._publish(server, model)
+            client = self._make_client(server)
+            cases = [('json', x.tolist()), ('python', x.tolist())]
+            if pkl.HIGHEST_PROTOCOL >= 5:
+                cases.append(('pickle5', x))
+            for input_type, inputs in cases:
+                # Allow only one record in each request, so that each batch is split
+                max_size = len(encode_run_inputs(inputs[:1], input_type)[0])
+                with mock.patch.object(client, '_send_run_request',
+                                       wraps=client._send_run_request) as send:
+                    results = client.run_batch('local/sum', inputs, input_type=input_type,
+                                               batch_size=2, max_payload_size=max_size)
+                self.assertEqual(expected, [int(r) for r in results], input_type)
+                self.assertEqual(4, send.call_count, input_type)
+                self.assertTrue(all(len(c[0][1]) <= max_size for c in send.call_args_list))
+
+    def test_workers(self):
+        # Make a model with a file
+        pickle_path = os.path.join(self.temp_dir.name, 'model.pkl')
+        with open(pickle_path, 'wb') as fp:
+            pkl.dump(LinearRegression().fit([[0], [1]], [1, 3]), fp)
+        model = PythonClassMethodModel.create_model(pickle_path, 'predict')
+        model.set_name('linear').set_title('Linear').set_inputs('ndarray', 'x', shape=[None, 1])\
+            .set_outputs('ndarray', 'y', shape=[None])
+
+        with LocalDLHubServer(self.root, workers=2, poll_interval=0.05) as server:
+            client = self._make_client(server)
+            pids = server.worker_pids
+            self.assertEqual(2, len(pids))
+            self._publish(server, model)
+            self.assertAlmostEqual(5, client.run('local/linear', [[2]])[0])
+
+            # The workers are replaced after a publication, so they share the new model
+            for _ in range(100):
+                if server.worker_pids != pids:
+                    break
+                time.sleep(0.05)
+            self.assertNotEqual(pids, server.worker_pids)
+            self.assertIn('local/linear', server.store.list_servables())
+            self.assertAlmostEqual(7, client.run('local/linear', [[3]])[0])
+
+    def test_uploads(self):
+        pickle_path = os.path.join(self.temp_dir.name, 'model.pkl')
+        with open(pickle_path, 'wb') as fp:
+            pkl.dump(LinearRegression().fit([[0], [1]], [1, 3]), fp)
+        model = PythonClassMethodModel.create_model(pickle_path, 'predict')
+        model.set_name('linear').set_title('Linear').set_inputs('ndarray', 'x', shape=[None, 1])\
+            .set_outputs('ndarray', 'y', shape=[None])
+
+        with LocalDLHubServer(self.root, workers=0) as server, \
+                mock.patch('dlhub_sdk.utils.schemas.validate_against_dlhub_schema'), \
+                mock.patch('dlhub_sdk.utils.upload._default_manifest_dir', self.temp_dir.name):
+            client = self._make_client(server)
+            digest = model.get_file_digests()['model.pkl']
+            self.assertEqual(set(), client.get_known_files([digest]))
+
+            # Upload the servable in parts
+            task_id = client.publish_servable(model, part_size=100)
+            self.assertEqual('COMPLETED', client.get_task_status(task_id)['status'])
+            self.assertAlmostEqual(5, client.run('local/linear', [[2]])[0])
+            self.assertEqual({digest}, client.get_known_files([digest, '0' * 64]))
+            self.assertEqual([], os.listdir(server.store.upload_dir))
+
+            # Publish again without sending the files the server already has
+            task_id = client.publish_servable(model, deduplicate=True)
+            self.assertEqual('COMPLETED', client.get_task_status(task_id)['status'])
+            self.assertAlmostEqual(7, client.run('local/linear', [[3]])[0])
+
+            # The manifest is only sent when files are left out
+            with mock.patch.object(client, 'get_known_files', return_value=set()), \
+                    mock.patch.object(client, '_submit_publication',
+                                      wraps=client._submit_publication) as submit:
+                client.publish_servable(model, deduplicate=True)
+            self.assertNotIn('manifest', submit.call_args[1]['files'])
@@ -0,0 +1,75 @@
+from unittest import TestCase, mock
+import pickle as pkl
+import subprocess
+import sys
+
+from globus_sdk import AccessTokenAuthorizer, SearchClient
+
+from dlhub_sdk.client import DLHubClient
+
+
+def _get_imported_modules(code):
+    """Get the modules loaded by a fresh interpreter after running some code"""
+    output = subprocess.check_output([sys.executable, '-c', code + '\nimport sys\n'
+                                      'print(" ".join(sys.modules))'])
+    return output.decode().split()
+
+
+class TestStartup(TestCase):
+
+    def test_imports(self):
+        # The client is only imported when it is accessed, if supported by Python
+        modules = _get_imported_modules('import dlhub_sdk')
+        if sys.version_info >= (3, 7):
+            self.assertNotIn('dlhub_sdk.client', modules)
+        modules = _get_imported_modules('from dlhub_sdk import DLHubClient')
+        self.assertIn('dlhub_sdk.client', modules)
+
+        # Libraries used only by some functions of the client are not imported with it
+        modules = _get_imported_modules('import dlhub_sdk.client')
+        for name in ['numpy', 'jsonschema', 'jsonpickle']:
+            self.assertNotIn(name, modules)
+
+    def test_model_imports(self):
+        # Libraries used to describe models are only imported when a model is created
+        modules = _get_imported_modules(
+            'import dlhub_sdk.models.servables.keras\n'
+            'import dlhub_sdk.models.servables.sklearn\n'
+            'import dlhub_sdk.models.servables.tensorflow\n'
+            'from dlhub_sdk.utils import unserialize_object\n'
+            'unserialize_object({"@class": "dlhub_sdk.models.servables.sklearn.'
+            'ScikitLearnModel"})'
+        )
+        for name in ['keras', 'sklearn', 'tensorflow', 'jsonschema', 'dlhub_sdk.client']:
+            self.assertNotIn(name, modules)
+
+    def test_deferred_login(self):
+        search_client = SearchClient(authorizer=AccessTokenAuthorizer('search'))
+        with mock.patch('mdf_toolbox.login') as login:
+            login.return_value = {'dlhub': AccessTokenAuthorizer('dlhub'),
+                                  'search': search_client}
+
+            # Missing credentials are loaded when first used
+            client = DLHubClient()
+            login.assert_not_called()
+            headers = {}
+            client.authorizer.set_authorization_header(headers)
+            self.assertEqual('Bearer dlhub', headers['Authorization'])
+            self.assertIs(search_client, client.search_client)
+            self.assertEqual(1, login.call_count)
+
+            # Provided credentials are kept
+            client = DLHubClient(AccessTokenAuthorizer('mine'))
+            self.assertIs(search_client, client.search_client)
+            client.authorizer.set_authorization_header(headers)
+            self.assertEqual('Bearer mine', headers['Authorization'])
+            self.assertEqual(2, login.call_count)
+
+            # Clients that have not logged in can be copied
+            client = pkl.loads(pkl.dumps(DLHubClient()))
+            client.authorizer.set_authorization_header(headers)
+            self.assertEqual('Bearer dlhub', headers['Authorization'])
+
+            # Logins can be forced
+            DLHubClient(AccessTokenAuthorizer('mine'), search_client, force_login=True)
+            self.assertTrue(login.call_args[1]['clear_old_tokens'])
@@ -1,4 +1,5 @@
 import importlib
+import re
 
 
 def unserialize_object(data):
@@ -26,3 +27,17 @@ def unserialize_object(data):
 
     # Instantiate it using the user-provided data
     return output.from_dict(data)
+
+
+def is_valid_path_segment(segment):
+    """Whether a name can be used as one part of a path on disk
+
+    Used to make sure that the owner, name or version of a servable cannot refer
+    to a location outside of the directory where servables are stored.
+
+    Args:
+        segment (string): Owner, name or version of a servable
+    Returns:
+        (bool) Whether the name is valid
+    """
+    return re.fullmatch(r'[\w.-]+', segment) is not None and segment not in ('.', '..')
@@ -0,0 +1,41 @@
+"""Tools for getting the credentials used by the DLHub clients"""
+import os
+
+from globus_sdk.authorizers import GlobusAuthorizer
+
+from dlhub_sdk.config import CLIENT_ID
+
+# Directory for authentication tokens
+_token_dir = os.path.expanduser("~/.dlhub/credentials")
+
+
+class DeferredAuthorizer(GlobusAuthorizer):
+    """Authorizer that logs in to DLHub the first time a request is made"""
+
+    def __init__(self, get_authorizer):
+        """
+        Args:
+            get_authorizer: Function that logs in and returns the authorizer to use
+        """
+        self.get_authorizer = get_authorizer
+
+    def set_authorization_header(self, header_dict):
+        self.get_authorizer().set_authorization_header(header_dict)
+
+    def handle_missing_authorization(self, *args, **kwargs):
+        return self.get_authorizer().handle_missing_authorization(*args, **kwargs)
+
+
+def get_credentials(force=False):
+    """Get credentials for DLHub and Globus Search
+
+    Loads the credentials saved in ``~/.dlhub/credentials``, logging in if there are none
+
+    Args:
+        force (bool): Whether to discard the saved credentials and log in again
+    Returns:
+        (dict) Authorizer for DLHub, under "dlhub", and a SearchClient, under "search"
+    """
+    from mdf_toolbox import login  # Imported here as it is slow to load
+    return login(services=["search", "dlhub"], app_name="DLHub_Client",
+                 client_id=CLIENT_ID, clear_old_tokens=force, token_dir=_token_dir)
@@ -0,0 +1,63 @@
+"""Utilities for splitting large sets of inputs into batches"""
+import numpy as np
+
+from dlhub_sdk.utils.serialization import digest_inputs
+
+
+def _get_record_key(record):
+    """Generate a key that is identical for identical records
+
+    Records of different types (e.g., ``(1, 2)`` and ``[1, 2]``) have different keys,
+    as servables may treat them differently.
+
+    Args:
+        record: Record to be evaluated
+    Returns:
+        (string) Key for the record
+    """
+    return digest_inputs(record)
+
+
+def deduplicate_inputs(inputs):
+    """Remove duplicate records from a list of inputs
+
+    Records are compared by type and value. The order of the first appearance of each record
+    is preserved.
+
+    Args:
+        inputs (list or ndarray): Records to be evaluated
+    Returns:
+        - (list or ndarray) Unique records. Same type as ``inputs``
+        - ([int]) Index of the corresponding unique record for each of the inputs
+    """
+    keys = {}
+    inverse = []
+    unique_index = []
+    for i, record in enumerate(inputs):
+        key = _get_record_key(record)
+        if key not in keys:
+            keys[key] = len(unique_index)
+            unique_index.append(i)
+        inverse.append(keys[key])
+
+    # Gather the unique records
+    if isinstance(inputs, np.ndarray):
+        unique = inputs[unique_index]
+    else:
+        unique = [inputs[i] for i in unique_index]
+    return unique, inverse
+
+
+def split_into_batches(inputs, batch_size):
+    """Split inputs into batches along the first axis
+
+    Args:
+        inputs (list or ndarray): Records to be split
+        batch_size (int): Maximum number of records per batch
+    Yields:
+        (list or ndarray) Batches of records
+    """
+    if batch_size < 1:
+        raise ValueError('Batch size must be positive')
+    for start in range(0, len(inputs), batch_size):
+        yield inputs[start:start + batch_size]
@@ -0,0 +1,204 @@
+"""Tools for caching the results of queries to DLHub"""
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock, Thread
+from time import monotonic
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Cache whose entries expire after a fixed time, evicting the least-recently used
+
+    Values are produced by a ``loader`` function given to :meth:`get`.
+    Concurrent requests for a missing key share a single call to the loader
+    ("single-flight"), and errors raised by the loader are passed to every caller
+    without being cached.
+
+    Entries are fresh for ``ttl`` seconds. For a further ``stale_ttl`` seconds, the
+    stale value is returned immediately while a new value is loaded in the background
+    ("stale-while-revalidate").
+
+    The cache can also be limited by the total weight of its entries (e.g., their size in
+    memory), as computed by a ``weigher`` function. The most recent entry is always kept,
+    even if it alone exceeds ``max_weight``.
+    """
+
+    def __init__(self, maxsize=256, ttl=60, stale_ttl=0, max_weight=None, weigher=None):
+        """
+        Args:
+            maxsize (int): Maximum number of entries to hold
+            ttl (float): Time an entry is fresh, in seconds
+            stale_ttl (float): Time after an entry expires that it can still be used while
+                it is refreshed, in seconds
+            max_weight (float): Maximum total weight of the entries. Default is no limit
+            weigher: Function that takes a value and returns its weight. Required if
+                ``max_weight`` is set
+        """
+        if max_weight is not None and weigher is None:
+            raise ValueError('A weigher is required to limit the weight of the cache')
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_weight = max_weight
+        self.weigher = weigher
+
+        self._entries = OrderedDict()  # Value, time stored and weight for each key
+        self._weight = 0
+        self._pending = {}  # Future and generation for each key being loaded
+        self._generation = 0  # Incremented each time the cache is cleared
+        self._lock = Lock()
+
+    def __getstate__(self):
+        return {'maxsize': self.maxsize, 'ttl': self.ttl, 'stale_ttl': self.stale_ttl,
+                'max_weight': self.max_weight, 'weigher': self.weigher}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def weight(self):
+        """float: Total weight of the entries in the cache"""
+        return self._weight
+
+    def keys(self):
+        """Get the keys of the entries in the cache
+
+        Returns:
+            (list) Keys, from least to most recently used
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def get(self, key, loader):
+        """Get a value from the cache, loading it if needed
+
+        Args:
+            key: Key for the value. Must be hashable
+            loader: Function that takes no arguments and produces the value
+        Returns:
+            Value for the key
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored, _ = entry
+                age = monotonic() - stored
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+
+                    # Refresh stale values from a background thread
+                    if age >= self.ttl and key not in self._pending:
+                        future = Future()
+                        self._pending[key] = (future, self._generation)
+                        Thread(target=self._load, args=(key, loader, future),
+                               daemon=True).start()
+                    return value
+                self._remove(key)
+
+            # Wait for another thread if it is already loading the value
+            pending = self._pending.get(key)
+            is_loader = pending is None
+            if is_loader:
+                future = Future()
+                self._pending[key] = (future, self._generation)
+            else:
+                future = pending[0]
+
+        if is_loader:
+            self._load(key, loader, future)
+        return future.result()
+
+    def _load(self, key, loader, future):
+        """Load a value and store it in the cache
+
+        The value is not stored if its key or the whole cache was invalidated after
+        the load started, as it may predate the invalidation.
+
+        Args:
+            key: Key for the value
+            loader: Function that produces the value
+            future (Future): Future that will receive the value or error
+        """
+        try:
+            value = loader()
+        except BaseException as exc:
+            with self._lock:
+                self._finish(key, future)
+                is_refresh = key in self._entries
+            if is_refresh:
+                logger.warning('Failed to refresh cached value for {}: {}'.format(key, exc))
+            future.set_exception(exc)
+            return
+
+        weight = self.weigher(value) if self.weigher is not None else 0
+        with self._lock:
+            is_current = self._finish(key, future)
+            if (self.ttl > 0 or self.stale_ttl > 0) and is_current:
+                self._remove(key)
+                self._entries[key] = (value, monotonic(), weight)
+                self._weight += weight
+
+                # Evict the least-recently used entries
+                while len(self._entries) > self.maxsize or \
+                        (self.max_weight is not None and self._weight > self.max_weight
+                         and len(self._entries) > 1):
+                    self._remove(next(iter(self._entries)))
+        future.set_result(value)
+
+    def _finish(self, key, future):
+        """Mark a load as complete. Must be called while holding the lock
+
+        Args:
+            key: Key being loaded
+            future (Future): Future of the load
+        Returns:
+            (bool) Whether the load is still current. Invalidating a key drops its pending
+            load, and clearing the cache starts a new generation
+        """
+        pending = self._pending.get(key)
+        if pending is None or pending[0] is not future:
+            return False
+        del self._pending[key]
+        return pending[1] == self._generation
+
+    def _remove(self, key):
+        """Remove an entry, if present. Must be called while holding the lock
+
+        Args:
+            key: Key of the entry
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._weight -= entry[2]
+
+    def invalidate(self, key=None):
+        """Remove an entry from the cache
+
+        A value being loaded for the key is returned to the callers waiting for it,
+        but is not stored. Later calls to :meth:`get` load a new value. Loads of other
+        keys are not affected.
+
+        Args:
+            key: Key of the entry to remove. Removes all entries if ``None``
+        """
+        if key is None:
+            return self.clear()
+        with self._lock:
+            self._remove(key)
+            self._pending.pop(key, None)
+
+    def clear(self):
+        """Remove all entries from the cache
+
+        Values being loaded are returned to the callers waiting for them, but are not stored.
+        """
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._weight = 0
+            self._pending.clear()
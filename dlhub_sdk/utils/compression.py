@@ -0,0 +1,169 @@
+"""Tools for compressing the data sent to DLHub"""
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_default_levels = {'gzip': 6, 'zstd': 3}
+
+
+def _get_compressor(codec, level=None):
+    """Make an object that compresses data incrementally
+
+    Args:
+        codec (string): Compression codec, "gzip" or "zstd"
+        level (int): Compression level. Uses the default level of the codec if ``None``
+    Returns:
+        Object with ``compress`` and ``flush`` methods
+    """
+    if codec not in _default_levels:
+        raise ValueError('Compression codec not recognized: {}'.format(codec))
+    if level is None:
+        level = _default_levels[codec]
+
+    if codec == 'gzip':
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if zstandard is None:
+        raise ImportError('The zstandard package is required for zstd compression')
+    return zstandard.ZstdCompressor(level=level).compressobj()
+
+
+def _can_decode_zstd(library):
+    """Whether an HTTP library decodes replies compressed with zstd
+
+    Args:
+        library (string): Name of the library, "urllib3" or "aiohttp"
+    Returns:
+        (bool) Whether the library supports zstd
+    """
+    if library == 'urllib3':
+        try:
+            from urllib3.response import HTTPResponse
+        except ImportError:
+            return False
+        return 'zstd' in getattr(HTTPResponse, 'CONTENT_DECODERS', ())
+    if library == 'aiohttp':
+        try:
+            from aiohttp.compression_utils import HAS_ZSTD
+        except ImportError:
+            return False
+        return HAS_ZSTD
+    raise ValueError('HTTP library not recognized: {}'.format(library))
+
+
+def get_accept_encoding(library='urllib3'):
+    """Get the compression codecs that can be used to decode replies
+
+    Replies are decoded by the HTTP library, so zstd is only accepted if the library
+    supports it (e.g., urllib3 2.0 or later with the ``zstandard`` package).
+
+    Args:
+        library (string): HTTP library receiving the replies, "urllib3" (used by
+            ``requests``) or "aiohttp"
+    Returns:
+        (string) Value for the Accept-Encoding header
+    """
+    codecs = ['gzip', 'deflate']
+    if _can_decode_zstd(library):
+        codecs.append('zstd')
+    return ', '.join(codecs)
+
+
+def compress(data, codec, level=None):
+    """Compress data in a single call
+
+    Args:
+        data (bytes): Data to be compressed
+        codec (string): Compression codec, "gzip" or "zstd"
+        level (int): Compression level
+    Returns:
+        (bytes) Compressed data
+    """
+    if codec != 'zstd':
+        compressor = _get_compressor(codec, level)
+        return compressor.compress(data) + compressor.flush()
+
+    # Compress in one shot so the frame header records the size of the content,
+    #  which decoders that read the whole body at once require
+    if zstandard is None:
+        raise ImportError('The zstandard package is required for zstd compression')
+    if level is None:
+        level = _default_levels[codec]
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+class CompressedStream:
+    """Compresses a stream of chunks as it is iterated over
+
+    Can be iterated over more than once, which allows a request to be re-sent.
+    The length of the stream is not known in advance, so ``requests`` will send it
+    with chunked encoding.
+    """
+
+    def __init__(self, chunks, codec, level=None):
+        """
+        Args:
+            chunks (iterable): Chunks of bytes-like data to be compressed
+            codec (string): Compression codec, "gzip" or "zstd"
+            level (int): Compression level
+        """
+        self.chunks = chunks
+        self.codec = codec
+        self.level = level
+
+        # Make sure the codec is available
+        _get_compressor(codec, level)
+
+    def __iter__(self):
+        compressor = _get_compressor(self.codec, self.level)
+        for chunk in self.chunks:
+            output = compressor.compress(chunk)
+            if len(output) > 0:
+                yield output
+        yield compressor.flush()
+
+
+def compress_request(body, codec, level=None, threshold=0):
+    """Compress the body of a request, if it is large enough
+
+    Args:
+        body (string, bytes or iterable): Body of the request
+        codec (string): Compression codec, "gzip" or "zstd"
+        level (int): Compression level
+        threshold (int): Minimum size of body, in bytes, to compress
+    Returns:
+        - (bytes or iterable): Body to be sent
+        - (string) Value of the Content-Encoding header. ``None`` if not compressed
+    """
+    if isinstance(body, str):
+        body = body.encode()
+
+    # Skip small messages
+    try:
+        if len(body) < threshold:
+            return body, None
+    except TypeError:
+        pass  # Size of body is unknown
+
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return compress(body, codec, level), codec
+    return CompressedStream(body, codec, level), codec
+
+
+def decompress(data):
+    """Decompress data made by :func:`compress`, detecting the codec from its header
+
+    Args:
+        data (bytes): Compressed data
+    Returns:
+        (bytes) Decompressed data
+    """
+    if data[:2] == b'\x1f\x8b':
+        return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    if data[:4] == b'\x28\xb5\x2f\xfd':
+        if zstandard is None:
+            raise ImportError('The zstandard package is required for zstd compression')
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    raise ValueError('Compression codec not recognized')
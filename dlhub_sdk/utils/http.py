@@ -0,0 +1,96 @@
+"""Tools for managing the HTTP connections used to communicate with DLHub"""
+import socket
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+import requests
+
+
+def _get_socket_options(keep_alive, keep_alive_idle, keep_alive_interval):
+    """Generate the socket options for each new connection
+
+    Args:
+        keep_alive (bool): Whether to enable TCP keep-alive probes
+        keep_alive_idle (int): Seconds a connection is idle before sending probes
+        keep_alive_interval (int): Seconds between keep-alive probes
+    Returns:
+        ([tuple]) Options in the format expected by ``urllib3``
+    """
+    options = list(HTTPConnection.default_socket_options)
+    if keep_alive:
+        options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+        # Not all platforms allow these settings to be tuned
+        if hasattr(socket, 'TCP_KEEPIDLE'):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, keep_alive_idle))
+        if hasattr(socket, 'TCP_KEEPINTVL'):
+            options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, keep_alive_interval))
+    return options
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """Transport adapter that keeps a pool of persistent connections for each host
+
+    Connections are returned to the pool after each request and re-used by later
+    requests to the same host, avoiding the cost of new TCP and TLS handshakes.
+    The underlying ``urllib3`` pools are thread-safe, so a single adapter can
+    be shared by many threads.
+    """
+
+    __attrs__ = HTTPAdapter.__attrs__ + ['socket_options']
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 keep_alive=True, keep_alive_idle=60, keep_alive_interval=15, max_retries=0):
+        """Initialize the adapter
+
+        Args:
+            pool_connections (int): Number of hosts for which to cache a connection pool
+            pool_maxsize (int): Maximum number of connections kept open to each host
+            pool_block (bool): Whether to block when all connections to a host are in use,
+                rather than opening a connection that is discarded after use. Set to ``True``
+                to enforce a hard limit on the number of connections per host
+            keep_alive (bool): Whether to enable TCP keep-alive on pooled connections
+            keep_alive_idle (int): Seconds a connection is idle before sending keep-alive probes
+            keep_alive_interval (int): Seconds between keep-alive probes
+            max_retries (int): Number of retries for failed connections
+        """
+        # Must be defined before calling the parent initializer, which creates the pool
+        self.socket_options = _get_socket_options(keep_alive, keep_alive_idle,
+                                                  keep_alive_interval)
+        super(PooledHTTPAdapter, self).__init__(pool_connections=pool_connections,
+                                                pool_maxsize=pool_maxsize,
+                                                pool_block=pool_block,
+                                                max_retries=max_retries)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs['socket_options'] = self.socket_options
+        super(PooledHTTPAdapter, self).init_poolmanager(connections, maxsize, block=block,
+                                                        **pool_kwargs)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        proxy_kwargs['socket_options'] = self.socket_options
+        return super(PooledHTTPAdapter, self).proxy_manager_for(proxy, **proxy_kwargs)
+
+
+def mount_adapter(session, adapter):
+    """Route all HTTP and HTTPS requests made by a session through an adapter
+
+    Args:
+        session (requests.Session): Session to be modified
+        adapter (HTTPAdapter): Adapter to be used
+    Returns:
+        (requests.Session) The modified session
+    """
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def make_session(**kwargs):
+    """Create a session that re-uses persistent connections
+
+    Keyword arguments are passed to :class:`PooledHTTPAdapter`
+
+    Returns:
+        (requests.Session) A session with a pooled adapter for HTTP and HTTPS
+    """
+    return mount_adapter(requests.Session(), PooledHTTPAdapter(**kwargs))
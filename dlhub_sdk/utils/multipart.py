@@ -0,0 +1,135 @@
+"""Tools for writing and reading multipart HTTP messages without copying their contents"""
+from email.message import Message
+from uuid import uuid4
+
+
+class MultipartBody:
+    """Body of a ``multipart/form-data`` request
+
+    The body is produced by iterating over the object, which yields the headers of each
+    part followed by the contents of that part as-is. Parts that are ``bytes`` or
+    ``memoryview`` objects are never copied into an intermediate buffer.
+
+    The body of a part can also be an iterable of bytes-like chunks, such as a generator
+    that compresses data while it is being sent. The size of such a body is not known in
+    advance, so :func:`len` is unavailable and the request must use chunked encoding
+    (e.g., by passing ``iter(body)`` to ``requests``).
+    """
+
+    def __init__(self, parts=(), boundary=None):
+        """
+        Args:
+            parts ([tuple]): Each part is a tuple of its name, body, content type and,
+                optionally, filename
+            boundary (string): Boundary between parts. A random string is used by default
+        """
+        self.boundary = boundary if boundary is not None else uuid4().hex
+        self.parts = []
+        for part in parts:
+            self.add_part(*part)
+
+    @property
+    def content_type(self):
+        """string: Content-Type header for the request"""
+        return 'multipart/form-data; boundary={}'.format(self.boundary)
+
+    def add_part(self, name, body, content_type='application/octet-stream', filename=None):
+        """Add a part to the message
+
+        Args:
+            name (string): Name of the part
+            body (bytes-like, or iterable of bytes-like): Contents of the part
+            content_type (string): Type of the data in the part
+            filename (string): Name of the file, if the part represents a file
+        """
+        if isinstance(body, memoryview):
+            body = body.cast('B')  # Ensures the length is the number of bytes
+        self.parts.append((name, body, content_type, filename))
+        return self
+
+    def _get_part_header(self, name, content_type, filename):
+        """Make the headers for a certain part
+
+        Args:
+            name (string): Name of the part
+            content_type (string): Type of the data in the part
+            filename (string): Name of the file
+        Returns:
+            (bytes) Boundary and headers that precede the data in a part
+        """
+        disposition = 'form-data; name="{}"'.format(name)
+        if filename is not None:
+            disposition += '; filename="{}"'.format(filename)
+        return '--{}\r\nContent-Disposition: {}\r\nContent-Type: {}\r\n\r\n'.format(
+            self.boundary, disposition, content_type).encode()
+
+    def _get_closing(self):
+        return '--{}--\r\n'.format(self.boundary).encode()
+
+    def __len__(self):
+        total = len(self._get_closing())
+        for name, body, content_type, filename in self.parts:
+            if not isinstance(body, (bytes, bytearray, memoryview)):
+                raise TypeError('Length of a streaming part is unknown')
+            total += len(self._get_part_header(name, content_type, filename))
+            total += len(body) + 2
+        return total
+
+    def __iter__(self):
+        for name, body, content_type, filename in self.parts:
+            yield self._get_part_header(name, content_type, filename)
+            if isinstance(body, (bytes, bytearray, memoryview)):
+                yield body
+            else:
+                for chunk in body:
+                    if len(chunk) > 0:
+                        yield chunk
+            yield b'\r\n'
+        yield self._get_closing()
+
+
+def parse_multipart(content, content_type):
+    """Split a multipart message into its parts
+
+    The body of each part is a view of ``content`` rather than a copy.
+
+    Args:
+        content (bytes): Body of the message
+        content_type (string): Content-Type header of the message, which contains the boundary
+    Returns:
+        ([tuple]) Name, headers and body of each part. The headers are a
+        :class:`email.message.Message` and the body is a ``memoryview``
+    """
+
+    # Get the boundary
+    header = Message()
+    header['Content-Type'] = content_type
+    boundary = header.get_param('boundary')
+    if boundary is None:
+        raise ValueError('No boundary in Content-Type: {}'.format(content_type))
+    delimiter = b'--' + boundary.encode()
+
+    # Loop through each part
+    view = memoryview(content)
+    parts = []
+    start = content.find(delimiter)
+    while start >= 0:
+        start += len(delimiter)
+        if content[start:start + 2] == b'--':
+            break  # Closing delimiter
+        header_end = content.find(b'\r\n\r\n', start)
+        end = content.find(b'\r\n' + delimiter, header_end)
+        if header_end < 0 or end < 0:
+            raise ValueError('Multipart message is truncated')
+
+        # Parse the headers
+        headers = Message()
+        for line in content[start:header_end].decode('latin-1').split('\r\n'):
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip()] = value.strip()
+        name = headers.get_param('name', header='Content-Disposition')
+
+        parts.append((name, headers, view[header_end + 4:end]))
+        start = end + 2
+    return parts
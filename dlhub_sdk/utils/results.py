@@ -0,0 +1,208 @@
+"""Tools for reusing the results of servables invoked with the same inputs"""
+from tempfile import mkstemp
+from threading import Lock
+import os
+import pickle as pkl
+import shutil
+
+from dlhub_sdk.utils import is_valid_path_segment
+from dlhub_sdk.utils.cache import TTLCache
+from dlhub_sdk.utils.compression import compress, decompress, zstandard
+from dlhub_sdk.utils.serialization import digest_inputs
+
+
+def _is_older(version, other):
+    """Whether a version of a servable was published before another
+
+    Args:
+        version (string): Publication date of a version
+        other (string): Publication date of another version
+    Returns:
+        (bool) Whether ``version`` is older. ``False`` if the versions cannot be compared
+    """
+    try:
+        return float(version) < float(other)
+    except (TypeError, ValueError):
+        return False
+
+
+class ResultCache:
+    """Stores the results of servables, keyed by servable version and inputs
+
+    Results are kept in memory, evicting the least-recently used, and, if ``directory``
+    is set, in compressed files under ``directory/servables/<owner>/<name>/<publication_date>``.
+    Results of older versions of a servable are deleted the first time a newer version
+    is used. Only servables that always produce the same result for the same inputs
+    should be cached.
+    """
+
+    def __init__(self, directory=None, maxsize=1024, memory_budget=None, compression=None,
+                 compression_level=None):
+        """
+        Args:
+            directory (string): Directory in which to store results. The cache only
+                writes to and deletes its own subdirectory. Default is to only keep
+                results in memory
+            maxsize (int): Maximum number of results to keep in memory
+            memory_budget (int): Maximum total size of the results kept in memory, in bytes
+                of their pickled form. Default is no limit
+            compression (string): Codec used to compress the stored results, "gzip" or
+                "zstd". Default is "zstd" if the ``zstandard`` package is installed
+            compression_level (int): Compression level. Default is the codec's default
+        """
+        self.directory = None if directory is None else os.path.expanduser(directory)
+        self.compression = compression or ('zstd' if zstandard is not None else 'gzip')
+        self.compression_level = compression_level
+        self._memory = TTLCache(maxsize, ttl=float('inf'), max_weight=memory_budget,
+                                weigher=len)
+        self._versions = {}  # Latest version seen for each servable
+        self._lock = Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+    def _get_path(self, name, version, digest=None):
+        """Get the path of a stored result or of the directory for a servable
+
+        Args:
+            name (string): DLHub name of the servable of the form <user>/<servable_name>
+            version (string): Publication date of the servable. If ``None``, get the
+                directory holding all versions
+            digest (string): Digest of the inputs
+        Returns:
+            (string) Path
+        """
+        parts = [self.directory, 'servables'] + name.split('/')
+        if version is not None:
+            parts.append(version)
+        if digest is not None:
+            parts.append(digest)
+        return os.path.join(*parts)
+
+    def _check_version(self, name, version):
+        """Delete the results of versions of a servable older than ``version``
+
+        Args:
+            name (string): DLHub name of the servable
+            version (string): Publication date of the latest version
+        """
+        with self._lock:
+            previous = self._versions.get(name)
+            if previous == version or (previous is not None
+                                       and not _is_older(previous, version)):
+                return
+            self._versions[name] = version
+
+        # Drop the results held in memory
+        for key in self._memory.keys():
+            if key[0] == name and _is_older(key[1], version):
+                self._memory.invalidate(key)
+
+        # Delete the stored results
+        if self.directory is not None:
+            servable_dir = self._get_path(name, None)
+            if os.path.isdir(servable_dir):
+                for old in os.listdir(servable_dir):
+                    if _is_older(old, version):
+                        shutil.rmtree(os.path.join(servable_dir, old), ignore_errors=True)
+
+    def _read(self, path):
+        """Read a stored result
+
+        Args:
+            path (string): Path to the result
+        Returns:
+            (bytes) Pickled result, or ``None`` if it is not stored or is unreadable
+        """
+        try:
+            with open(path, 'rb') as fp:
+                return decompress(fp.read())
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Discard files that were corrupted or written with an unavailable codec
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+
+    def _write(self, path, payload):
+        """Store a result, replacing any existing copy atomically
+
+        Args:
+            path (string): Path to the result
+            payload (bytes): Pickled result
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(compress(payload, self.compression, self.compression_level))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _load(self, name, version, digest, compute):
+        """Get the pickled result from disk, or compute and store it
+
+        Args:
+            name (string): DLHub name of the servable
+            version (string): Publication date of the servable
+            digest (string): Digest of the inputs
+            compute: Function that takes no arguments and produces the result
+        Returns:
+            (bytes) Pickled result
+        """
+        path = None if self.directory is None else self._get_path(name, version, digest)
+        if path is not None:
+            payload = self._read(path)
+            if payload is not None:
+                return payload
+
+        payload = pkl.dumps(compute(), protocol=pkl.HIGHEST_PROTOCOL)
+        if path is not None:
+            self._write(path, payload)
+        return payload
+
+    def get(self, name, version, inputs, compute):
+        """Get the result of a servable, computing it if it is not cached
+
+        Concurrent requests for the same result share one call to ``compute``. Each
+        call returns a separate copy of the result.
+
+        Args:
+            name (string): DLHub name of the servable of the form <user>/<servable_name>
+            version (string): Publication date of the servable
+            inputs: Inputs to the servable
+            compute: Function that takes no arguments and produces the result
+        Returns:
+            Result of the servable
+        Raises:
+            (ValueError) If the name or version could refer to a path outside of the cache
+        """
+        if version is None:
+            raise ValueError('A version is required to cache the results of {}'.format(name))
+        version = str(version)
+        if not all(is_valid_path_segment(s) for s in name.split('/') + [version]):
+            raise ValueError('Invalid name or version of a servable: {} {}'.format(name, version))
+        self._check_version(name, version)
+        digest = digest_inputs(inputs)
+        payload = self._memory.get((name, version, digest),
+                                   lambda: self._load(name, version, digest, compute))
+        return pkl.loads(payload)
+
+    def clear(self):
+        """Delete all cached results, leaving any other files in ``directory``"""
+        self._memory.clear()
+        with self._lock:
+            self._versions.clear()
+        if self.directory is not None:
+            shutil.rmtree(os.path.join(self.directory, 'servables'), ignore_errors=True)
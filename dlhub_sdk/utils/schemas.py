@@ -1,14 +1,239 @@
 """Utilities for validating against DLHub schemas"""
-from jsonschema import Draft4Validator, RefResolver
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from threading import Lock
+from urllib.parse import urldefrag, urljoin
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+
+from jsonschema import Draft4Validator, RefResolver, ValidationError
 import requests
 
+logger = logging.getLogger(__name__)
+
 _schema_repo = "https://raw.githubusercontent.com/DLHub-Argonne/dlhub_schemas/master/schemas/"
+_cache_dir = os.path.join(os.path.expanduser('~'), '.dlhub', 'schemas')
+_max_age = 24 * 3600  # Time before a cached schema is checked for updates, in seconds
+
+# Schemas loaded by this process, keyed by URL
+_documents = {}
+_documents_lock = Lock()
+
+
+def _get_cache_path(url):
+    """Get the path where a schema is cached on disk
+
+    Args:
+        url (string): Address of the schema
+    Returns:
+        (string) Path to the cached copy
+    """
+    if url.startswith(_schema_repo):
+        name = url[len(_schema_repo):]
+    else:
+        name = hashlib.sha256(url.encode()).hexdigest() + '.json'
+    return os.path.join(_cache_dir, *name.split('/'))
+
+
+def _read_json(path):
+    """Read a JSON file, if it exists and is valid
+
+    Returns:
+        Contents of the file, or ``None``
+    """
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(path, entry):
+    """Store a schema in the disk cache, replacing any previous copy atomically"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temp_path, 'w') as fp:
+            json.dump(entry, fp)
+        os.replace(temp_path, path)
+    except OSError as exc:
+        logger.warning('Could not cache schema at {}: {}'.format(path, exc))
+
+
+def _download_schema(url):
+    """Get a schema, using the copy cached on disk while it is fresh
+
+    Stale copies are revalidated using their ETag and Last-Modified headers, and are
+    used as-is if the schema cannot be downloaded (e.g., when offline).
+
+    Args:
+        url (string): Address of the schema
+    Returns:
+        (dict) Schema
+    """
+    cache_path = _get_cache_path(url)
+    cached = _read_json(cache_path)
+    if cached is not None and time.time() - cached['fetched'] < _max_age:
+        return cached['schema']
+
+    # Ask for the schema only if it has changed
+    headers = {}
+    if cached is not None:
+        if cached.get('etag') is not None:
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified') is not None:
+            headers['If-Modified-Since'] = cached['last_modified']
+    try:
+        reply = requests.get(url, headers=headers, timeout=30)
+        if reply.status_code != 304:
+            reply.raise_for_status()
+    except requests.RequestException as exc:
+        if cached is None:
+            raise
+        logger.warning('Could not revalidate schema {}, using cached copy: {}'.format(url, exc))
+        return cached['schema']
+
+    if reply.status_code == 304:
+        cached['fetched'] = time.time()
+    else:
+        cached = {'schema': reply.json(), 'fetched': time.time(),
+                  'etag': reply.headers.get('ETag'),
+                  'last_modified': reply.headers.get('Last-Modified')}
+    _write_cache(cache_path, cached)
+    return cached['schema']
+
+
+def get_schema_document(url):
+    """Get a schema or a document referenced by a schema
+
+    Looks for the document in the schemas already loaded by this process, then in the
+    offline bundle in the directory named by the ``DLHUB_SCHEMA_DIR`` environment variable
+    (laid out like the ``schemas`` directory of the DLHub schemas repository, see
+    :func:`save_schema_bundle`), and finally in the disk cache or on the web.
+
+    Args:
+        url (string): Address of the document
+    Returns:
+        (dict) Document
+    """
+    url = urldefrag(url)[0]
+    with _documents_lock:
+        if url in _documents:
+            return _documents[url]
+
+    # Use the offline bundle, if available
+    schema = None
+    bundle = os.environ.get('DLHUB_SCHEMA_DIR')
+    if bundle is not None and url.startswith(_schema_repo):
+        schema = _read_json(os.path.join(bundle, *url[len(_schema_repo):].split('/')))
+    if schema is None:
+        schema = _download_schema(url)
+
+    with _documents_lock:
+        return _documents.setdefault(url, schema)
+
+
+def get_validator(schema_name):
+    """Get a validator for one of the DLHub schemas
+
+    A new validator is made for each call, as the resolver of a validator tracks the
+    scope of the references being followed and cannot be shared between threads.
+    The schemas themselves are loaded once per process, and references to other
+    documents are resolved through :func:`get_schema_document`.
+
+    Args:
+        schema_name (string): Name of schema (e.g., "dataset")
+    Returns:
+        (Draft4Validator) Validator for the schema
+    """
+    url = urljoin(_schema_repo, '{}.json'.format(schema_name))
+    schema = get_schema_document(url)
+    resolver = RefResolver(url, schema, handlers={'http': get_schema_document,
+                                                  'https': get_schema_document})
+    return Draft4Validator(schema, resolver=resolver)
+
+
+def clear_schema_cache(disk=False):
+    """Forget the schemas and validators loaded by this process
+
+    Args:
+        disk (bool): Whether to also delete the schemas cached on disk
+    """
+    with _documents_lock:
+        _documents.clear()
+    get_compiled_validator.cache_clear()
+    if disk:
+        for root, _, files in os.walk(_cache_dir):
+            for file in files:
+                os.unlink(os.path.join(root, file))
+
+
+def save_schema_bundle(directory, schema_names=('servable', 'dataset')):
+    """Save schemas and the documents they reference for use without an internet connection
+
+    Set the ``DLHUB_SCHEMA_DIR`` environment variable to the directory to use the bundle.
+
+    Args:
+        directory (string): Directory in which to save the schemas
+        schema_names ([string]): Names of the schemas to save
+    """
+    # Save every document from the schema repository
+    for url, document in _get_schema_documents(schema_names).items():
+        if url.startswith(_schema_repo):
+            path = os.path.join(directory, *url[len(_schema_repo):].split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as fp:
+                json.dump(document, fp, indent=2)
+
+
+def _get_schema_documents(schema_names):
+    """Get schemas and all of the documents they reference
+
+    Args:
+        schema_names ([string]): Names of the schemas
+    Returns:
+        (dict) Each document, keyed by its address
+    """
+    urls = set()
+    for name in schema_names:
+        url = urljoin(_schema_repo, '{}.json'.format(name))
+        urls.add(url)
+        _find_references(url, get_schema_document(url), urls)
+    return dict((url, get_schema_document(url)) for url in urls)
+
+
+def _find_references(scope, document, urls):
+    """Find all documents referenced by a schema, directly or indirectly
+
+    Args:
+        scope (string): Address of the document being searched
+        document: Part of the document being searched
+        urls (set): Addresses of the documents found so far. Updated in place
+    """
+    if isinstance(document, dict):
+        ref = document.get('$ref')
+        if isinstance(ref, str):
+            url = urldefrag(urljoin(scope, ref))[0]
+            if url not in urls:
+                urls.add(url)
+                _find_references(url, get_schema_document(url), urls)
+        for value in document.values():
+            _find_references(scope, value, urls)
+    elif isinstance(document, list):
+        for value in document:
+            _find_references(scope, value, urls)
 
 
 def validate_against_dlhub_schema(document, schema_name):
     """Validate a metadata document against one of the DLHub schemas
 
-    Note: Requires an internet connection
+    Note: Requires an internet connection the first time a schema is used, unless the
+    schemas are cached on disk or an offline bundle is available
+    (see :func:`get_schema_document`)
 
     Args:
         document (dict): Document instance to be validated
@@ -17,13 +242,478 @@ def validate_against_dlhub_schema(document, schema_name):
     Raises:
         (jsonschema.SchemaError) If the schema fails to validate
     """
+    get_validator(schema_name).validate(document)
+
+
+_type_checks = {
+    'array': lambda x: isinstance(x, list),
+    'boolean': lambda x: isinstance(x, bool),
+    'integer': lambda x: isinstance(x, int) and not isinstance(x, bool),
+    'null': lambda x: x is None,
+    'number': lambda x: isinstance(x, (int, float)) and not isinstance(x, bool),
+    'object': lambda x: isinstance(x, dict),
+    'string': lambda x: isinstance(x, str),
+}
+
+
+def _json_equal(a, b):
+    """Compare JSON values without treating booleans as numbers"""
+    return a == b and isinstance(a, bool) == isinstance(b, bool)
+
+
+class CompiledValidator:
+    """Validator that compiles a JSON schema into Python functions
+
+    The schema is translated once into a tree of closures, each specialized for one
+    keyword of the schema, which avoids interpreting the schema again for every document.
+    Supports the Draft 4 keywords used by the DLHub schemas, including ``$ref`` (resolved
+    once, at compile time) and recursive references. ``format`` is not checked, which
+    matches the default behavior of :class:`jsonschema.Draft4Validator`.
+
+    Errors are :class:`jsonschema.ValidationError` objects with the same messages and
+    paths as those from ``jsonschema``, and all errors in a document are found in one pass.
+    """
+
+    def __init__(self, schema, resolver=None):
+        """
+        Args:
+            schema (dict): Schema to be compiled
+            resolver (RefResolver): Resolver for references in the schema
+        """
+        self.schema = schema
+        self.resolver = resolver if resolver is not None else RefResolver.from_schema(schema)
+        self._refs = {}
+        self._check = self._compile(schema, self.resolver.resolution_scope)
+
+    def iter_errors(self, instance):
+        """Find all errors in a document
+
+        Args:
+            instance: Document to be validated
+        Returns:
+            ([ValidationError]) Errors in the document. Empty if it is valid
+        """
+        errors = []
+        self._check(instance, (), errors)
+        return errors
+
+    def is_valid(self, instance):
+        """Determine whether a document is valid
+
+        Args:
+            instance: Document to be validated
+        Returns:
+            (bool) Whether the document is valid
+        """
+        return len(self.iter_errors(instance)) == 0
+
+    def validate(self, instance):
+        """Validate a document
+
+        Args:
+            instance: Document to be validated
+        Raises:
+            (ValidationError) The first error in the document
+        """
+        errors = self.iter_errors(instance)
+        if len(errors) > 0:
+            raise errors[0]
+
+    def _compile(self, schema, scope):
+        """Make a function that checks a document against a schema
+
+        Args:
+            schema (dict): Schema to be compiled
+            scope (string): Address used to resolve references in the schema
+        Returns:
+            Function that takes a document, its path and a list to which errors are appended
+        """
+        if not isinstance(schema, dict):
+            return lambda x, path, errors: None
+        if isinstance(schema.get('id'), str):
+            scope = urljoin(scope, schema['id'])
+
+        # Other keywords are ignored when a reference is present
+        if '$ref' in schema:
+            return self._compile_ref(schema['$ref'], scope)
+
+        checks = []
+        for keyword, value in schema.items():
+            compiler = getattr(self, '_compile_' + keyword, None)
+            if compiler is not None:
+                check = compiler(value, schema, scope)
+                if check is not None:
+                    checks.append(check)
+
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(x, path, errors):
+            for check in checks:
+                check(x, path, errors)
+        return check_all
+
+    def _compile_ref(self, ref, scope):
+        url = urljoin(scope, ref)
+        if url in self._refs:
+            # Look up the function when called, in case it is still being compiled
+            refs = self._refs
+            return lambda x, path, errors: refs[url](x, path, errors)
+        self._refs[url] = None
+        _, resolved = self.resolver.resolve(url)
+        self._refs[url] = self._compile(resolved, urldefrag(url)[0])
+        return self._refs[url]
+
+    def _compile_type(self, value, schema, scope):
+        types = [value] if isinstance(value, str) else list(value)
+        checks = [_type_checks[t] for t in types if t in _type_checks]
+        if len(checks) < len(types):
+            return None  # Unknown types are not checked
+
+        def check(x, path, errors):
+            for type_check in checks:
+                if type_check(x):
+                    return
+            errors.append(ValidationError('%r is not of type %s' % (
+                x, ', '.join(repr(t) for t in types)), path=path))
+        return check
+
+    def _compile_enum(self, value, schema, scope):
+        def check(x, path, errors):
+            if not any(_json_equal(x, e) for e in value):
+                errors.append(ValidationError('%r is not one of %r' % (x, value), path=path))
+        return check
+
+    def _compile_required(self, value, schema, scope):
+        def check(x, path, errors):
+            if isinstance(x, dict):
+                for name in value:
+                    if name not in x:
+                        errors.append(ValidationError('%r is a required property' % name,
+                                                      path=path))
+        return check
+
+    def _compile_properties(self, value, schema, scope):
+        properties = [(k, self._compile(v, scope)) for k, v in value.items()]
+
+        def check(x, path, errors):
+            if isinstance(x, dict):
+                for name, prop_check in properties:
+                    if name in x:
+                        prop_check(x[name], path + (name,), errors)
+        return check
+
+    def _compile_patternProperties(self, value, schema, scope):
+        patterns = [(re.compile(k), self._compile(v, scope)) for k, v in value.items()]
+
+        def check(x, path, errors):
+            if isinstance(x, dict):
+                for pattern, prop_check in patterns:
+                    for name, item in x.items():
+                        if pattern.search(name):
+                            prop_check(item, path + (name,), errors)
+        return check
+
+    def _compile_additionalProperties(self, value, schema, scope):
+        known = set(schema.get('properties', {}))
+        patterns = [re.compile(p) for p in schema.get('patternProperties', {})]
+        if value is True or value == {}:
+            return None
+        item_check = None if value is False else self._compile(value, scope)
+
+        def check(x, path, errors):
+            if not isinstance(x, dict):
+                return
+            extras = [k for k in x if k not in known and not any(p.search(k) for p in patterns)]
+            if item_check is not None:
+                for name in extras:
+                    item_check(x[name], path + (name,), errors)
+            elif len(extras) > 0:
+                verb = 'was' if len(extras) == 1 else 'were'
+                errors.append(ValidationError(
+                    'Additional properties are not allowed (%s %s unexpected)' % (
+                        ', '.join(repr(e) for e in sorted(extras)), verb), path=path))
+        return check
+
+    def _compile_minProperties(self, value, schema, scope):
+        def check(x, path, errors):
+            if isinstance(x, dict) and len(x) < value:
+                errors.append(ValidationError('%r does not have enough properties' % (x,),
+                                              path=path))
+        return check
+
+    def _compile_maxProperties(self, value, schema, scope):
+        def check(x, path, errors):
+            if isinstance(x, dict) and len(x) > value:
+                errors.append(ValidationError('%r has too many properties' % (x,), path=path))
+        return check
+
+    def _compile_dependencies(self, value, schema, scope):
+        dependencies = [(k, v if isinstance(v, list) else self._compile(v, scope))
+                        for k, v in value.items()]
+
+        def check(x, path, errors):
+            if not isinstance(x, dict):
+                return
+            for name, dependency in dependencies:
+                if name not in x:
+                    continue
+                if isinstance(dependency, list):
+                    for other in dependency:
+                        if other not in x:
+                            errors.append(ValidationError(
+                                '%r is a dependency of %r' % (other, name), path=path))
+                else:
+                    dependency(x, path, errors)
+        return check
+
+    def _compile_items(self, value, schema, scope):
+        if isinstance(value, list):
+            item_checks = [self._compile(v, scope) for v in value]
+
+            def check(x, path, errors):
+                if isinstance(x, list):
+                    for i, (item, item_check) in enumerate(zip(x, item_checks)):
+                        item_check(item, path + (i,), errors)
+            return check
+
+        item_check = self._compile(value, scope)
+
+        def check(x, path, errors):
+            if isinstance(x, list):
+                for i, item in enumerate(x):
+                    item_check(item, path + (i,), errors)
+        return check
+
+    def _compile_additionalItems(self, value, schema, scope):
+        if not isinstance(schema.get('items'), list) or value is True:
+            return None
+        n_items = len(schema['items'])
+        item_check = None if value is False else self._compile(value, scope)
+
+        def check(x, path, errors):
+            if not isinstance(x, list) or len(x) <= n_items:
+                return
+            if item_check is None:
+                errors.append(ValidationError(
+                    'Additional items are not allowed (%s were unexpected)' % (
+                        ', '.join(repr(e) for e in x[n_items:])), path=path))
+            else:
+                for i in range(n_items, len(x)):
+                    item_check(x[i], path + (i,), errors)
+        return check
+
+    def _compile_minItems(self, value, schema, scope):
+        def check(x, path, errors):
+            if isinstance(x, list) and len(x) < value:
+                errors.append(ValidationError('%r is too short' % (x,), path=path))
+        return check
+
+    def _compile_maxItems(self, value, schema, scope):
+        def check(x, path, errors):
+            if isinstance(x, list) and len(x) > value:
+                errors.append(ValidationError('%r is too long' % (x,), path=path))
+        return check
+
+    def _compile_uniqueItems(self, value, schema, scope):
+        if not value:
+            return None
+
+        def check(x, path, errors):
+            if not isinstance(x, list):
+                return
+            for i, item in enumerate(x):
+                if any(_json_equal(item, other) for other in x[i + 1:]):
+                    errors.append(ValidationError('%r has non-unique elements' % (x,),
+                                                  path=path))
+                    return
+        return check
+
+    def _compile_minLength(self, value, schema, scope):
+        def check(x, path, errors):
+            if isinstance(x, str) and len(x) < value:
+                errors.append(ValidationError('%r is too short' % (x,), path=path))
+        return check
+
+    def _compile_maxLength(self, value, schema, scope):
+        def check(x, path, errors):
+            if isinstance(x, str) and len(x) > value:
+                errors.append(ValidationError('%r is too long' % (x,), path=path))
+        return check
+
+    def _compile_pattern(self, value, schema, scope):
+        pattern = re.compile(value)
+
+        def check(x, path, errors):
+            if isinstance(x, str) and not pattern.search(x):
+                errors.append(ValidationError('%r does not match %r' % (x, value), path=path))
+        return check
+
+    def _compile_minimum(self, value, schema, scope):
+        exclusive = schema.get('exclusiveMinimum', False)
+
+        def check(x, path, errors):
+            if not _type_checks['number'](x):
+                return
+            if exclusive and x <= value:
+                errors.append(ValidationError(
+                    '%r is less than or equal to the minimum of %r' % (x, value), path=path))
+            elif x < value:
+                errors.append(ValidationError(
+                    '%r is less than the minimum of %r' % (x, value), path=path))
+        return check
+
+    def _compile_maximum(self, value, schema, scope):
+        exclusive = schema.get('exclusiveMaximum', False)
+
+        def check(x, path, errors):
+            if not _type_checks['number'](x):
+                return
+            if exclusive and x >= value:
+                errors.append(ValidationError(
+                    '%r is greater than or equal to the maximum of %r' % (x, value), path=path))
+            elif x > value:
+                errors.append(ValidationError(
+                    '%r is greater than the maximum of %r' % (x, value), path=path))
+        return check
+
+    def _compile_multipleOf(self, value, schema, scope):
+        def check(x, path, errors):
+            if not _type_checks['number'](x):
+                return
+            if isinstance(value, float) or isinstance(x, float):
+                quotient = x / value
+                failed = int(quotient) != quotient
+            else:
+                failed = x % value
+            if failed:
+                errors.append(ValidationError('%r is not a multiple of %r' % (x, value),
+                                              path=path))
+        return check
+
+    def _compile_allOf(self, value, schema, scope):
+        checks = [self._compile(v, scope) for v in value]
+
+        def check(x, path, errors):
+            for sub_check in checks:
+                sub_check(x, path, errors)
+        return check
+
+    def _compile_anyOf(self, value, schema, scope):
+        checks = [self._compile(v, scope) for v in value]
+
+        def check(x, path, errors):
+            for sub_check in checks:
+                sub_errors = []
+                sub_check(x, path, sub_errors)
+                if len(sub_errors) == 0:
+                    return
+            errors.append(ValidationError('%r is not valid under any of the given schemas' % (x,),
+                                          path=path))
+        return check
+
+    def _compile_oneOf(self, value, schema, scope):
+        checks = [self._compile(v, scope) for v in value]
+
+        def check(x, path, errors):
+            valid = []
+            for sub_schema, sub_check in zip(value, checks):
+                sub_errors = []
+                sub_check(x, path, sub_errors)
+                if len(sub_errors) == 0:
+                    valid.append(sub_schema)
+            if len(valid) == 0:
+                errors.append(ValidationError(
+                    '%r is not valid under any of the given schemas' % (x,), path=path))
+            elif len(valid) > 1:
+                reprs = ', '.join(repr(s) for s in valid[1:] + valid[:1])  # Same as jsonschema
+                errors.append(ValidationError('%r is valid under each of %s' % (x, reprs),
+                                              path=path))
+        return check
+
+    def _compile_not(self, value, schema, scope):
+        sub_check = self._compile(value, scope)
+
+        def check(x, path, errors):
+            sub_errors = []
+            sub_check(x, path, sub_errors)
+            if len(sub_errors) == 0:
+                errors.append(ValidationError('%r is not allowed for %r' % (value, x), path=path))
+        return check
+
+
+@lru_cache(maxsize=None)
+def get_compiled_validator(schema_name):
+    """Get a compiled validator for one of the DLHub schemas
+
+    Validators are compiled once per schema and reused. References are resolved at
+    compile time, so compiled validators can be shared between threads.
+
+    Args:
+        schema_name (string): Name of schema (e.g., "dataset")
+    Returns:
+        (CompiledValidator) Validator for the schema
+    """
+    validator = get_validator(schema_name)
+    return CompiledValidator(validator.schema, validator.resolver)
+
+
+# Validators compiled from schemas sent to this process, keyed by the address of the schema
+_bundle_validators = {}
+
+
+def _validate_chunk(documents, schema_name, bundle=None):
+    """Validate a list of documents against one of the DLHub schemas
+
+    Args:
+        documents ([dict]): Documents to be validated
+        schema_name (string): Name of schema
+        bundle (tuple): Address of the schema and a dictionary of the schema and all
+            documents it references, keyed by address. If provided, the validator is
+            compiled from these documents rather than loading the schema
+    Returns:
+        ([[ValidationError]]) Errors for each document
+    """
+    if bundle is None:
+        validator = get_compiled_validator(schema_name)
+    else:
+        url, schema_documents = bundle
+        validator = _bundle_validators.get(url)
+        if validator is None:
+            resolver = RefResolver(url, schema_documents[url], store=schema_documents)
+            validator = _bundle_validators[url] = CompiledValidator(schema_documents[url],
+                                                                    resolver)
+    return [validator.iter_errors(d) for d in documents]
+
+
+def validate_documents(documents, schema_name, processes=None, chunk_size=256):
+    """Validate many metadata documents against one of the DLHub schemas
 
-    # Make the schema validator
-    schema = requests.get("{}/{}.json".format(_schema_repo, schema_name)).json()
-    validator = Draft4Validator(schema, resolver=RefResolver(_schema_repo, schema))
+    Uses a :class:`CompiledValidator` and finds every error in each document.
+    The schemas are loaded by the current process and sent to the other processes,
+    which do not need access to the disk cache or the web.
+
+    Args:
+        documents ([dict]): Documents to be validated
+        schema_name (string): Name of schema (e.g., "servable")
+        processes (int): Number of processes to use. Default is to validate
+            in the current process
+        chunk_size (int): Number of documents sent to a process at a time
+    Returns:
+        ([[ValidationError]]) Errors found in each document, in the same order as
+        ``documents``. The list for a valid document is empty
+    """
+    documents = list(documents)
+    if processes is None or len(documents) <= chunk_size:
+        return _validate_chunk(documents, schema_name)
 
-    # Test the document
-    validator.validate(document)
+    url = urljoin(_schema_repo, '{}.json'.format(schema_name))
+    bundle = (url, _get_schema_documents([schema_name]))
+    chunks = [documents[i:i + chunk_size] for i in range(0, len(documents), chunk_size)]
+    with ProcessPoolExecutor(processes) as executor:
+        results = executor.map(_validate_chunk, chunks, [schema_name] * len(chunks),
+                               [bundle] * len(chunks))
+        return [errors for chunk in results for errors in chunk]
 
 
 def codemeta_to_datacite(metadata):
@@ -1,6 +1,11 @@
 """Tools for interacting with the DLHub Search Index"""
 
-from mdf_toolbox.search_helper import SearchHelper
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from mdf_toolbox import gmeta_pop
+from mdf_toolbox.search_helper import NONADVANCED_LIMIT, SEARCH_LIMIT, SearchHelper
 from globus_sdk.search import SearchClient
 from warnings import warn
 
@@ -18,6 +23,75 @@ class DLHubSearchHelper(SearchHelper):
         """
         super(DLHubSearchHelper, self).__init__("dlhub", search_client=search_client, **kwargs)
 
+        # Options of the query that SearchHelper does not expose, used by get_search_query
+        self._advanced = bool(kwargs.get('advanced'))
+        self._sort = []
+
+    def match_field(self, field, value, required=True, new_group=False):
+        self._advanced = True
+        return super(DLHubSearchHelper, self).match_field(field, value, required=required,
+                                                          new_group=new_group)
+
+    def exclude_field(self, field, value, new_group=False):
+        self._advanced = True
+        return super(DLHubSearchHelper, self).exclude_field(field, value, new_group=new_group)
+
+    def add_sort(self, field, ascending=True):
+        if field:
+            self._sort.append({'field_name': str(field), 'order': 'asc' if ascending else 'desc'})
+        return super(DLHubSearchHelper, self).add_sort(field, ascending=ascending)
+
+    def reset_query(self):
+        self._advanced = False
+        self._sort = []
+        return super(DLHubSearchHelper, self).reset_query()
+
+    def get_search_query(self, limit=None):
+        """Get the query document that would be sent to Globus Search
+
+        Useful for executing the query with a different HTTP client
+
+        Args:
+            limit (int): Maximum number of entries to return. Default is the same as
+                for :meth:`search`
+        Returns:
+            dict: Query in the format expected by the Globus Search API
+        """
+        q = self.current_query()
+        if not q:
+            raise ValueError('No query has been set.')
+
+        if limit is None:
+            limit = SEARCH_LIMIT if self._advanced else NONADVANCED_LIMIT
+        elif limit > SEARCH_LIMIT:
+            warn('Reduced result limit from {} to the Search maximum: {}'
+                 .format(limit, SEARCH_LIMIT), RuntimeWarning)
+            limit = SEARCH_LIMIT
+
+        query = {'q': q, 'limit': limit}
+        if self._advanced:
+            query['advanced'] = True
+        if len(self._sort) > 0:
+            query['sort'] = list(self._sort)
+        return query
+
+    def search(self, q=None, advanced=False, limit=None, info=False, reset_query=True,
+               fields=None):
+        """Execute a search and return the results, up to the ``SEARCH_LIMIT``.
+
+        Arguments are the same as for :meth:`SearchHelper.search`, with the addition of:
+
+        Args:
+            fields ([str]): Fields to keep, see :func:`project_fields`
+        """
+        res = super(DLHubSearchHelper, self).search(q=q, advanced=advanced, limit=limit,
+                                                    info=info, reset_query=reset_query)
+        if fields is None:
+            return res
+        if info:
+            return [project_fields(r, fields) for r in res[0]], res[1]
+        return [project_fields(r, fields) for r in res]
+
     def match_owner(self, owner):
         """Add a model owner to the query.
 
@@ -161,6 +235,210 @@ def filter_latest(results):
     return [r[0] for r in latest_res.values()]
 
 
+def _copy_field(source, dest, path):
+    """Copy a field from one record to another
+
+    Args:
+        source (dict): Record to copy from
+        dest (dict): Record to copy to
+        path ([str]): Keys leading to the field
+    """
+    key = path[0]
+    if key not in source:
+        return
+    value = source[key]
+    if len(path) == 1:
+        dest[key] = value
+    elif isinstance(value, dict):
+        _copy_field(value, dest.setdefault(key, {}), path[1:])
+    elif isinstance(value, list):
+        # Apply the rest of the path to each entry of the list
+        items = dest.setdefault(key, [{} for _ in value])
+        for item, dest_item in zip(value, items):
+            if isinstance(item, dict):
+                _copy_field(item, dest_item, path[1:])
+
+
+def project_fields(record, fields):
+    """Get only certain fields from a record
+
+    The search functions take the same list of ``fields``, where ``None`` keeps all fields.
+    Records are trimmed after they are received in full, as Globus Search always returns
+    complete records, so this does not reduce the data sent by the service.
+
+    Args:
+        record (dict): Record to be projected
+        fields ([str]): Fields to keep, in dot notation (e.g., ``"dlhub.shorthand_name"``).
+            Fields inside lists apply to each entry of the list
+            (e.g., ``"datacite.creators.familyName"``)
+    Returns:
+        (dict) Record containing only the requested fields
+    """
+    output = {}
+    for field in fields:
+        _copy_field(record, output, field.split('.'))
+    return output
+
+
+def filter_latest_sorted(results):
+    """Get only the most recent version of each servable from a sorted stream of results
+
+    Unlike :func:`filter_latest`, results are processed one at a time and only the name
+    of the previous servable is kept in memory. Requires the results to be sorted such that
+    all versions of a servable are adjacent, newest first.
+
+    Args:
+        results (iterable of dict): Sorted results
+    Yields:
+        (dict) Most recent version of each servable
+    """
+    last_name = None
+    for res in results:
+        name = res['dlhub'].get('shorthand_name')
+        if name is None:
+            warn('Found entries in DLHub index that lack shorthand_name. '
+                 'Please contact DLHub team', RuntimeWarning)
+            continue
+        if name != last_name:
+            last_name = name
+            yield res
+
+
+def iter_search_pages(search_client, index, query, total, page_size=1000, max_concurrency=4,
+                      start=0, fields=None):
+    """Get the results of a query in pages, fetching several pages at once
+
+    Pages are yielded in order. At most ``max_concurrency`` pages are requested ahead of
+    the page being consumed, which bounds the memory used.
+
+    Args:
+        search_client (SearchClient): Client used to perform the search
+        index (string): UUID of the search index
+        query (dict): Query in the format expected by the Globus Search API
+        total (int): Number of results to retrieve
+        page_size (int): Number of results per page
+        max_concurrency (int): Maximum number of pages to request at once
+        start (int): Offset of the first result to retrieve
+        fields ([str]): Fields to keep, see :func:`project_fields`
+    Yields:
+        ([dict]) Results in each page
+    """
+
+    def get_page(offset):
+        page = dict(query, offset=offset, limit=min(page_size, total - offset))
+        results = gmeta_pop(search_client.post_search(index, page).data)
+        if fields is not None:
+            # Drop the other fields in the worker thread, before the page is queued
+            results = [project_fields(r, fields) for r in results]
+        return results
+
+    offsets = iter(range(start, total, page_size))
+    with ThreadPoolExecutor(max_concurrency) as executor:
+        pending = deque(executor.submit(get_page, o) for o in islice(offsets, max_concurrency))
+        try:
+            while len(pending) > 0:
+                page = pending.popleft().result()
+                offset = next(offsets, None)
+                if offset is not None:
+                    pending.append(executor.submit(get_page, offset))
+                yield page
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _make_servable_query(search_client, owner=None):
+    """Make a query for all servables, sorted by owner, name and then newest first
+
+    Args:
+        search_client (SearchClient): Client used to perform the search
+        owner (string): Owner of the servables. Default is to match all owners
+    Returns:
+        (dict) Query in the format expected by Globus Search
+    """
+    query = DLHubSearchHelper(search_client=search_client)\
+        .match_field('dlhub.type', 'servable').match_owner(owner)\
+        .add_sort('dlhub.owner', ascending=True).add_sort('dlhub.name', ascending=False)\
+        .add_sort('dlhub.publication_date', ascending=False)
+    return query.get_search_query()
+
+
+def _iter_all_servables(search_client, page_size, max_concurrency, fields=None):
+    """Iterate through every version of every servable
+
+    Args:
+        search_client (SearchClient): Client used to perform the search
+        page_size (int): Number of servables to retrieve in each request
+        max_concurrency (int): Maximum number of requests to make at once
+        fields ([str]): Fields to keep, see :func:`project_fields`
+    Yields:
+        (dict) Complete metadata for each servable
+    """
+    index = DLHubSearchHelper(search_client=search_client).index
+
+    # Get the first page and the number of servables for each owner
+    query = _make_servable_query(search_client)
+    first = dict(query, offset=0, limit=page_size, facets=[
+        {'name': 'owners', 'field_name': 'dlhub.owner', 'type': 'terms',
+         'size': SEARCH_LIMIT}
+    ])
+    reply = search_client.post_search(index, first).data
+    total = reply['total']
+
+    # Page through all servables at once, if possible
+    if total <= SEARCH_LIMIT:
+        for record in gmeta_pop(reply):
+            yield record if fields is None else project_fields(record, fields)
+        for page in iter_search_pages(search_client, index, query, total,
+                                      page_size, max_concurrency, start=page_size,
+                                      fields=fields):
+            yield from page
+        return
+
+    # Otherwise, get the servables of each owner separately
+    buckets = next(f['buckets'] for f in reply['facet_results'] if f['name'] == 'owners')
+    for bucket in sorted(buckets, key=lambda x: x['value']):
+        if bucket['count'] > SEARCH_LIMIT:
+            raise RuntimeError('{} has more servables than can be returned by a query'
+                               .format(bucket['value']))
+        query = _make_servable_query(search_client, bucket['value'])
+        for page in iter_search_pages(search_client, index, query, bucket['count'],
+                                      page_size, max_concurrency, fields=fields):
+            yield from page
+
+
+def iter_servables(search_client, only_latest_version=True, page_size=1000,
+                   max_concurrency=4, fields=None):
+    """Iterate through all of the servables in DLHub
+
+    Results are retrieved in pages, several at a time, and are sorted by owner, then
+    by name. If there are more servables than Globus Search can return for a single
+    query, the servables of each owner are retrieved with a separate query.
+
+    Args:
+        search_client (SearchClient): Client used to perform the search
+        only_latest_version (bool): Whether to only return the latest version of each servable
+        page_size (int): Number of servables to retrieve in each request
+        max_concurrency (int): Maximum number of requests to make at once
+        fields ([str]): Fields to keep, see :func:`project_fields`
+    Yields:
+        (dict) Metadata for each servable
+    """
+
+    # Keep the fields needed to find the latest version until it has been found
+    page_fields = fields
+    if fields is not None and only_latest_version:
+        page_fields = list(fields) + ['dlhub.shorthand_name']
+
+    results = _iter_all_servables(search_client, page_size, max_concurrency, page_fields)
+    if only_latest_version:
+        # The most recent version of each servable comes first in the sorted results
+        results = filter_latest_sorted(results)
+    if page_fields is not fields:
+        results = (project_fields(r, fields) for r in results)
+    yield from results
+
+
 def get_method_details(metadata, method_name=None):
     """Get the method details for use by humans
 
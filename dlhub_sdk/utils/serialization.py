@@ -0,0 +1,180 @@
+"""Tools for serializing the inputs and outputs of servables"""
+import pickle as pkl
+import hashlib
+import json
+
+from dlhub_sdk.utils.compression import compress_request, get_accept_encoding
+from dlhub_sdk.utils.multipart import MultipartBody, parse_multipart
+
+
+def _collect_buffer(buffers, buffer):
+    """Store a buffer to be sent out-of-band, if possible
+
+    Args:
+        buffers ([memoryview]): List of out-of-band buffers
+        buffer (pickle.PickleBuffer): Buffer provided by pickle
+    Returns:
+        (bool) ``True`` if the buffer must be serialized in-band
+    """
+    try:
+        buffers.append(buffer.raw())
+    except BufferError:
+        return True  # Buffer is not contiguous
+    return False
+
+
+def _hash_buffer(digest, buffer):
+    """Add an out-of-band buffer to a digest, if possible
+
+    Args:
+        digest: Hash object
+        buffer (pickle.PickleBuffer): Buffer provided by pickle
+    Returns:
+        (bool) ``True`` if the buffer must be serialized in-band
+    """
+    try:
+        view = buffer.raw()
+    except BufferError:
+        return True  # Buffer is not contiguous
+    digest.update(b'%d:' % view.nbytes)
+    digest.update(view)
+    return False
+
+
+def digest_inputs(inputs):
+    """Compute a digest that is identical for identical inputs
+
+    Inputs are pickled with the memory of NumPy arrays and other large buffers hashed
+    in place, without copying them into the pickle. Pickle protocol 5, which provides
+    the buffers, requires Python 3.8. Older versions copy the buffers into the pickle.
+    Equal inputs built differently (e.g., a list holding the same object twice versus
+    two equal objects, or a strided view of an array versus a contiguous copy) can
+    produce different digests.
+
+    Args:
+        inputs: Inputs to a servable
+    Returns:
+        (string) Hex digest of the inputs
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    if pkl.HIGHEST_PROTOCOL < 5:
+        payload = pkl.dumps(inputs, protocol=pkl.HIGHEST_PROTOCOL)
+    else:
+        payload = pkl.dumps(inputs, protocol=5,
+                            buffer_callback=lambda b: _hash_buffer(digest, b))
+    digest.update(payload)
+    return digest.hexdigest()
+
+
+def dumps_pickle5(obj):
+    """Serialize an object into a multipart message using pickle protocol 5
+
+    Large buffers (e.g., the memory of a NumPy array) are kept out of the pickle and
+    stored as separate parts of the message. The parts hold views of the original
+    memory, so the object must not be modified until the message is sent.
+
+    Args:
+        obj: Object to be serialized
+    Returns:
+        (MultipartBody) Message with the pickle in the first part and each buffer in a
+        following part
+    """
+    if pkl.HIGHEST_PROTOCOL < 5:
+        raise ValueError('Pickle protocol 5 requires Python 3.8 or newer')
+    buffers = []
+    payload = pkl.dumps(obj, protocol=5, buffer_callback=lambda b: _collect_buffer(buffers, b))
+
+    body = MultipartBody()
+    body.add_part('pickle', payload, 'application/python-pickle')
+    for i, buffer in enumerate(buffers):
+        body.add_part('buffer-{}'.format(i), buffer)
+    return body
+
+
+def loads_pickle5(parts):
+    """Restore an object from the parts of a message made by :func:`dumps_pickle5`
+
+    Buffers are not copied, so arrays in the object are views of the message and
+    are read-only if the message is.
+
+    Args:
+        parts ([tuple]): Name, headers and body of each part, as produced by
+            :func:`parse_multipart <dlhub_sdk.utils.multipart.parse_multipart>`
+    Returns:
+        Deserialized object
+    """
+    bodies = dict((name, body) for name, _, body in parts)
+    buffers = [bodies['buffer-{}'.format(i)] for i in range(len(bodies) - 1)]
+    return pkl.loads(bodies['pickle'], buffers=buffers)
+
+
+def encode_run_inputs(inputs, input_type):
+    """Serialize the inputs to a servable
+
+    Args:
+        inputs: Data to be used as input to the function
+        input_type (string): How to send the data to DLHub. See
+            :meth:`DLHubClient.run <dlhub_sdk.client.DLHubClient.run>`
+    Returns:
+        - (string or MultipartBody) Request body
+        - (string) Content type of the body
+    """
+    if input_type == 'python':
+        import jsonpickle  # Imported here as it is slow to load
+        # data = {'python': codecs.encode(pkl.dumps(inputs), 'base64').decode()}
+        data = {'python': jsonpickle.encode(inputs)}
+    elif input_type == 'json':
+        data = {'data': inputs}
+    elif input_type == 'pickle5':
+        body = dumps_pickle5(inputs)
+        return body, body.content_type
+    elif input_type == 'files':
+        raise NotImplementedError('Files support is not yet implemented')
+    else:
+        raise ValueError('Input type not recognized: {}'.format(input_type))
+    return json.dumps(data), 'application/json'
+
+
+def prepare_run_request(data, content_type, compression=None, compression_level=None,
+                        compression_threshold=0, library='urllib3'):
+    """Get the body and headers of a request to run a servable
+
+    Args:
+        data (string or MultipartBody): Serialized inputs, from :func:`encode_run_inputs`
+        content_type (string): Content type of ``data``
+        compression (string): Codec used to compress the body. ``None`` for no compression
+        compression_level (int): Compression level
+        compression_threshold (int): Minimum size of body, in bytes, to compress
+        library (string): HTTP library that will send the request, "urllib3" or "aiohttp".
+            Determines which compressed replies can be accepted
+    Returns:
+        - Body of the request
+        - (dict) Headers for the request
+    """
+    headers = {'Content-Type': content_type, 'Accept-Encoding': get_accept_encoding(library)}
+
+    # Binary requests may also receive a binary reply
+    if isinstance(data, MultipartBody):
+        headers['Accept'] = 'multipart/form-data, application/json'
+
+    # Compress large requests
+    if compression is not None:
+        data, encoding = compress_request(data, compression, compression_level,
+                                          compression_threshold)
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+    return data, headers
+
+
+def decode_run_result(content, content_type):
+    """Deserialize the result of a servable
+
+    Args:
+        content (bytes): Body of the reply from DLHub
+        content_type (string): Content type of the reply
+    Returns:
+        Results of running the servable
+    """
+    if content_type is not None and content_type.startswith('multipart/'):
+        return loads_pickle5(parse_multipart(content, content_type))
+    return json.loads(content)
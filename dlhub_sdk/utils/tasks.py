@@ -0,0 +1,275 @@
+"""Tools for monitoring the progress of DLHub tasks"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Thread
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+_terminal_statuses = ('COMPLETED', 'SUCCEEDED', 'FAILED', 'ERROR')
+
+
+class TaskTracker:
+    """Monitor the status of many DLHub tasks at once
+
+    Tasks are polled from a background thread using a small pool of workers.
+    The time between checks on a task starts at ``initial_delay`` and grows by a factor of
+    ``backoff`` after each check that finds the task still running, up to ``max_delay``.
+    Each delay is randomly perturbed by up to ``jitter`` (as a fraction of the delay) so that
+    tasks submitted together are not all checked at the same time.
+
+    Adding a task that is already being tracked does not create an additional check.
+
+    Example::
+
+        tracker = TaskTracker(client, [client.publish_servable(m) for m in models])
+        statuses = tracker.wait_all()
+    """
+
+    def __init__(self, client, task_ids=(), max_workers=8, initial_delay=1, max_delay=60,
+                 backoff=2, jitter=0.25, terminal_statuses=_terminal_statuses):
+        """Initialize the tracker
+
+        Args:
+            client (DLHubClient): Client used to check the task status
+            task_ids ([string]): IDs of tasks to be tracked
+            max_workers (int): Maximum number of status checks to run at once
+            initial_delay (float): Time to wait before the first check of each task, in seconds
+            max_delay (float): Maximum time between checks of a task, in seconds
+            backoff (float): Factor by which the time between checks increases
+            jitter (float): Maximum random change to each delay, as a fraction of the delay
+            terminal_statuses ([string]): Values of "status" that mark a task as finished
+        """
+        self.client = client
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.jitter = jitter
+        self.terminal_statuses = set(terminal_statuses)
+
+        # State of each task, protected by the condition's lock
+        self._condition = Condition()
+        self._statuses = {}
+        self._done = set()
+        self._unclaimed = deque()  # Finished tasks not yet returned by wait_any
+        self._next_check = {}
+        self._delays = {}
+        self._checking = set()  # Tasks with a status check in progress
+        self._task_callbacks = {}
+        self._callbacks = []
+        self._closed = False
+
+        # Create the workers used to check status
+        self._executor = ThreadPoolExecutor(max_workers)
+        self._thread = Thread(target=self._poll_loop, daemon=True)
+        self._thread.start()
+
+        for task_id in task_ids:
+            self.add(task_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Stop checking the status of tasks
+
+        Calls to :meth:`wait_all` and :meth:`wait_any` that are waiting on unfinished
+        tasks raise a :class:`RuntimeError`
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._executor.shutdown()
+
+    def _get_delay(self, delay):
+        """Add random jitter to a delay
+
+        Args:
+            delay (float): Delay before jitter
+        Returns:
+            (float) Delay with jitter
+        """
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def add(self, task_id, callback=None):
+        """Start tracking a task
+
+        Args:
+            task_id (string): ID of the task
+            callback (callable): Function to call with the task ID and status block
+                once this task finishes
+        Raises:
+            (RuntimeError) If the tracker is closed
+        """
+        run_now = False
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Cannot add tasks to a closed tracker')
+            if task_id not in self._statuses:
+                self._statuses[task_id] = None
+                self._delays[task_id] = self.initial_delay
+                self._next_check[task_id] = time.monotonic() + self._get_delay(self.initial_delay)
+                self._condition.notify_all()
+            if callback is not None:
+                if task_id in self._done:
+                    run_now = True
+                else:
+                    self._task_callbacks.setdefault(task_id, []).append(callback)
+        if run_now:
+            callback(task_id, self._statuses[task_id])
+        return self
+
+    def add_done_callback(self, callback):
+        """Add a function to be called each time a task finishes
+
+        The callback is invoked from the thread that checked the status of the task,
+        and is called immediately for tasks that have already finished.
+
+        Args:
+            callback (callable): Function that takes the task ID and status block as inputs
+        """
+        with self._condition:
+            self._callbacks.append(callback)
+            finished = [(t, self._statuses[t]) for t in self._done]
+        for task_id, status in finished:
+            callback(task_id, status)
+        return self
+
+    @property
+    def statuses(self):
+        """dict: Most recent status block for each task. ``None`` if it has not been checked"""
+        with self._condition:
+            return dict(self._statuses)
+
+    def done(self, task_id):
+        """Whether a certain task has finished
+
+        Args:
+            task_id (string): ID of the task
+        Returns:
+            (bool) Whether the task has finished
+        """
+        with self._condition:
+            return task_id in self._done
+
+    def wait_all(self, timeout=None):
+        """Wait for all tasks to finish
+
+        Args:
+            timeout (float): Maximum time to wait, in seconds
+        Returns:
+            (dict) Final status block for each task
+        Raises:
+            (TimeoutError) If the tasks do not finish before the timeout
+            (RuntimeError) If the tracker is closed before the tasks finish
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: self._closed or len(self._done) == len(self._statuses), timeout):
+                raise TimeoutError('{} tasks have not finished'.format(
+                    len(self._statuses) - len(self._done)))
+            if len(self._done) < len(self._statuses):
+                raise RuntimeError('Tracker was closed before {} tasks finished'.format(
+                    len(self._statuses) - len(self._done)))
+            return dict(self._statuses)
+
+    def wait_any(self, timeout=None):
+        """Wait for a task to finish
+
+        Each finished task is returned by only one call, in the order the tasks finished.
+
+        Args:
+            timeout (float): Maximum time to wait, in seconds
+        Returns:
+            - (string) ID of a finished task
+            - (dict) Final status block of that task
+        Raises:
+            (TimeoutError) If no tasks finish before the timeout
+            (ValueError) If all finished tasks have been returned and no tasks are running
+            (RuntimeError) If the tracker is closed before another task finishes
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                    lambda: len(self._unclaimed) > 0 or self._closed
+                    or len(self._done) == len(self._statuses),
+                    timeout):
+                raise TimeoutError('No tasks have finished')
+            if len(self._unclaimed) == 0:
+                if len(self._done) < len(self._statuses):
+                    raise RuntimeError('Tracker was closed before another task finished')
+                raise ValueError('All finished tasks have already been returned')
+            task_id = self._unclaimed.popleft()
+            return task_id, self._statuses[task_id]
+
+    def _check_status(self, task_id):
+        """Get the status of a task
+
+        Args:
+            task_id (string): ID of the task
+        Returns:
+            (dict) Status block, or ``None`` if the check failed
+        """
+        try:
+            return self.client.get_task_status(task_id)
+        except Exception:
+            logger.warning('Failed to get status of task {}'.format(task_id), exc_info=True)
+            return None
+
+    def _poll_loop(self):
+        """Start checks on tasks that are due until the tracker is closed"""
+        while True:
+            # Wait until at least one task is due for a check
+            with self._condition:
+                if self._closed:
+                    return
+                pending = [t for t in self._statuses
+                           if t not in self._done and t not in self._checking]
+                now = time.monotonic()
+                due = [t for t in pending if self._next_check[t] <= now]
+                if len(due) == 0:
+                    timeout = min(self._next_check[t] for t in pending) - now \
+                        if len(pending) > 0 else None
+                    self._condition.wait(timeout)
+                    continue
+                self._checking.update(due)
+
+            # Check on each task separately, so that a slow check does not delay the others
+            for task_id in due:
+                future = self._executor.submit(self._check_status, task_id)
+                future.add_done_callback(
+                    lambda f, task_id=task_id: self._update_status(task_id, f.result()))
+
+    def _update_status(self, task_id, status):
+        """Record the result of a status check and run callbacks if the task finished
+
+        Args:
+            task_id (string): ID of the task
+            status (dict): Status block, or ``None`` if the check failed
+        """
+        callbacks = []
+        with self._condition:
+            self._checking.discard(task_id)
+            if status is not None:
+                self._statuses[task_id] = status
+            if status is not None and status.get('status') in self.terminal_statuses:
+                self._done.add(task_id)
+                self._unclaimed.append(task_id)
+                callbacks = self._task_callbacks.pop(task_id, []) + self._callbacks
+            else:
+                delay = min(self._delays[task_id] * self.backoff, self.max_delay)
+                self._delays[task_id] = delay
+                self._next_check[task_id] = time.monotonic() + self._get_delay(delay)
+            self._condition.notify_all()
+
+        # Run the callbacks outside of the lock
+        for callback in callbacks:
+            try:
+                callback(task_id, status)
+            except Exception:
+                logger.warning('Callback for task {} failed'.format(task_id), exc_info=True)
@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+import numpy as np
+
+from dlhub_sdk.utils.batch import deduplicate_inputs, split_into_batches
+
+
+class TestBatch(TestCase):
+
+    def test_deduplicate(self):
+        # Test with a list
+        unique, inverse = deduplicate_inputs(['a', 'b', 'a', {'c': 1}, {'c': 1}])
+        self.assertEqual(['a', 'b', {'c': 1}], unique)
+        self.assertEqual([0, 1, 0, 2, 2], inverse)
+
+        # Test with objects that are not JSON-serializable
+        unique, inverse = deduplicate_inputs([{1, 2}, {1, 2}])
+        self.assertEqual([{1, 2}], unique)
+        self.assertEqual([0, 0], inverse)
+
+        # Records with the same JSON form but different types are kept apart
+        unique, inverse = deduplicate_inputs([(1, 2), [1, 2], {1: 'x'}, {'1': 'x'}, [1, 2]])
+        self.assertEqual([(1, 2), [1, 2], {1: 'x'}, {'1': 'x'}], unique)
+        self.assertEqual([0, 1, 2, 3, 1], inverse)
+
+        # Test with an array
+        x = np.array([[1, 2], [3, 4], [1, 2]])
+        unique, inverse = deduplicate_inputs(x)
+        self.assertIsInstance(unique, np.ndarray)
+        self.assertEqual([[1, 2], [3, 4]], unique.tolist())
+        self.assertEqual(x.tolist(), unique[inverse].tolist())
+
+    def test_split(self):
+        self.assertEqual([[0, 1], [2, 3], [4]], list(split_into_batches(list(range(5)), 2)))
+
+        batches = list(split_into_batches(np.zeros((5, 3)), 4))
+        self.assertEqual([(4, 3), (1, 3)], [b.shape for b in batches])
+
+        with self.assertRaises(ValueError):
+            list(split_into_batches([1], 0))
@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from unittest import TestCase
+import pickle as pkl
+import time
+
+from dlhub_sdk.utils.cache import TTLCache
+
+
+class TestCache(TestCase):
+
+    def test_expiration(self):
+        cache = TTLCache(maxsize=2, ttl=0.1)
+        calls = []
+
+        def loader(value):
+            calls.append(value)
+            return value
+
+        self.assertEqual(1, cache.get('a', lambda: loader(1)))
+        self.assertEqual(1, cache.get('a', lambda: loader(2)))
+        self.assertEqual([1], calls)
+
+        # Make sure entries expire
+        time.sleep(0.15)
+        self.assertEqual(3, cache.get('a', lambda: loader(3)))
+
+        # Least-recently used entries are evicted
+        cache.get('b', lambda: loader(4))
+        cache.get('a', lambda: loader(5))
+        cache.get('c', lambda: loader(6))
+        self.assertEqual(2, len(cache))
+        self.assertEqual(3, cache.get('a', lambda: loader(7)))
+        self.assertEqual(8, cache.get('b', lambda: loader(8)))
+
+        # Errors are not cached
+        with self.assertRaises(ValueError):
+            cache.get('d', lambda: int('x'))
+        self.assertEqual(9, cache.get('d', lambda: loader(9)))
+
+        # Check invalidation and pickling
+        cache.invalidate('d')
+        self.assertEqual(10, cache.get('d', lambda: loader(10)))
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        copy = pkl.loads(pkl.dumps(cache))
+        self.assertEqual(0.1, copy.ttl)
+
+    def test_single_flight(self):
+        cache = TTLCache()
+        started = Event()
+        release = Event()
+        calls = []
+
+        def loader():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return 'value'
+
+        with ThreadPoolExecutor(4) as executor:
+            futures = [executor.submit(cache.get, 'a', loader) for _ in range(4)]
+            started.wait()
+            time.sleep(0.05)
+            release.set()
+            self.assertEqual(['value'] * 4, [f.result() for f in futures])
+        self.assertEqual(1, len(calls))
+
+    def test_invalidate_during_load(self):
+        cache = TTLCache()
+        started = Event()
+        release = Event()
+
+        def loader():
+            started.set()
+            release.wait()
+            return 'old'
+
+        for key in ['a', None]:
+            with ThreadPoolExecutor(1) as executor:
+                future = executor.submit(cache.get, 'a', loader)
+                started.wait()
+                cache.invalidate(key)
+
+                # New requests do not wait for the load that started before invalidation
+                self.assertEqual('new', cache.get('a', lambda: 'new'))
+                release.set()
+                self.assertEqual('old', future.result())
+
+            # The old value does not replace the new one
+            self.assertEqual('new', cache.get('a', lambda: 'newer'))
+            self.assertEqual({}, cache._pending)
+            cache.clear()
+            started.clear()
+            release.clear()
+
+        # Invalidating other keys does not stop the value from being stored
+        with ThreadPoolExecutor(1) as executor:
+            future = executor.submit(cache.get, 'a', loader)
+            started.wait()
+            cache.invalidate('b')
+            release.set()
+            self.assertEqual('old', future.result())
+        self.assertEqual('old', cache.get('a', lambda: 'new'))
+
+    def test_stale(self):
+        cache = TTLCache(ttl=0.05, stale_ttl=10)
+        refreshed = Event()
+
+        def refresh():
+            refreshed.set()
+            return 'new'
+
+        cache.get('a', lambda: 'old')
+        time.sleep(0.1)
+
+        # The stale value is returned while the new one loads
+        self.assertEqual('old', cache.get('a', refresh))
+        self.assertTrue(refreshed.wait(1))
+        time.sleep(0.01)
+        self.assertEqual('new', cache.get('a', lambda: 'newer'))
+
+    def test_weight(self):
+        cache = TTLCache(ttl=10, max_weight=10, weigher=len)
+        cache.get('a', lambda: 'x' * 4)
+        cache.get('b', lambda: 'x' * 5)
+        self.assertEqual(9, cache.weight)
+
+        # Least-recently used entries are evicted to stay under the limit
+        cache.get('a', lambda: 'unused')
+        cache.get('c', lambda: 'x' * 3)
+        self.assertEqual(['a', 'c'], list(cache._entries))
+        self.assertEqual(7, cache.weight)
+
+        # The newest entry is kept even if it is too heavy
+        cache.get('d', lambda: 'x' * 20)
+        self.assertEqual(['d'], list(cache._entries))
+        cache.invalidate('d')
+        self.assertEqual(0, cache.weight)
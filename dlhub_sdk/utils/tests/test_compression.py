@@ -0,0 +1,67 @@
+from unittest import TestCase, mock, skipIf
+import gzip
+
+from urllib3.response import HTTPResponse
+
+from dlhub_sdk.utils import compression
+from dlhub_sdk.utils.compression import CompressedStream, compress, compress_request, decompress
+
+
+class _Chunks:
+    """Iterable whose size is unknown"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+
+class TestCompression(TestCase):
+
+    def test_gzip(self):
+        data = b'0123456789' * 100
+        self.assertEqual(data, gzip.decompress(compress(data, 'gzip')))
+        self.assertEqual(data, decompress(compress(data, 'gzip')))
+
+        # Small messages are not compressed
+        body, encoding = compress_request('small', 'gzip', threshold=1024)
+        self.assertEqual(b'small', body)
+        self.assertIsNone(encoding)
+
+        body, encoding = compress_request(data, 'gzip', level=1, threshold=512)
+        self.assertEqual('gzip', encoding)
+        self.assertEqual(data, gzip.decompress(body))
+
+    def test_stream(self):
+        chunks = [b'abc' * 100, memoryview(b'def' * 100)]
+        body, encoding = compress_request(_Chunks(chunks), 'gzip', threshold=1024)
+        self.assertIsInstance(body, CompressedStream)
+        self.assertEqual('gzip', encoding)
+
+        # Make sure the stream can be sent twice
+        for _ in range(2):
+            self.assertEqual(b'abc' * 100 + b'def' * 100, gzip.decompress(b''.join(body)))
+
+    def test_codecs(self):
+        with self.assertRaises(ValueError):
+            compress(b'data', 'lzma')
+        with self.assertRaises(ValueError):
+            decompress(b'data')
+        self.assertTrue(compression.get_accept_encoding().startswith('gzip'))
+
+    @skipIf(compression.zstandard is None, 'zstandard is not installed')
+    def test_zstd(self):
+        data = b'0123456789' * 100
+        body = compress(data, 'zstd')
+        self.assertEqual(data, compression.zstandard.ZstdDecompressor().decompress(body))
+        self.assertEqual(data, decompress(body))
+
+    def test_accept_encoding(self):
+        # zstd is only accepted if the HTTP library can decode it
+        with mock.patch.object(HTTPResponse, 'CONTENT_DECODERS', ['gzip', 'deflate']):
+            self.assertEqual('gzip, deflate', compression.get_accept_encoding())
+        with mock.patch.object(HTTPResponse, 'CONTENT_DECODERS', ['gzip', 'deflate', 'zstd']):
+            self.assertEqual('gzip, deflate, zstd', compression.get_accept_encoding())
+        with self.assertRaises(ValueError):
+            compression.get_accept_encoding('other')
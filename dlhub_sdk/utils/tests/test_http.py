@@ -0,0 +1,33 @@
+from unittest import TestCase
+import pickle as pkl
+import socket
+
+from dlhub_sdk.utils.http import PooledHTTPAdapter, make_session
+
+
+class TestHTTP(TestCase):
+
+    def test_session(self):
+        session = make_session(pool_connections=2, pool_maxsize=32, pool_block=True)
+
+        # Make sure the same adapter handles both protocols
+        adapter = session.get_adapter('https://api.dlhub.org')
+        self.assertIsInstance(adapter, PooledHTTPAdapter)
+        self.assertIs(adapter, session.get_adapter('http://localhost'))
+
+        # Check the pool settings
+        self.assertEqual(2, adapter.poolmanager.pools._maxsize)
+        self.assertEqual(32, adapter.poolmanager.connection_pool_kw['maxsize'])
+        self.assertTrue(adapter.poolmanager.connection_pool_kw['block'])
+        self.assertIn((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+                      adapter.poolmanager.connection_pool_kw['socket_options'])
+
+    def test_no_keep_alive(self):
+        adapter = PooledHTTPAdapter(keep_alive=False)
+        self.assertNotIn((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1), adapter.socket_options)
+
+    def test_pickle(self):
+        adapter = PooledHTTPAdapter(pool_maxsize=4)
+        adapter_copy = pkl.loads(pkl.dumps(adapter))
+        self.assertEqual(adapter.socket_options, adapter_copy.socket_options)
+        self.assertEqual(4, adapter_copy.poolmanager.connection_pool_kw['maxsize'])
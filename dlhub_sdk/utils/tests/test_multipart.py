@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from dlhub_sdk.utils.multipart import MultipartBody, parse_multipart
+
+
+class TestMultipart(TestCase):
+
+    def test_round_trip(self):
+        data = bytearray(b'\x00\x01--boundary\r\n')
+        body = MultipartBody(boundary='boundary')
+        body.add_part('json', b'{}', 'application/json')
+        body.add_part('data', memoryview(data), filename='data.bin')
+        self.assertEqual('multipart/form-data; boundary=boundary', body.content_type)
+
+        # Make sure the data is not copied
+        chunks = list(body)
+        self.assertTrue(any(c.obj is data for c in chunks if isinstance(c, memoryview)))
+        message = b''.join(chunks)
+        self.assertEqual(len(message), len(body))
+
+        # Parse it
+        parts = parse_multipart(message, body.content_type)
+        self.assertEqual(['json', 'data'], [p[0] for p in parts])
+        self.assertEqual(b'{}', bytes(parts[0][2]))
+        self.assertEqual('application/json', parts[0][1]['Content-Type'])
+        self.assertEqual(bytes(data), bytes(parts[1][2]))
+        self.assertEqual('data.bin', parts[1][1].get_filename())
+
+    def test_streaming(self):
+        body = MultipartBody([('file', (x for x in [b'a', b'', b'b']))])
+        with self.assertRaises(TypeError):
+            len(body)
+        parts = parse_multipart(b''.join(body), body.content_type)
+        self.assertEqual(b'ab', bytes(parts[0][2]))
+
+        # Test a bad message
+        with self.assertRaises(ValueError):
+            parse_multipart(b''.join(body)[:-20], body.content_type)
+        with self.assertRaises(ValueError):
+            parse_multipart(b'', 'multipart/form-data')
@@ -0,0 +1,82 @@
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase
+import os
+import time
+
+import numpy as np
+
+from dlhub_sdk.utils.results import ResultCache
+from dlhub_sdk.utils.serialization import digest_inputs
+
+
+class TestResults(TestCase):
+
+    def test_memory(self):
+        cache = ResultCache(maxsize=2)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return [1, 2]
+
+        # Concurrent runs share a single call
+        threads = [Thread(target=cache.get, args=('a/b', '1', [0], compute)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(calls))
+
+        # Each call gets a separate copy
+        result = cache.get('a/b', '1', [0], compute)
+        result.append(3)
+        self.assertEqual([1, 2], cache.get('a/b', '1', [0], compute))
+        self.assertEqual(1, len(calls))
+
+        # A new version does not use the old results
+        self.assertEqual([1, 2], cache.get('a/b', '2', [0], compute))
+        self.assertEqual(2, len(calls))
+        self.assertEqual([('a/b', '2')], [k[:2] for k in cache._memory.keys()])
+
+    def test_disk(self):
+        with TemporaryDirectory() as temp_dir:
+            cache = ResultCache(temp_dir, compression='gzip')
+            x = np.arange(4)
+            self.assertEqual(6, cache.get('a/b', '1', x, lambda: int(x.sum())))
+
+            # Results are read back by another cache
+            path = os.path.join(temp_dir, 'servables', 'a', 'b', '1', digest_inputs(x))
+            self.assertTrue(os.path.isfile(path))
+            other = ResultCache(temp_dir)
+            self.assertEqual(6, other.get('a/b', '1', x.copy(), lambda: 0))
+
+            # Corrupt files are recomputed
+            with open(path, 'wb') as fp:
+                fp.write(b'bad')
+            self.assertEqual(7, ResultCache(temp_dir).get('a/b', '1', x, lambda: 7))
+
+            # Results of older versions are deleted
+            self.assertEqual(8, other.get('a/b', '2', x, lambda: 8))
+            self.assertEqual(['2'], os.listdir(os.path.join(temp_dir, 'servables', 'a', 'b')))
+
+            # Versions that cannot be compared are kept
+            self.assertEqual(9, other.get('a/b', 'draft', x, lambda: 9))
+            self.assertEqual(['2', 'draft'],
+                             sorted(os.listdir(os.path.join(temp_dir, 'servables', 'a', 'b'))))
+            with self.assertRaises(ValueError):
+                other.get('a/b', None, x, lambda: 10)
+
+            # Names and versions that leave the directory of the cache are rejected
+            for name, version in [('../a', '1'), ('a/..', '3'), ('a//b', '3'), ('a/b', '../3')]:
+                with self.assertRaises(ValueError):
+                    other.get(name, version, x, lambda: 11)
+            self.assertEqual(['2', 'draft'],
+                             sorted(os.listdir(os.path.join(temp_dir, 'servables', 'a', 'b'))))
+
+            # Only the results are deleted
+            with open(os.path.join(temp_dir, 'other.txt'), 'w') as fp:
+                fp.write('keep')
+            cache.clear()
+            self.assertEqual(['other.txt'], os.listdir(temp_dir))
@@ -0,0 +1,187 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase, mock
+import json
+import multiprocessing
+import os
+import sys
+
+from jsonschema import Draft4Validator, ValidationError
+
+from dlhub_sdk.utils import schemas
+
+_documents = {
+    '/servable.json': {'type': 'object', 'properties': {
+        'dlhub': {'$ref': 'common/dlhub.json#/definitions/dlhub'}}},
+    '/common/dlhub.json': {'definitions': {'dlhub': {'type': 'object', 'required': ['name']}}}
+}
+
+_test_schema = {
+    'type': 'object',
+    'definitions': {
+        'node': {'type': 'object', 'required': ['name'], 'additionalProperties': False,
+                 'properties': {'name': {'type': 'string', 'pattern': '^[a-z]+$'},
+                                'children': {'type': 'array',
+                                             'items': {'$ref': '#/definitions/node'}}}}
+    },
+    'required': ['id', 'tree'],
+    'properties': {
+        'id': {'type': ['integer', 'null'], 'minimum': 0, 'exclusiveMinimum': True},
+        'tree': {'$ref': '#/definitions/node'},
+        'tags': {'type': 'array', 'uniqueItems': True, 'minItems': 1, 'maxItems': 3,
+                 'items': {'enum': ['a', 'b', 1]}},
+        'score': {'anyOf': [{'type': 'number', 'maximum': 1}, {'type': 'string', 'maxLength': 2}]},
+        'kind': {'oneOf': [{'type': 'string'}, {'enum': ['x', 5]}], 'not': {'enum': [5]}},
+        'extra': {'type': 'object', 'patternProperties': {'^x-': {'type': 'boolean'}},
+                  'minProperties': 1, 'dependencies': {'a': ['b']}}
+    }
+}
+
+
+class _MockRepository(BaseHTTPRequestHandler):
+    """Serves schemas with ETags"""
+
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(_documents[self.path]).encode()
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSchemas(TestCase):
+
+    def setUp(self):
+        _MockRepository.requests.clear()
+        self.server = HTTPServer(('127.0.0.1', 0), _MockRepository)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.temp_dir = TemporaryDirectory()
+        self.patches = [
+            mock.patch.object(schemas, '_schema_repo',
+                              'http://127.0.0.1:{}/'.format(self.server.server_port)),
+            mock.patch.object(schemas, '_cache_dir', os.path.join(self.temp_dir.name, 'cache'))
+        ]
+        for patch in self.patches:
+            patch.start()
+        schemas.clear_schema_cache()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        schemas.clear_schema_cache()
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def test_cache(self):
+        # References are resolved through the cache
+        schemas.validate_against_dlhub_schema({'dlhub': {'name': 'a'}}, 'servable')
+        with self.assertRaises(ValidationError):
+            schemas.validate_against_dlhub_schema({'dlhub': {}}, 'servable')
+        self.assertEqual(['/servable.json', '/common/dlhub.json'],
+                         [p for p, _ in _MockRepository.requests])
+
+        # Validators are not shared, but the schemas are
+        self.assertIsNot(schemas.get_validator('servable'), schemas.get_validator('servable'))
+        self.assertIs(schemas.get_validator('servable').schema,
+                      schemas.get_validator('servable').schema)
+        self.assertEqual(2, len(_MockRepository.requests))
+
+        # Fresh copies on disk are used without contacting the server
+        schemas.clear_schema_cache()
+        schemas.validate_against_dlhub_schema({'dlhub': {'name': 'a'}}, 'servable')
+        self.assertEqual(2, len(_MockRepository.requests))
+
+        # Stale copies are revalidated
+        schemas.clear_schema_cache()
+        with mock.patch.object(schemas, '_max_age', 0):
+            schemas.validate_against_dlhub_schema({'dlhub': {'name': 'a'}}, 'servable')
+
+            # Cached copies are used if the server is unavailable
+            self.server.shutdown()
+            self.server.server_close()
+            schemas.clear_schema_cache()
+            schemas.validate_against_dlhub_schema({'dlhub': {'name': 'a'}}, 'servable')
+        self.assertEqual([('/servable.json', '"v1"'), ('/common/dlhub.json', '"v1"')],
+                         _MockRepository.requests[2:])
+
+    def test_threads(self):
+        documents = [{'dlhub': {'name': str(i)}} if i % 2 else {'dlhub': {}} for i in range(200)]
+
+        def is_valid(document):
+            try:
+                schemas.validate_against_dlhub_schema(document, 'servable')
+                return True
+            except ValidationError:
+                return False
+
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(is_valid, documents))
+        self.assertEqual([i % 2 == 1 for i in range(200)], results)
+
+    def test_compiled(self):
+        """Make sure the compiled validator agrees with jsonschema"""
+        reference = Draft4Validator(_test_schema)
+        compiled = schemas.CompiledValidator(_test_schema)
+
+        documents = [
+            {'id': 1, 'tree': {'name': 'root', 'children': [{'name': 'leaf'}]}},
+            {'id': 0, 'tree': {'name': 'Root', 'children': [{'name': 1, 'other': True}]}},
+            {'id': True, 'tags': ['a', 'a', 'c', True], 'score': 'long'},
+            {'id': None, 'tree': {}, 'tags': [], 'score': 2.5, 'kind': 'x'},
+            {'id': 1.0, 'tree': [], 'kind': 5, 'extra': {'a': 1, 'x-y': 'no'}},
+            {'id': 3, 'tree': {'name': 'a'}, 'extra': {}, 'score': 0.5, 'kind': 'y'},
+            'not an object'
+        ]
+        for document in documents:
+            expected = set((e.message, tuple(e.path)) for e in reference.iter_errors(document))
+            actual = set((e.message, tuple(e.path)) for e in compiled.iter_errors(document))
+            self.assertEqual(expected, actual)
+        self.assertTrue(compiled.is_valid(documents[0]))
+        with self.assertRaises(ValidationError):
+            compiled.validate(documents[1])
+
+    def test_validate_documents(self):
+        documents = [{'dlhub': {'name': str(i)}} if i % 3 else {'dlhub': {}} for i in range(10)]
+        expected = [[] if i % 3 else ["'name' is a required property"] for i in range(10)]
+        for processes in [None, 2]:
+            errors = schemas.validate_documents(documents, 'servable', processes=processes,
+                                                chunk_size=3)
+            self.assertEqual(expected, [[e.message for e in x] for x in errors])
+
+        # Workers receive the schemas rather than loading them, so they need not share the
+        #  state of this process (e.g., the address of the mock repository)
+        if sys.version_info >= (3, 7):
+            executor = partial(ProcessPoolExecutor,
+                               mp_context=multiprocessing.get_context('spawn'))
+            with mock.patch.object(schemas, 'ProcessPoolExecutor', executor):
+                errors = schemas.validate_documents(documents, 'servable', processes=2,
+                                                    chunk_size=3)
+            self.assertEqual(expected, [[e.message for e in x] for x in errors])
+
+    def test_bundle(self):
+        bundle = os.path.join(self.temp_dir.name, 'bundle')
+        schemas.save_schema_bundle(bundle, ['servable'])
+        self.assertTrue(os.path.isfile(os.path.join(bundle, 'common', 'dlhub.json')))
+
+        # Use only the bundle
+        schemas.clear_schema_cache(disk=True)
+        _MockRepository.requests.clear()
+        with mock.patch.dict(os.environ, {'DLHUB_SCHEMA_DIR': bundle}):
+            with self.assertRaises(ValidationError):
+                schemas.validate_against_dlhub_schema({'dlhub': {}}, 'servable')
+        self.assertEqual([], _MockRepository.requests)
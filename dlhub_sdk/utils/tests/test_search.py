@@ -0,0 +1,134 @@
+from collections import Counter
+from unittest import TestCase, mock
+import re
+
+from dlhub_sdk.utils.search import (DLHubSearchHelper, filter_latest_sorted, iter_search_pages,
+                                    iter_servables, project_fields)
+
+
+def _make_record(owner, name, date):
+    return {'dlhub': {'owner': owner, 'name': name, 'shorthand_name': owner + '/' + name,
+                      'publication_date': date}}
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _SearchClient:
+    """Serves a fixed list of records, recording the pages requested"""
+
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+
+    def post_search(self, index, query):
+        self.queries.append(query)
+        page = self.records[query['offset']:query['offset'] + query['limit']]
+        return _Response({'total': len(self.records),
+                          'gmeta': [{'content': [r]} for r in page]})
+
+
+class _OwnerSearchClient(_SearchClient):
+    """Serves records sorted by owner, with facets and filtering by owner"""
+
+    def post_search(self, index, query):
+        self.queries.append(query)
+        match = re.search(r'dlhub\.owner:(\w+)', query['q'])
+        records = [r for r in self.records
+                   if match is None or r['dlhub']['owner'] == match.group(1)]
+        page = records[query.get('offset', 0):query.get('offset', 0) + query['limit']]
+        data = {'total': len(records), 'gmeta': [{'content': [r]} for r in page]}
+        if 'facets' in query:
+            counts = Counter(r['dlhub']['owner'] for r in records)
+            data['facet_results'] = [{'name': 'owners', 'buckets': [
+                {'value': k, 'count': v} for k, v in counts.items()]}]
+        return _Response(data)
+
+
+class TestSearch(TestCase):
+
+    def test_pages(self):
+        records = [_make_record('a', str(i), '1') for i in range(25)]
+        client = _SearchClient(records)
+        pages = list(iter_search_pages(client, 'index', {'q': '*'}, 25, page_size=10,
+                                       max_concurrency=2))
+        self.assertEqual([10, 10, 5], [len(p) for p in pages])
+        self.assertEqual(records, [r for p in pages for r in p])
+        self.assertEqual([0, 10, 20], sorted(q['offset'] for q in client.queries))
+        self.assertEqual({'*'}, set(q['q'] for q in client.queries))
+
+        # Start partway through
+        pages = list(iter_search_pages(client, 'index', {'q': '*'}, 25, page_size=10, start=10))
+        self.assertEqual(records[10:], [r for p in pages for r in p])
+
+    def test_query(self):
+        helper = DLHubSearchHelper(_SearchClient([]))
+        with self.assertRaises(ValueError):
+            helper.get_search_query()
+
+        helper.match_owner('a').add_sort('dlhub.name', ascending=False)
+        query = helper.get_search_query(limit=5)
+        self.assertIn('dlhub.owner:a', query['q'])
+        self.assertTrue(query['advanced'])
+        self.assertEqual(5, query['limit'])
+        self.assertEqual([{'field_name': 'dlhub.name', 'order': 'desc'}], query['sort'])
+
+        # Resetting the query also clears the options
+        helper.reset_query()
+        with self.assertRaises(ValueError):
+            helper.get_search_query()
+        self.assertEqual({'q': 'x', 'limit': 10},
+                         DLHubSearchHelper(_SearchClient([]), q='x').get_search_query())
+        self.assertEqual({'q': 'x', 'limit': 10000, 'advanced': True},
+                         DLHubSearchHelper(_SearchClient([]), q='x', advanced=True)
+                         .get_search_query())
+
+    def test_all_servables(self):
+        counts = [('a', 4), ('b', 7), ('c', 2)]
+        records = [_make_record(owner, str(i), str(d)) for owner, n in counts
+                   for i in range(n) for d in [2, 1]]
+        client = _OwnerSearchClient(records)
+
+        # Queries are split by owner when there are more servables than one query can return
+        with mock.patch('dlhub_sdk.utils.search.SEARCH_LIMIT', 20):
+            results = list(iter_servables(client, only_latest_version=False, page_size=3))
+        self.assertEqual(26, len(results))
+        self.assertEqual(Counter(id(r) for r in records), Counter(id(r) for r in results))
+        self.assertEqual({'a', 'b', 'c'}, set(re.search(r'dlhub\.owner:(\w+)', q['q']).group(1)
+                                              for q in client.queries[1:]))
+        self.assertTrue(all(q['limit'] <= 3 for q in client.queries))
+
+        # Only the latest version of each servable is kept
+        with mock.patch('dlhub_sdk.utils.search.SEARCH_LIMIT', 20):
+            results = list(iter_servables(client, page_size=3))
+        self.assertEqual(13, len(results))
+        self.assertEqual({'2'}, set(r['dlhub']['publication_date'] for r in results))
+
+        # Owners with too many servables for one query cannot be retrieved
+        with mock.patch('dlhub_sdk.utils.search.SEARCH_LIMIT', 12):
+            with self.assertRaises(RuntimeError):
+                list(iter_servables(client, page_size=3))
+
+    def test_filter(self):
+        records = [_make_record('a', 'y', '2'), _make_record('a', 'y', '1'),
+                   _make_record('a', 'x', '3'), _make_record('b', 'y', '1')]
+        self.assertEqual([records[0], records[2], records[3]],
+                         list(filter_latest_sorted(iter(records))))
+
+    def test_projection(self):
+        record = {'dlhub': {'name': 'x', 'owner': 'a'},
+                  'servable': {'methods': [{'name': 'run', 'input': 1}, {'name': 'train'}]}}
+        self.assertEqual({'dlhub': {'name': 'x'},
+                          'servable': {'methods': [{'name': 'run'}, {'name': 'train'}]}},
+                         project_fields(record, ['dlhub.name', 'servable.methods.name']))
+        self.assertEqual({'dlhub': {'name': 'x'}}, project_fields(record, ['dlhub.name', 'x.y']))
+        self.assertEqual('a', record['dlhub']['owner'])
+
+        # Projection is applied to each page
+        records = [_make_record('a', str(i), '1') for i in range(5)]
+        pages = iter_search_pages(_SearchClient(records), 'index', {'q': '*'}, 5, page_size=2,
+                                  fields=['dlhub.name'])
+        self.assertEqual([{'dlhub': {'name': str(i)}} for i in range(5)],
+                         [r for p in pages for r in p])
@@ -0,0 +1,66 @@
+from unittest import TestCase, mock, skipIf
+import pickle as pkl
+import json
+
+import numpy as np
+
+from dlhub_sdk.utils.multipart import parse_multipart
+from dlhub_sdk.utils.serialization import (dumps_pickle5, encode_run_inputs,
+                                           decode_run_result, digest_inputs)
+
+
+class TestSerialization(TestCase):
+
+    @skipIf(pkl.HIGHEST_PROTOCOL < 5, 'Pickle protocol 5 requires Python 3.8 or newer')
+    def test_pickle5(self):
+        x = {'a': np.arange(1024, dtype=np.float32).reshape(32, 32), 'b': 'text',
+             'c': np.arange(16)[::2]}
+
+        # Make sure the contiguous array is sent out-of-band without a copy
+        body = dumps_pickle5(x)
+        self.assertEqual(2, len(body.parts))
+        self.assertTrue(np.shares_memory(x['a'], np.frombuffer(body.parts[1][1], np.float32)))
+
+        # Make sure it can be read back in
+        message = b''.join(body)
+        y = decode_run_result(message, body.content_type)
+        self.assertEqual('text', y['b'])
+        self.assertTrue(np.array_equal(x['a'], y['a']))
+        self.assertTrue(np.array_equal(x['c'], y['c']))
+
+        # Make sure the array is a view of the message
+        parts = parse_multipart(message, body.content_type)
+        self.assertEqual(parts[1][2].obj, message)
+
+    def test_encode(self):
+        data, content_type = encode_run_inputs([1, 2], 'json')
+        self.assertEqual('application/json', content_type)
+        self.assertEqual({'data': [1, 2]}, json.loads(data))
+        self.assertEqual({'a': 1}, decode_run_result(b'{"a": 1}', 'application/json'))
+
+        with self.assertRaises(ValueError):
+            encode_run_inputs(1, 'bad')
+
+    @skipIf(pkl.HIGHEST_PROTOCOL < 5, 'Pickle protocol 5 requires Python 3.8 or newer')
+    def test_encode_pickle5(self):
+        data, content_type = encode_run_inputs(np.zeros(4), 'pickle5')
+        self.assertTrue(content_type.startswith('multipart/form-data'))
+
+    def test_digest(self):
+        x = np.arange(12, dtype=np.float64).reshape(3, 4)
+        self.assertEqual(digest_inputs(x), digest_inputs(x.copy()))
+        self.assertEqual(digest_inputs([x, 'a']), digest_inputs([x.copy(), 'a']))
+
+        # Shape, type and contents all matter
+        self.assertNotEqual(digest_inputs(x), digest_inputs(x.reshape(4, 3)))
+        self.assertNotEqual(digest_inputs(x), digest_inputs(x.astype(np.float32)))
+        self.assertNotEqual(digest_inputs(x), digest_inputs(x + 1))
+        self.assertNotEqual(digest_inputs([1, 2]), digest_inputs((1, 2)))
+
+        # Views that are not contiguous are pickled in-band
+        self.assertEqual(digest_inputs(x[:, ::2]), digest_inputs(x.copy()[:, ::2]))
+
+        # Versions of Python without pickle protocol 5 copy the arrays into the pickle
+        with mock.patch.object(pkl, 'HIGHEST_PROTOCOL', 4):
+            self.assertEqual(digest_inputs(x), digest_inputs(x.copy()))
+            self.assertNotEqual(digest_inputs(x), digest_inputs(x + 1))
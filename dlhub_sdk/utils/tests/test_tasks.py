@@ -0,0 +1,121 @@
+from collections import Counter
+from threading import Lock, Thread
+from unittest import TestCase
+import time
+
+from dlhub_sdk.utils.tasks import TaskTracker
+
+
+class FakeClient:
+    """Client whose tasks finish after a set number of status checks"""
+
+    def __init__(self, checks_needed, delays=None):
+        self.checks_needed = checks_needed
+        self.delays = delays or {}
+        self.checks = Counter()
+        self.lock = Lock()
+
+    def get_task_status(self, task_id):
+        with self.lock:
+            self.checks[task_id] += 1
+            count = self.checks[task_id]
+        time.sleep(self.delays.get(task_id, 0))
+        if count == 1 and task_id == 'flaky':
+            raise ConnectionError()
+        if count >= self.checks_needed[task_id]:
+            return {'status': 'FAILED' if task_id == 'bad' else 'COMPLETED'}
+        return {'status': 'RUNNING'}
+
+
+class TestTaskTracker(TestCase):
+
+    def test_tracker(self):
+        client = FakeClient({'fast': 1, 'slow': 4, 'bad': 2, 'flaky': 2})
+        finished = []
+        with TaskTracker(client, initial_delay=0.01, max_delay=0.05, jitter=0.1) as tracker:
+            tracker.add_done_callback(lambda t, s: finished.append(t))
+
+            # Add tasks, including a duplicate
+            for task in ['fast', 'slow', 'bad', 'fast', 'flaky']:
+                tracker.add(task)
+            self.assertEqual(4, len(tracker.statuses))
+
+            # Wait for the first one
+            task_id, status = tracker.wait_any(timeout=5)
+            self.assertTrue(tracker.done(task_id))
+
+            # Wait for all of them
+            statuses = tracker.wait_all(timeout=5)
+            self.assertEqual({'COMPLETED'}, set(statuses[t]['status']
+                                                for t in ['fast', 'slow', 'flaky']))
+            self.assertEqual('FAILED', statuses['bad']['status'])
+            self.assertEqual({'fast', 'slow', 'bad', 'flaky'}, set(client.checks))
+            self.assertEqual(1, client.checks['fast'])
+            self.assertEqual(4, client.checks['slow'])
+            self.assertEqual(sorted(finished), sorted(statuses))
+
+            # Callbacks for finished tasks are run immediately
+            late = []
+            tracker.add('fast', callback=lambda t, s: late.append(s))
+            self.assertEqual([{'status': 'COMPLETED'}], late)
+
+    def test_wait_any(self):
+        client = FakeClient({'a': 1, 'b': 3, 'c': 6})
+        with TaskTracker(client, ['a', 'b', 'c'], initial_delay=0.01, max_delay=0.01,
+                         jitter=0) as tracker:
+            # Each task is returned once, in the order they finish
+            finished = [tracker.wait_any(timeout=5)[0] for _ in range(3)]
+            self.assertEqual(['a', 'b', 'c'], finished)
+            with self.assertRaises(ValueError):
+                tracker.wait_any(timeout=5)
+
+            # Tasks added later are returned too
+            client.checks_needed['a2'] = 1
+            tracker.add('a2')
+            self.assertEqual(('a2', {'status': 'COMPLETED'}), tracker.wait_any(timeout=5))
+
+    def test_slow_check(self):
+        # A slow status check does not hold back the results of other tasks
+        client = FakeClient({'hung': 1, 'fast': 1}, delays={'hung': 2})
+        with TaskTracker(client, ['hung', 'fast'], initial_delay=0.01, jitter=0) as tracker:
+            self.assertEqual('fast', tracker.wait_any(timeout=1)[0])
+            self.assertFalse(tracker.done('hung'))
+
+    def test_timeout(self):
+        client = FakeClient({'slow': 1000})
+        with TaskTracker(client, ['slow'], initial_delay=0.01, max_delay=0.01) as tracker:
+            with self.assertRaises(TimeoutError):
+                tracker.wait_any(timeout=0.1)
+            with self.assertRaises(TimeoutError):
+                tracker.wait_all(timeout=0.1)
+            self.assertEqual('RUNNING', tracker.statuses['slow']['status'])
+
+    def test_closed(self):
+        client = FakeClient({'a': 1})
+        tracker = TaskTracker(client, ['a'], initial_delay=0.01, max_delay=0.01)
+        tracker.close()
+
+        # Tasks added after closing would never be checked
+        with self.assertRaises(RuntimeError):
+            tracker.add('b')
+        self.assertNotIn('b', tracker.statuses)
+
+        # Waiting on unfinished tasks fails once the tracker is closed
+        client = FakeClient({'slow': 1000})
+        tracker = TaskTracker(client, ['slow'], initial_delay=0.01, max_delay=0.01)
+        errors = []
+
+        def _wait():
+            try:
+                tracker.wait_all()
+            except RuntimeError as e:
+                errors.append(e)
+
+        thread = Thread(target=_wait)
+        thread.start()
+        tracker.close()
+        thread.join(timeout=5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(1, len(errors))
+        with self.assertRaises(RuntimeError):
+            tracker.wait_any()
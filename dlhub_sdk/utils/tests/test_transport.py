@@ -0,0 +1,73 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+import json
+import os
+import pickle as pkl
+import time
+
+from globus_sdk import AccessTokenAuthorizer, SearchClient
+from globus_sdk.exc import NetworkError
+
+from dlhub_sdk.client import DLHubClient
+from dlhub_sdk.server import LocalDLHubServer
+from dlhub_sdk.utils.transport import RecordingAdapter, ReplayAdapter
+
+
+class TestTransport(TestCase):
+
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'traffic.jsonl')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _make_client(self, base_url, transport):
+        return DLHubClient(AccessTokenAuthorizer('secret'),
+                           SearchClient(authorizer=AccessTokenAuthorizer('secret')),
+                           base_url=base_url, transport=transport)
+
+    def test_record_replay(self):
+        # Record requests made to a server
+        with LocalDLHubServer(os.path.join(self.temp_dir.name, 'server'), workers=0) as server:
+            url = server.url
+            client = self._make_client(url, RecordingAdapter(self.path))
+            self.assertEqual('local', client.get_username())
+            with self.assertRaises(Exception):
+                client.run('local/missing', [1])
+
+        with open(self.path) as fp:
+            records = [json.loads(line) for line in fp]
+        self.assertEqual(['GET', 'POST'], [r['method'] for r in records])
+        self.assertEqual([200, 404], [r['status'] for r in records])
+        self.assertNotIn('secret', json.dumps(records))
+
+        # Replay them once the server is stopped
+        adapter = ReplayAdapter(self.path)
+        client = self._make_client(url, adapter)
+        for _ in range(2):
+            self.assertEqual('local', client.get_username())
+        with self.assertRaises(Exception):
+            client.run('local/missing', [1])
+        with self.assertRaises(NetworkError):
+            client.run('local/other', [1])
+
+        # Requests must have the same body if desired
+        client = self._make_client(url, ReplayAdapter(records, match_body=True))
+        with self.assertRaises(NetworkError):
+            client.run('local/missing', [2])
+
+        # Make sure the adapter can be pickled with the client
+        client = pkl.loads(pkl.dumps(self._make_client(url, adapter)))
+        self.assertEqual('local', client.get_username())
+
+    def test_latency(self):
+        record = {'method': 'GET', 'url': 'http://dlhub.test/namespaces', 'status': 200,
+                  'headers': {'Content-Type': 'application/json'},
+                  'body': 'eyJuYW1lc3BhY2UiOiAidGVzdCJ9', 'elapsed': 0.1}
+        for latency in [0.1, 'recorded', lambda r: r['elapsed']]:
+            client = self._make_client('http://dlhub.test',
+                                       ReplayAdapter([record], latency=latency))
+            start = time.perf_counter()
+            self.assertEqual('test', client.get_username())
+            self.assertGreaterEqual(time.perf_counter() - start, 0.1)
@@ -0,0 +1,126 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase
+import json
+import os
+
+from globus_sdk import AccessTokenAuthorizer
+import requests
+
+from dlhub_sdk.utils.upload import ResumableUpload, UploadManifest
+
+
+class _MockService(BaseHTTPRequestHandler):
+    """Stores the parts of uploads, failing when told to"""
+
+    parts = {}
+    failures = {}
+    requests = []
+    uploads = []
+    expired = set()
+
+    def _reply(self, status, body=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body or {}).encode())
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.requests.append(('POST', self.path))
+        if self.path.endswith('/complete'):
+            self._reply(200, {'n_parts': len(body['parts'])})
+        else:
+            self.uploads.append('up-{}'.format(len(self.uploads) + 1))
+            self._reply(200, {'upload_id': self.uploads[-1]})
+
+    def do_PUT(self):
+        upload_id, part = self.path.split('/')[-2:]
+        part = int(part)
+        data = self.rfile.read(int(self.headers['Content-Length']))
+        self.requests.append(('PUT', part))
+        if upload_id in self.expired:
+            self._reply(404)
+        elif self.failures.get(part):
+            self._reply(self.failures[part].pop(0))
+        else:
+            self.parts[part] = data
+            self._reply(200)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestUpload(TestCase):
+
+    def setUp(self):
+        _MockService.parts.clear()
+        _MockService.failures.clear()
+        _MockService.requests.clear()
+        _MockService.uploads.clear()
+        _MockService.expired.clear()
+        self.server = HTTPServer(('127.0.0.1', 0), _MockService)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{}/'.format(self.server.server_port)
+        self.temp_dir = TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'servable.zip')
+        with open(self.path, 'wb') as fp:
+            fp.write(os.urandom(1000))
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def test_upload(self):
+        uploader = ResumableUpload(requests.Session(), self.url, AccessTokenAuthorizer('x'),
+                                   part_size=300, max_workers=2, backoff=0,
+                                   manifest_dir=self.temp_dir.name)
+
+        # Temporary errors are retried, others are not
+        _MockService.failures[1] = [503]
+        _MockService.failures[3] = [400]
+        with self.assertRaises(requests.HTTPError):
+            uploader.upload(self.path)
+        self.assertEqual({0, 1, 2}, set(_MockService.parts))
+
+        # Make sure the progress was saved
+        manifests = [f for f in os.listdir(self.temp_dir.name) if f.endswith('.json')]
+        self.assertEqual(1, len(manifests))
+        manifest = UploadManifest.load(os.path.join(self.temp_dir.name, manifests[0]))
+        self.assertEqual(4, manifest.n_parts)
+        self.assertEqual([3], manifest.remaining())
+
+        # Resume the upload, which should only send the last part
+        _MockService.requests.clear()
+        self.assertEqual('up-1', uploader.upload(self.path))
+        self.assertEqual([('PUT', 3), ('POST', '/publish/uploads/up-1/complete')],
+                         _MockService.requests)
+        with open(self.path, 'rb') as fp:
+            self.assertEqual(fp.read(), b''.join(_MockService.parts[i] for i in range(4)))
+        self.assertFalse(os.path.exists(manifest.path))
+
+    def test_expired(self):
+        uploader = ResumableUpload(requests.Session(), self.url, AccessTokenAuthorizer('x'),
+                                   part_size=300, max_workers=1, backoff=0,
+                                   manifest_dir=self.temp_dir.name)
+        _MockService.failures[2] = [400]
+        with self.assertRaises(requests.HTTPError):
+            uploader.upload(self.path)
+
+        # The resumed upload is unknown to the service, so the file is sent again
+        _MockService.expired.add('up-1')
+        _MockService.requests.clear()
+        self.assertEqual('up-2', uploader.upload(self.path))
+        self.assertEqual([('PUT', 2), ('POST', '/publish/uploads'), ('PUT', 0), ('PUT', 1),
+                          ('PUT', 2), ('PUT', 3), ('POST', '/publish/uploads/up-2/complete')],
+                         _MockService.requests)
+        self.assertEqual([], [f for f in os.listdir(self.temp_dir.name) if f.endswith('.json')])
+
+        # The manifest is deleted even if the new upload is also rejected
+        _MockService.expired.update(['up-3', 'up-4'])
+        with self.assertRaises(requests.HTTPError):
+            uploader.upload(self.path)
+        self.assertEqual([], [f for f in os.listdir(self.temp_dir.name) if f.endswith('.json')])
+        self.assertEqual(['up-1', 'up-2', 'up-3', 'up-4'], _MockService.uploads)
@@ -0,0 +1,80 @@
+from unittest import TestCase
+
+import numpy as np
+
+from dlhub_sdk.utils.types import compose_argument_block
+from dlhub_sdk.utils.validation import InputValidator, InputValidationError
+
+
+class TestValidation(TestCase):
+
+    def assertInvalid(self, validator, inputs, path=()):
+        with self.assertRaises(InputValidationError) as exc:
+            validator.validate(inputs)
+        self.assertEqual(path, exc.exception.path)
+
+    def test_scalars(self):
+        validator = InputValidator(compose_argument_block('float', 'x'))
+        validator.validate(1.5)
+        validator.validate(np.float32(1))
+        validator.validate(2)
+        self.assertInvalid(validator, '1')
+        self.assertInvalid(validator, True)
+
+        validator = InputValidator(compose_argument_block('boolean', 'x'))
+        validator.validate(np.bool_(False))
+        self.assertInvalid(validator, 0)
+
+        # Unknown types accept anything
+        self.assertTrue(InputValidator({'type': 'file'}).is_valid(object()))
+
+    def test_ndarray(self):
+        validator = InputValidator(compose_argument_block('ndarray', 'x', shape=[None, 3],
+                                                          item_type='float'))
+        validator.validate(np.zeros((5, 3)))
+        validator.validate([[1, 2, 3]])
+        self.assertInvalid(validator, np.zeros((5, 2)))
+        self.assertInvalid(validator, np.zeros((5, 3), dtype=str))
+        self.assertInvalid(validator, [[1, 2, 3], [1, 2]])
+        self.assertInvalid(validator, 'abc')
+
+    def test_containers(self):
+        # List of arrays, checked as a stack if given as an array
+        validator = InputValidator(compose_argument_block(
+            'list', 'x', item_type=compose_argument_block('ndarray', 'y', shape=[2],
+                                                          item_type='integer')))
+        validator.validate([np.arange(2), [1, 2]])
+        validator.validate(np.zeros((10, 2), dtype=int))
+        self.assertInvalid(validator, np.zeros((10, 3), dtype=int))
+        self.assertInvalid(validator, [np.arange(2), np.arange(3)], (1,))
+        self.assertInvalid(validator, {'a': 1})
+
+        # List of strings
+        validator = InputValidator(compose_argument_block('list', 'x', item_type='string'))
+        validator.validate(['a', 'b'])
+        validator.validate(np.array(['a', 'b']))
+        self.assertInvalid(validator, ['a', 1], (1,))
+
+        # Tuples and dictionaries
+        validator = InputValidator(compose_argument_block(
+            'tuple', 'x', element_types=[
+                'integer',
+                compose_argument_block('dict', 'y', properties={'z': {'type': 'string'}})
+            ]))
+        validator.validate((1, {'z': 'a', 'w': 1}))
+        self.assertInvalid(validator, (1,))
+        self.assertInvalid(validator, [1, {}], (1,))
+        self.assertInvalid(validator, [1, {'z': 1}], (1, 'z'))
+
+    def test_python_object(self):
+        validator = InputValidator(compose_argument_block('python object', 'x',
+                                                          python_type='collections.OrderedDict'))
+        from collections import OrderedDict
+        validator.validate(OrderedDict())
+        self.assertInvalid(validator, {})
+
+        # Classes from modules that are not imported are matched by name
+        validator = InputValidator(compose_argument_block('python object', 'x',
+                                                          python_type='notamodule.OrderedDict'))
+        validator.validate(OrderedDict())
+        self.assertInvalid(validator, [])
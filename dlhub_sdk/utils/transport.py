@@ -0,0 +1,229 @@
+"""Transport adapters that record and replay the HTTP traffic of a client
+
+A transport adapter is the object ``requests`` uses to send a request and receive the
+reply. :class:`DLHubClient <dlhub_sdk.client.DLHubClient>` sends all of its requests,
+including those to Globus Search, through a single adapter given by its ``transport``
+option. Recording the traffic of a real session and replaying it later allows the time
+spent inside the client (e.g., serializing inputs and parsing replies) to be measured
+without the variability of the network::
+
+    client = DLHubClient(transport=RecordingAdapter('traffic.jsonl'))
+    client.run('dlhub/servable', inputs)
+
+    client = DLHubClient(dlh_authorizer, search_client,
+                         transport=ReplayAdapter('traffic.jsonl', latency=0.05))
+    client.run('dlhub/servable', inputs)  # Receives the recorded reply after 50 ms
+"""
+from base64 import b64decode, b64encode
+from collections import defaultdict, deque
+from datetime import timedelta
+from threading import Lock
+import hashlib
+import json
+import time
+
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from dlhub_sdk.utils.http import PooledHTTPAdapter
+
+# Headers that are not saved, because they hold credentials or describe an encoding
+#  that has already been removed from the recorded body
+_private_headers = ('authorization', 'cookie', 'set-cookie')
+_encoding_headers = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+def _get_body_bytes(body):
+    """Get the body of a request as bytes, if it is not a stream
+
+    Args:
+        body: Body of a prepared request
+    Returns:
+        (bytes) Body, or ``None`` if the body is a stream
+    """
+    if body is None:
+        return b''
+    if isinstance(body, str):
+        return body.encode()
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return bytes(body)
+    return None
+
+
+def _drain_body(body):
+    """Consume a request body that is a stream, as sending it would"""
+    if hasattr(body, 'read'):
+        while body.read(1024 * 1024):
+            pass
+    elif body is not None and _get_body_bytes(body) is None:
+        for _ in body:
+            pass
+
+
+class RecordingAdapter(BaseAdapter):
+    """Sends requests through another adapter, saving each request and reply to a file
+
+    Records are appended to a file with one JSON document per line. Request bodies
+    larger than ``max_body_size`` or sent as streams are not saved, nor are headers
+    that hold credentials.
+    """
+
+    def __init__(self, path, adapter=None, max_body_size=1024 * 1024):
+        """
+        Args:
+            path (string): Path to the file in which to save the records
+            adapter (BaseAdapter): Adapter used to send the requests. Default is a
+                :class:`PooledHTTPAdapter <dlhub_sdk.utils.http.PooledHTTPAdapter>`
+            max_body_size (int): Maximum size of request bodies to save, in bytes
+        """
+        super(RecordingAdapter, self).__init__()
+        self.path = path
+        self.adapter = adapter if adapter is not None else PooledHTTPAdapter()
+        self.max_body_size = max_body_size
+        self._lock = Lock()
+
+    def send(self, request, **kwargs):
+        body = _get_body_bytes(request.body)
+        start = time.perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        content = response.content  # Reads the whole reply
+        elapsed = time.perf_counter() - start
+
+        record = {
+            'method': request.method,
+            'url': request.url,
+            'request_headers': dict((k, v) for k, v in request.headers.items()
+                                    if k.lower() not in _private_headers),
+            'request_sha256': None if body is None else hashlib.sha256(body).hexdigest(),
+            'request_body': None if body is None or len(body) > self.max_body_size
+            else b64encode(body).decode(),
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': dict((k, v) for k, v in response.headers.items()
+                            if k.lower() not in _private_headers + _encoding_headers),
+            'body': b64encode(content).decode(),
+            'elapsed': elapsed
+        }
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            with open(self.path, 'a') as fp:
+                fp.write(line)
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
+
+
+class ReplayAdapter(BaseAdapter):
+    """Answers requests with replies recorded by a :class:`RecordingAdapter`
+
+    Requests are matched to records with the same method and URL and, if
+    ``match_body`` is set, the same body. Requests that match several records receive
+    the replies in the order they were recorded, starting again from the first once all
+    have been used. Requests that match no record raise a ``ConnectionError``.
+
+    Streamed request bodies are consumed, as if they were sent, so that the time taken
+    to generate them is included in measurements.
+    """
+
+    def __init__(self, records, latency=None, match_body=False):
+        """
+        Args:
+            records (string or [dict]): Path to a file of records, or the records
+            latency (float, string or callable): Delay before each reply, in seconds.
+                Either a fixed delay, ``"recorded"`` to use the time each request took
+                when it was recorded, or a function that takes a record and returns
+                the delay. Default is no delay
+            match_body (bool): Whether requests must have the same body as a record
+        """
+        super(ReplayAdapter, self).__init__()
+        if isinstance(records, str):
+            with open(records) as fp:
+                records = [json.loads(line) for line in fp if line.strip()]
+        self.latency = latency
+        self.match_body = match_body
+
+        self._records = defaultdict(list)
+        for record in records:
+            self._records[self._get_key(record['method'], record['url'],
+                                        record.get('request_sha256'))].append(record)
+        self._queues = dict((k, deque(v)) for k, v in self._records.items())
+        self._lock = Lock()
+
+    def _get_key(self, method, url, digest):
+        return (method, url, digest) if self.match_body else (method, url)
+
+    def _next_record(self, request):
+        """Get the record that answers a request
+
+        Args:
+            request (PreparedRequest): Request to be answered
+        Returns:
+            (dict) Matching record
+        """
+        body = _get_body_bytes(request.body)
+        digest = None if body is None else hashlib.sha256(body).hexdigest()
+        key = self._get_key(request.method, request.url, digest)
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None:
+                raise ConnectionError('No recorded reply for {} {}'.format(request.method,
+                                                                           request.url),
+                                      request=request)
+            if len(queue) == 0:
+                queue.extend(self._records[key])
+            return queue.popleft()
+
+    def _get_delay(self, record):
+        if self.latency is None:
+            return 0
+        if self.latency == 'recorded':
+            return record.get('elapsed', 0)
+        if callable(self.latency):
+            return self.latency(record)
+        return self.latency
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        _drain_body(request.body)
+        record = self._next_record(request)
+
+        # Wait for the rest of the synthetic latency
+        delay = self._get_delay(record) - (time.perf_counter() - start)
+        if delay > 0:
+            time.sleep(delay)
+
+        response = Response()
+        response.status_code = record['status']
+        response.reason = record.get('reason')
+        response.headers = CaseInsensitiveDict(record['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = b64decode(record['body'])
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=time.perf_counter() - start)
+        return response
+
+    def close(self):
+        pass
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = Lock()
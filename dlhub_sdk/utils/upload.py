@@ -0,0 +1,285 @@
+"""Tools for uploading large files to DLHub in parts, with the ability to resume"""
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import hashlib
+import json
+import logging
+import os
+import time
+
+import requests
+from globus_sdk.base import slash_join
+
+logger = logging.getLogger(__name__)
+
+_default_manifest_dir = os.path.join(os.path.expanduser('~'), '.dlhub', 'uploads')
+
+
+def _hash_file(path, chunk_size=1024 * 1024):
+    """Compute the SHA-256 digest of a file
+
+    Args:
+        path (string): Path to the file
+        chunk_size (int): Number of bytes to read at a time
+    Returns:
+        (string) Hex digest of the file
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class UploadManifest:
+    """Record of the parts of a file that have been uploaded
+
+    The record is saved to disk after each part completes, so that an interrupted upload
+    of the same file can skip the parts already received by DLHub.
+    """
+
+    def __init__(self, path, digest, size, part_size, upload_id=None, completed=None):
+        """
+        Args:
+            path (string): Path of the manifest file
+            digest (string): SHA-256 digest of the file being uploaded
+            size (int): Size of the file being uploaded, in bytes
+            part_size (int): Size of each part, in bytes
+            upload_id (string): ID of the upload assigned by DLHub
+            completed (dict): ETag of each part that has been uploaded, keyed by part number
+        """
+        self.path = path
+        self.digest = digest
+        self.size = size
+        self.part_size = part_size
+        self.upload_id = upload_id
+        self.completed = dict(completed or {})
+        self._lock = Lock()
+
+    @classmethod
+    def load(cls, path):
+        """Read a manifest from disk
+
+        Args:
+            path (string): Path of the manifest file
+        Returns:
+            (UploadManifest) Manifest, or ``None`` if it does not exist or is unreadable
+        """
+        try:
+            with open(path) as fp:
+                data = json.load(fp)
+            completed = dict((int(k), v) for k, v in data['completed'].items())
+            return cls(path, data['digest'], data['size'], data['part_size'],
+                       data['upload_id'], completed)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @property
+    def n_parts(self):
+        """int: Number of parts in the file"""
+        return max(1, -(-self.size // self.part_size))
+
+    def remaining(self):
+        """Get the parts that have yet to be uploaded
+
+        Returns:
+            ([int]) Numbers of the parts
+        """
+        return [i for i in range(self.n_parts) if i not in self.completed]
+
+    def mark_complete(self, part, etag):
+        """Record that a part was uploaded and save the manifest
+
+        Args:
+            part (int): Number of the part
+            etag (string): Identifier for the part returned by DLHub
+        """
+        with self._lock:
+            self.completed[part] = etag
+            self.save()
+
+    def save(self):
+        """Write the manifest to disk, replacing the previous copy atomically"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as fp:
+            json.dump({'digest': self.digest, 'size': self.size, 'part_size': self.part_size,
+                       'upload_id': self.upload_id, 'completed': self.completed}, fp)
+        os.replace(temp_path, self.path)
+
+    def delete(self):
+        """Remove the manifest from disk"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class ResumableUpload:
+    """Upload a file to DLHub as fixed-size parts sent in parallel
+
+    Each part is retried with an exponentially-increasing delay if the connection fails
+    or the service reports a temporary error. Progress is recorded in an
+    :class:`UploadManifest` stored in ``manifest_dir`` and named after the digest of the
+    file, so repeating the upload of the same file after an interruption only sends the
+    parts that are missing. If the service no longer knows the upload being resumed
+    (e.g., because it expired), the manifest is deleted and the file is uploaded again
+    from the start.
+
+    The service endpoints used are ``publish/uploads`` to start an upload,
+    ``publish/uploads/{id}/{part}`` to send each part, and
+    ``publish/uploads/{id}/complete`` to assemble the parts.
+    """
+
+    def __init__(self, session, base_url, authorizer, part_size=64 * 1024 * 1024,
+                 max_workers=4, max_retries=5, backoff=1, manifest_dir=None,
+                 timeout=None, verify=True):
+        """
+        Args:
+            session (requests.Session): Session used to make requests
+            base_url (string): Address of the DLHub service
+            authorizer (GlobusAuthorizer): Authorizer used to create the authorization header
+            part_size (int): Size of each part, in bytes
+            max_workers (int): Maximum number of parts to send at once
+            max_retries (int): Maximum number of times to retry sending a part
+            backoff (float): Time to wait before the first retry, in seconds. Doubles
+                after each further attempt
+            manifest_dir (string): Directory in which to store upload manifests.
+                Default is ``~/.dlhub/uploads``
+            timeout (float): Timeout for each request, in seconds
+            verify (bool): Whether to verify the SSL certificate of the service
+        """
+        if part_size < 1:
+            raise ValueError('Part size must be at least 1')
+        self.session = session
+        self.base_url = base_url
+        self.authorizer = authorizer
+        self.part_size = part_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.manifest_dir = manifest_dir if manifest_dir is not None else _default_manifest_dir
+        self.timeout = timeout
+        self.verify = verify
+
+    def _request(self, method, path, **kwargs):
+        """Make an authorized request to the DLHub service
+
+        Args:
+            method (string): HTTP method
+            path (string): Path of the resource, relative to the service address
+            kwargs: Arguments to :meth:`requests.Session.request`
+        Returns:
+            (requests.Response) Reply from the service
+        """
+        headers = dict(kwargs.pop('headers', {}))
+        self.authorizer.set_authorization_header(headers)
+        reply = self.session.request(method, slash_join(self.base_url, path), headers=headers,
+                                     timeout=self.timeout, verify=self.verify, **kwargs)
+        reply.raise_for_status()
+        return reply
+
+    def get_manifest(self, path, resume=True):
+        """Get the manifest for uploading a file, starting a new upload if needed
+
+        Args:
+            path (string): Path to the file
+            resume (bool): Whether to resume a previous upload of the file, if there is one
+        Returns:
+            (UploadManifest) Manifest of the upload
+        """
+        digest = _hash_file(path)
+        size = os.path.getsize(path)
+        manifest_path = os.path.join(self.manifest_dir, '{}.json'.format(digest))
+
+        # Resume a previous upload of the same file, if possible
+        manifest = UploadManifest.load(manifest_path) if resume else None
+        if manifest is not None and manifest.size == size \
+                and manifest.part_size == self.part_size:
+            logger.info('Resuming upload {}. {} of {} parts remain'.format(
+                manifest.upload_id, len(manifest.remaining()), manifest.n_parts))
+            return manifest
+
+        manifest = UploadManifest(manifest_path, digest, size, self.part_size)
+        reply = self._request('POST', 'publish/uploads',
+                              json={'sha256': digest, 'size': size, 'part_size': self.part_size,
+                                    'n_parts': manifest.n_parts})
+        manifest.upload_id = reply.json()['upload_id']
+        manifest.save()
+        return manifest
+
+    def _upload_part(self, manifest, path, part):
+        """Send a single part of a file, retrying if it fails
+
+        Args:
+            manifest (UploadManifest): Manifest of the upload
+            path (string): Path to the file
+            part (int): Number of the part
+        """
+        with open(path, 'rb') as fp:
+            fp.seek(part * manifest.part_size)
+            data = fp.read(manifest.part_size)
+        headers = {'Content-Type': 'application/octet-stream',
+                   'X-Content-SHA256': hashlib.sha256(data).hexdigest()}
+        url = 'publish/uploads/{}/{}'.format(manifest.upload_id, part)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                reply = self._request('PUT', url, data=data, headers=headers)
+                manifest.mark_complete(part, reply.headers.get('ETag', headers['X-Content-SHA256']))
+                return
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as exc:
+                response = getattr(exc, 'response', None)
+                temporary = response is None or response.status_code == 429 \
+                    or response.status_code >= 500
+                if not temporary or attempt == self.max_retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                logger.warning('Upload of part {} failed: {}. Retrying in {:.1f}s'.format(
+                    part, exc, delay))
+                time.sleep(delay)
+
+    def upload(self, path):
+        """Upload a file, resuming a previous attempt if one was interrupted
+
+        Args:
+            path (string): Path to the file
+        Returns:
+            (string) ID of the completed upload
+        """
+        manifest = self.get_manifest(path)
+        try:
+            self._send(manifest, path)
+        except requests.HTTPError as exc:
+            # Start over if the service rejects the ID of the upload
+            if exc.response is None or exc.response.status_code not in (404, 410):
+                raise
+            manifest.delete()
+            logger.warning('Upload {} is no longer available: {}. Starting a new upload'.format(
+                manifest.upload_id, exc))
+            manifest = self.get_manifest(path, resume=False)
+            try:
+                self._send(manifest, path)
+            except requests.HTTPError as exc:
+                if exc.response is not None and exc.response.status_code in (404, 410):
+                    manifest.delete()
+                raise
+        manifest.delete()
+        return manifest.upload_id
+
+    def _send(self, manifest, path):
+        """Send the parts of a file that are missing and assemble them
+
+        Args:
+            manifest (UploadManifest): Manifest of the upload
+            path (string): Path to the file
+        """
+        # Send the missing parts
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            futures = [executor.submit(self._upload_part, manifest, path, part)
+                       for part in manifest.remaining()]
+            for future in futures:
+                future.result()
+
+        # Assemble the file
+        parts = [{'part': i, 'etag': manifest.completed[i]} for i in range(manifest.n_parts)]
+        self._request('POST', 'publish/uploads/{}/complete'.format(manifest.upload_id),
+                      json={'parts': parts})
@@ -0,0 +1,343 @@
+"""Tools for checking inputs against the argument types of a servable before sending them
+
+The argument types are those produced by
+:func:`compose_argument_block <dlhub_sdk.utils.types.compose_argument_block>`.
+Each type definition is compiled once into a tree of checkers, and arrays are checked
+by their shape and data type rather than element by element.
+"""
+from datetime import date, timedelta
+from importlib import import_module
+import numbers
+import sys
+
+import numpy as np
+
+
+class InputValidationError(ValueError):
+    """Raised when an input does not match the argument type of a servable"""
+
+    def __init__(self, message, path=()):
+        """
+        Args:
+            message (string): Description of the problem
+            path (tuple): Keys and indices leading to the invalid part of the input
+        """
+        self.message = message
+        self.path = tuple(path)
+        location = ''.join('[{!r}]'.format(p) for p in self.path)
+        super().__init__('inputs{}: {}'.format(location, message))
+
+
+def _describe(value):
+    """Get a short description of the type of a value, for error messages"""
+    if isinstance(value, np.ndarray):
+        return 'ndarray with shape {} and dtype {}'.format(value.shape, value.dtype)
+    return type(value).__name__
+
+
+class _Checker:
+    """Checks a value against a single type definition"""
+
+    name = 'unknown'
+
+    def check(self, value, path):
+        """Check a single value
+
+        Args:
+            value: Value to be checked
+            path (tuple): Location of the value in the input
+        Raises:
+            (InputValidationError) If the value is invalid
+        """
+        pass
+
+    def check_array(self, array, path):
+        """Check every entry along the first axis of an array
+
+        Args:
+            array (ndarray): Array of values
+            path (tuple): Location of the array in the input
+        """
+        for i, value in enumerate(array):
+            self.check(value, path + (i,))
+
+
+class _ScalarChecker(_Checker):
+    """Checks single values, such as numbers and strings"""
+
+    def __init__(self, name, types, kinds, allow_bool=False):
+        """
+        Args:
+            name (string): Name of the type
+            types (tuple): Python types that are accepted
+            kinds (string): Kinds of NumPy data type that are accepted
+            allow_bool (bool): Whether to accept Boolean values
+        """
+        self.name = name
+        self.types = types
+        self.kinds = kinds
+        self.allow_bool = allow_bool
+
+    def accepts(self, value):
+        return isinstance(value, self.types) \
+            and (self.allow_bool or not isinstance(value, (bool, np.bool_)))
+
+    def check(self, value, path):
+        if not self.accepts(value):
+            raise InputValidationError('expected {}, got {}'.format(
+                self.name, _describe(value)), path)
+
+    def check_dtype(self, dtype, path):
+        """Check whether an array's data type holds values of this type
+
+        Args:
+            dtype (np.dtype): Data type of the array
+            path (tuple): Location of the array in the input
+        Returns:
+            (bool) Whether the entries must be checked individually
+        """
+        if dtype.kind == 'O':
+            return True
+        if dtype.kind not in self.kinds:
+            raise InputValidationError('expected entries of type {}, got dtype {}'.format(
+                self.name, dtype), path)
+        return False
+
+    def check_array(self, array, path):
+        if self.check_dtype(array.dtype, path):
+            self.check_sequence(array.ravel(), path)
+
+    def check_sequence(self, values, path):
+        """Check a list of values, reporting the first one that is invalid"""
+        if all(map(self.accepts, values)):
+            return
+        for i, value in enumerate(values):
+            self.check(value, path + (i,))
+
+
+_scalar_types = {
+    'integer': ((numbers.Integral,), 'iu'),
+    'float': ((numbers.Real,), 'iuf'),
+    'number': ((numbers.Real,), 'iuf'),
+    'complex': ((numbers.Complex,), 'iufc'),
+    'string': ((str,), 'SU'),
+    'boolean': ((bool, np.bool_), 'b'),
+    'timedelta': ((timedelta, np.timedelta64), 'm'),
+    'datetime': ((date, np.datetime64), 'M'),
+}
+
+
+class _PythonObjectChecker(_Checker):
+    """Checks the class of a Python object
+
+    Classes are only resolved from modules that have already been imported. Otherwise,
+    the name of the class is compared to those of the classes of the value.
+    """
+
+    def __init__(self, python_type):
+        self.name = python_type
+        self.module, _, self.class_name = python_type.rpartition('.')
+        self._cls = None
+
+    def _resolve(self):
+        if self._cls is None and self.module in sys.modules:
+            try:
+                self._cls = getattr(import_module(self.module), self.class_name)
+            except AttributeError:
+                pass
+        return self._cls
+
+    def check(self, value, path):
+        cls = self._resolve()
+        if cls is not None:
+            valid = isinstance(value, cls)
+        else:
+            valid = any(c.__name__ == self.class_name for c in type(value).__mro__)
+        if not valid:
+            raise InputValidationError('expected {}, got {}'.format(
+                self.name, _describe(value)), path)
+
+
+class _NDArrayChecker(_Checker):
+    """Checks the shape and data type of an array"""
+
+    name = 'ndarray'
+
+    def __init__(self, shape, item):
+        """
+        Args:
+            shape ([int]): Required shape. ``None`` for dimensions of any size
+            item (_Checker): Checker for the entries of the array
+        """
+        self.shape = tuple(shape)
+        self.item = item
+
+    def _check_shape(self, shape, path, what='shape'):
+        if len(shape) != len(self.shape) or \
+                any(r is not None and r != s for r, s in zip(self.shape, shape)):
+            raise InputValidationError('expected {} {}, got {}'.format(
+                what, list(self.shape), list(shape)), path)
+
+    def _check_entries(self, array, path):
+        if self.item is not None:
+            self.item.check_array(array.reshape(-1), path)
+
+    def check(self, value, path):
+        if not isinstance(value, np.ndarray):
+            if not isinstance(value, (list, tuple)):
+                raise InputValidationError('expected ndarray, got {}'.format(
+                    _describe(value)), path)
+            try:
+                value = np.asarray(value)
+            except ValueError:
+                raise InputValidationError('expected ndarray, got a ragged list', path)
+            if value.dtype.kind == 'O' and value.ndim < len(self.shape):
+                raise InputValidationError('expected ndarray, got a ragged list', path)
+        self._check_shape(value.shape, path)
+        self._check_entries(value, path)
+
+    def check_array(self, array, path):
+        # Check a stack of arrays at once
+        if array.dtype.kind == 'O':
+            return super().check_array(array, path)
+        self._check_shape(array.shape[1:], path, 'each entry to have shape')
+        self._check_entries(array, path)
+
+
+class _ListChecker(_Checker):
+    """Checks each item in a list"""
+
+    name = 'list'
+
+    def __init__(self, item):
+        self.item = item
+
+    def check(self, value, path):
+        if isinstance(value, np.ndarray) and value.ndim > 0:
+            self.item.check_array(value, path)
+        elif isinstance(value, (list, tuple)):
+            if isinstance(self.item, _ScalarChecker):
+                self.item.check_sequence(value, path)
+            elif not isinstance(self.item, _AnyChecker):
+                for i, item in enumerate(value):
+                    self.item.check(item, path + (i,))
+        else:
+            raise InputValidationError('expected list, got {}'.format(_describe(value)), path)
+
+
+class _TupleChecker(_Checker):
+    """Checks the length and each element of a tuple"""
+
+    name = 'tuple'
+
+    def __init__(self, elements):
+        self.elements = elements
+
+    def check(self, value, path):
+        if not isinstance(value, (list, tuple)):
+            raise InputValidationError('expected tuple, got {}'.format(_describe(value)), path)
+        if len(value) != len(self.elements):
+            raise InputValidationError('expected {} elements, got {}'.format(
+                len(self.elements), len(value)), path)
+        for i, (element, item) in enumerate(zip(self.elements, value)):
+            element.check(item, path + (i,))
+
+
+class _DictChecker(_Checker):
+    """Checks that each property of a dictionary is present and of the correct type"""
+
+    name = 'dict'
+
+    def __init__(self, properties):
+        self.properties = properties
+
+    def check(self, value, path):
+        if not isinstance(value, dict):
+            raise InputValidationError('expected dict, got {}'.format(_describe(value)), path)
+        for key, checker in self.properties.items():
+            if key not in value:
+                raise InputValidationError('missing key {!r}'.format(key), path)
+            checker.check(value[key], path + (key,))
+
+
+class _AnyChecker(_Checker):
+    """Accepts any value"""
+
+    def check_array(self, array, path):
+        pass
+
+
+def compile_argument_type(argument_type):
+    """Compile an argument type definition into a checker
+
+    Args:
+        argument_type (dict or string): Type definition, as produced by
+            :func:`compose_argument_block <dlhub_sdk.utils.types.compose_argument_block>`,
+            or the name of a type
+    Returns:
+        (_Checker) Checker for values of that type. Types that are not recognized accept
+        any value
+    """
+    if isinstance(argument_type, str):
+        argument_type = {'type': argument_type}
+    data_type = argument_type.get('type')
+
+    if data_type in _scalar_types:
+        types, kinds = _scalar_types[data_type]
+        return _ScalarChecker(data_type, types, kinds, allow_bool=data_type == 'boolean')
+    elif data_type == 'python object' and argument_type.get('python_type'):
+        return _PythonObjectChecker(argument_type['python_type'])
+    elif data_type == 'ndarray' and argument_type.get('shape'):
+        item = argument_type.get('item_type')
+        return _NDArrayChecker(argument_type['shape'],
+                               None if item is None else compile_argument_type(item))
+    elif data_type == 'list':
+        return _ListChecker(compile_argument_type(argument_type.get('item_type', {})))
+    elif data_type == 'tuple' and argument_type.get('element_types') is not None:
+        return _TupleChecker([compile_argument_type(e) for e in argument_type['element_types']])
+    elif data_type == 'dict' and argument_type.get('properties') is not None:
+        return _DictChecker(dict((k, compile_argument_type(v))
+                                 for k, v in argument_type['properties'].items()))
+    return _AnyChecker()
+
+
+class InputValidator:
+    """Checks inputs to a servable method against the method's declared input type
+
+    The type definition is compiled when the validator is created, so a validator should
+    be reused for all inputs to the same version of a servable
+    (see :meth:`DLHubClient.get_input_validator
+    <dlhub_sdk.client.DLHubClient.get_input_validator>`).
+    """
+
+    def __init__(self, argument_type):
+        """
+        Args:
+            argument_type (dict): Input type of the method, from ``servable.methods.<name>.input``
+        """
+        self.argument_type = argument_type
+        self._checker = compile_argument_type(argument_type)
+
+    def validate(self, inputs):
+        """Check an input
+
+        Args:
+            inputs: Input to the servable
+        Raises:
+            (InputValidationError) If the input does not match the type
+        """
+        self._checker.check(inputs, ())
+
+    def is_valid(self, inputs):
+        """Check whether an input is valid
+
+        Args:
+            inputs: Input to the servable
+        Returns:
+            (bool) Whether the input matches the type
+        """
+        try:
+            self.validate(inputs)
+        except InputValidationError:
+            return False
+        return True
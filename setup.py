@@ -25,7 +25,10 @@ setup(
         "jsonpickle",
         "mdf_toolbox>=0.4.0"
     ],
-    python_requires=">=3.4",
+    extras_require={
+        "async": ["aiohttp>=3.5"]
+    },
+    python_requires=">=3.6",
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Science/Research",